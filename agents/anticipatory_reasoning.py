@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
@@ -10,9 +10,16 @@ class AnticipatoryReasoningAgent(BaseAgent):
 
     agent_name = "anticipatory_reasoning"
     agent_description = "Experimental: Attending inner monologue tracking through the presentation"
+    max_tokens = 2500
+    schema = {
+        "inner_monologue": "array",
+        "unanswered_questions": "array",
+        "anticipatory_strengths": "array",
+        "missed_anticipations": "array",
+        "overall_impression": "string",
+    }
 
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        transcript = context["cleaned_transcript"]
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
 
         system_prompt = f"""You are a highly experienced attending physician on {service_context['name']} ({service_context['specialty']}). You are listening to a medical student's oral presentation.
@@ -48,20 +55,15 @@ Return JSON:
 
 Aim for 6-12 inner monologue entries that cover the key moments of the presentation. Focus on the most important cognitive inflection points — not every sentence."""
 
-        user_prompt = f"""Walk through this presentation as if you're hearing it live on {service_context['name']} rounds. Provide your inner monologue:
+        user_prompt = f"Walk through the presentation above as if you're hearing it live on {service_context['name']} rounds. Provide your inner monologue."
 
-TRANSCRIPT:
-{transcript}"""
+        return system_prompt, user_prompt
 
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=2500)
-        except Exception as e:
-            result = {
-                "inner_monologue": [],
-                "unanswered_questions": [],
-                "anticipatory_strengths": [],
-                "missed_anticipations": [],
-                "overall_impression": f"Error during anticipatory reasoning analysis: {e}",
-            }
-
-        return result
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "inner_monologue": [],
+            "unanswered_questions": [],
+            "anticipatory_strengths": [],
+            "missed_anticipations": [],
+            "overall_impression": f"Error during anticipatory reasoning analysis: {error}",
+        }
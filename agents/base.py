@@ -1,41 +1,572 @@
+import asyncio
+import logging
 import openai
 import os
 import json
-from typing import Dict, Any, Optional
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from json_stream import JSONFieldStream
+from deadline import check_deadline
+from llm_cache import cache_key, get_llm_cache
+from llm_retry import acall_with_retries, ahedged_call, call_with_retries, hedge_delay, hedged_call, latencies
+from rate_limiter import get_rate_limiter
+from structured_output import Schema, merge_fields, missing_fields, parse_json_object, schema_outline
+from token_usage import PromptTooLong, count_message_tokens, fit_max_tokens, record_usage
+
+
+logger = logging.getLogger(__name__)
+
+# Receives each top-level (field, value) of a streamed JSON completion.
+FieldCallback = Callable[[str, Any], None]
+
+# Model that answered the current call: the routed model, its fallback, or
+# None when the completion came from cache.
+_answered_by: ContextVar[Optional[str]] = ContextVar("answered_by", default=None)
+
+# Request the provider's JSON mode (response_format json_object) from models
+# that support it, matched by model-name prefix.
+JSON_MODE = os.getenv("LLM_JSON_MODE", "1") == "1"
+_JSON_MODE_MODELS = ("gpt-4o", "gpt-4.1", "gpt-4-turbo", "gpt-3.5-turbo", "grok-")
+
+
+def _settled_stream(stream, limiter, reserved: int):
+    """Yield ``stream``'s chunks, then settle the rate-limit reservation from
+    the usage in its final chunk (a stream cut short keeps the full
+    reservation).
+    """
+    used = None
+    try:
+        for chunk in stream:
+            used = getattr(getattr(chunk, "usage", None), "total_tokens", used)
+            yield chunk
+    finally:
+        limiter.settle(reserved, used)
+
+
+async def _asettled_stream(stream, limiter, reserved: int):
+    used = None
+    try:
+        async for chunk in stream:
+            used = getattr(getattr(chunk, "usage", None), "total_tokens", used)
+            yield chunk
+    finally:
+        limiter.settle(reserved, used)
+
+
+def shared_prefix(context: Dict[str, Any], include_format: bool = False) -> str:
+    """Canonical opening of every transcript-reading agent's system prompt.
+
+    The same context always renders to the same bytes, and the parts every
+    agent reads come first, so the provider's prompt cache can serve this
+    prefix to all agents of a run after the first.  The format config is
+    appended last, only for agents that read it.
+    """
+    service_context = context["service_context"]
+    parts = [
+        "The following is a medical student's oral presentation and the clinical service it was given on. "
+        "Your role and task in reviewing it are described after the transcript.",
+        f"SERVICE: {service_context.get('name', '')}\n"
+        f"SPECIALTY: {service_context.get('specialty', '')}\n"
+        f"CLINICAL FOCUS: {service_context.get('focus', '')}\n"
+        f"REQUIRED ELEMENTS FOR THIS SERVICE: {', '.join(service_context.get('key_elements', []))}",
+        f"TRANSCRIPT:\n{context['cleaned_transcript']}",
+    ]
+    if include_format:
+        format_config = context.get("format_config", {})
+        expected_sections = format_config.get("expected_sections", [])
+        evaluation_focus = format_config.get("evaluation_focus", [])
+        parts.append(
+            f"PRESENTATION FORMAT: {format_config.get('name', 'Full H&P')}\n"
+            f"EXPECTED SECTIONS: {', '.join(expected_sections) if expected_sections else 'Standard H&P format'}\n"
+            f"TIME EXPECTATION: {format_config.get('time_expectation', '5-8 minutes')}\n"
+            f"FORMAT-SPECIFIC EVALUATION FOCUS: {', '.join(evaluation_focus) if evaluation_focus else 'Standard organization and flow'}"
+        )
+    return "\n\n".join(parts)
 
 
 class BaseAgent:
     agent_name: str = "base"
     agent_description: str = "Base agent"
+    # Context keys this agent reads; the pipeline starts it once all exist.
+    requires: Tuple[str, ...] = ("cleaned_transcript", "service_context")
+    # Completion budget; agents whose output grows with the input scale it in _output_tokens.
+    max_tokens: int = 1500
+    # Fields the output must carry (see structured_output); missing ones are re-requested.
+    schema: Schema = {}
 
-    def __init__(self, client: openai.OpenAI, model: str, temperature: float = 0.3):
+    def __init__(
+        self,
+        client: openai.OpenAI,
+        model: str,
+        temperature: float = 0.3,
+        async_client: Optional[openai.AsyncOpenAI] = None,
+        max_tokens: Optional[int] = None,
+        fallback_model: Optional[str] = None,
+    ):
         self.client = client
+        self.async_client = async_client
         self.model = model
         self.temperature = temperature
+        if max_tokens:
+            self.max_tokens = max_tokens
+        # Tried once when the routed model keeps failing (see configs/model_routing.yaml).
+        self.fallback_model = fallback_model if fallback_model != model else None
+        self.cache = get_llm_cache()
+
+    def run(self, context: Dict[str, Any], on_field: Optional[FieldCallback] = None) -> Dict[str, Any]:
+        """Run the agent.  With ``on_field`` the completion is streamed and
+        each top-level JSON field is reported as soon as it is complete.
+        """
+        system_prompt, user_prompt = self._prompts(context)
+        max_tokens = self._output_tokens(context)
+        try:
+            if on_field:
+                result = self._stream_llm_json(system_prompt, user_prompt, on_field, max_tokens=max_tokens, schema=self.schema)
+            else:
+                result = self._call_llm_json(system_prompt, user_prompt, max_tokens=max_tokens, schema=self.schema)
+            # Malformed model output degrades to the fallback like a failed call.
+            return self._record_model(self._postprocess(result, context))
+        except Exception as e:
+            return self._error_result(context, e)
 
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def arun(self, context: Dict[str, Any], on_field: Optional[FieldCallback] = None) -> Dict[str, Any]:
+        """Async counterpart of ``run`` — same prompts, same fallbacks."""
+        system_prompt, user_prompt = self._prompts(context)
+        max_tokens = self._output_tokens(context)
+        try:
+            if on_field:
+                result = await self._astream_llm_json(
+                    system_prompt, user_prompt, on_field, max_tokens=max_tokens, schema=self.schema
+                )
+            else:
+                result = await self._acall_llm_json(system_prompt, user_prompt, max_tokens=max_tokens, schema=self.schema)
+            # Malformed model output degrades to the fallback like a failed call.
+            return self._record_model(self._postprocess(result, context))
+        except Exception as e:
+            return self._error_result(context, e)
+
+    def _error_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        result = self._fallback_result(context, error)
+        # Marks degraded output so callers don't cache or reuse it.
+        result["_error"] = str(error)
+        return result
+
+    def _record_model(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        result["_model"] = self._answered_model()
+        return result
+
+    def _answered_model(self) -> str:
+        return _answered_by.get() or self.model
+
+    def _prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
+        """The agent's prompts behind the run's shared prefix, if it reads the transcript."""
+        system_prompt, user_prompt = self._build_prompts(context)
+        if "cleaned_transcript" not in self.requires:
+            return system_prompt, user_prompt
+        prefix = shared_prefix(context, include_format="format_config" in self.requires)
+        return f"{prefix}\n\n{system_prompt}", user_prompt
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         raise NotImplementedError
 
+    def _output_tokens(self, context: Dict[str, Any]) -> int:
+        """Completion tokens to allow for this input (capped per model when sent)."""
+        return self.max_tokens
+
+    def _postprocess(self, result: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        return result
+
+    def settings(self) -> Dict[str, Any]:
+        """Configuration beyond model routing that changes this agent's output
+        (part of its step-memo key).
+        """
+        return {}
+
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        raise error
+
+    def _messages(self, system_prompt: str, user_prompt: str):
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
     def _call_llm(self, system_prompt: str, user_prompt: str, max_tokens: int = 1500) -> str:
-        response = self.client.chat.completions.create(
+        return self._call_messages(self._messages(system_prompt, user_prompt), max_tokens)
+
+    async def _acall_llm(self, system_prompt: str, user_prompt: str, max_tokens: int = 1500) -> str:
+        return await self._acall_messages(self._messages(system_prompt, user_prompt), max_tokens)
+
+    def _call_messages(self, messages, max_tokens: int) -> str:
+        _answered_by.set(None)
+        key = self._cache_key(messages, max_tokens)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return cached
+
+        response = self._create_completion(messages, max_tokens)
+        return self._cache_store(key, response)
+
+    async def _acall_messages(self, messages, max_tokens: int) -> str:
+        _answered_by.set(None)
+        if self.async_client is None:
+            # No async client configured: keep the event loop free anyway.
+            return await asyncio.to_thread(self._call_messages, messages, max_tokens)
+
+        key = self._cache_key(messages, max_tokens)
+        cached = await self._acache_lookup(key)
+        if cached is not None:
+            return cached
+
+        response = await self._acreate_completion(messages, max_tokens)
+        return await self._acache_store_text(key, response.choices[0].message.content, response.choices[0].finish_reason)
+
+    def _create_completion(self, messages, max_tokens: int, stream: bool = False):
+        """Chat completion with retries on transient errors and, once this
+        agent's p95 latency is known, a hedged duplicate for stragglers.
+        Falls back to ``fallback_model`` if the routed model still fails
+        or the prompt does not fit its context window.
+        """
+        try:
+            return self._complete_with(self.model, messages, max_tokens, stream)
+        except (openai.APIError, PromptTooLong):
+            if not self.fallback_model:
+                raise
+            return self._complete_with(self.fallback_model, messages, max_tokens, stream)
+
+    async def _acreate_completion(self, messages, max_tokens: int, stream: bool = False):
+        try:
+            return await self._acomplete_with(self.model, messages, max_tokens, stream)
+        except (openai.APIError, PromptTooLong):
+            if not self.fallback_model:
+                raise
+            return await self._acomplete_with(self.fallback_model, messages, max_tokens, stream)
+
+    def _complete_with(self, model: str, messages, max_tokens: int, stream: bool):
+        delay = None if stream else hedge_delay(self.agent_name)
+        response = call_with_retries(
+            lambda: hedged_call(lambda: self._send_completion(model, messages, max_tokens, stream), delay)
+        )
+        _answered_by.set(model)
+        if not stream:
+            record_usage(self.agent_name, getattr(response, "usage", None))
+        return response
+
+    async def _acomplete_with(self, model: str, messages, max_tokens: int, stream: bool):
+        delay = None if stream else hedge_delay(self.agent_name)
+        response = await acall_with_retries(
+            lambda: ahedged_call(lambda: self._asend_completion(model, messages, max_tokens, stream), delay)
+        )
+        _answered_by.set(model)
+        if not stream:
+            record_usage(self.agent_name, getattr(response, "usage", None))
+        return response
+
+    def _send_completion(self, model: str, messages, max_tokens: int, stream: bool = False):
+        """One paced chat completion through the model's shared rate limiter.
+
+        The prompt is counted first: ``max_tokens`` is fitted to the model's
+        context window, and a prompt that cannot fit is never sent.
+        """
+        prompt_tokens = count_message_tokens(messages, model)
+        max_tokens = fit_max_tokens(model, prompt_tokens, max_tokens)
+        reserved = prompt_tokens + max_tokens
+        limiter = get_rate_limiter(model)
+        if limiter:
+            limiter.acquire(reserved)
+        # Inside a latency budget, never outlive it.
+        timeout = check_deadline()
+        started = time.perf_counter()
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                **self._response_format(model),
+                **self._stream_options(stream),
+                **({"timeout": timeout} if timeout is not None else {}),
+            )
+        except openai.RateLimitError as e:
+            if limiter:
+                limiter.penalize(e.response.headers)
+            raise
+        response = self._observe_completion(limiter, raw, reserved, None if stream else started)
+        return _settled_stream(response, limiter, reserved) if stream and limiter else response
+
+    async def _asend_completion(self, model: str, messages, max_tokens: int, stream: bool = False):
+        prompt_tokens = count_message_tokens(messages, model)
+        max_tokens = fit_max_tokens(model, prompt_tokens, max_tokens)
+        reserved = prompt_tokens + max_tokens
+        limiter = get_rate_limiter(model)
+        if limiter:
+            await limiter.aacquire(reserved)
+        # Inside a latency budget, never outlive it.
+        timeout = check_deadline()
+        started = time.perf_counter()
+        try:
+            raw = await self.async_client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                **self._response_format(model),
+                **self._stream_options(stream),
+                **({"timeout": timeout} if timeout is not None else {}),
+            )
+        except openai.RateLimitError as e:
+            if limiter:
+                limiter.penalize(e.response.headers)
+            raise
+        response = self._observe_completion(limiter, raw, reserved, None if stream else started)
+        return _asettled_stream(response, limiter, reserved) if stream and limiter else response
+
+    @staticmethod
+    def _response_format(model: str) -> Dict[str, Any]:
+        # Every agent prompt asks for a JSON object, as JSON mode requires.
+        if JSON_MODE and model.startswith(_JSON_MODE_MODELS):
+            return {"response_format": {"type": "json_object"}}
+        return {}
+
+    @staticmethod
+    def _stream_options(stream: bool) -> Dict[str, Any]:
+        # Streams only report usage (and cached tokens) when asked to, in a final chunk.
+        return {"stream_options": {"include_usage": True}} if stream else {}
+
+    def _observe_completion(self, limiter, raw, reserved: int, started: Optional[float]):
+        if started is not None:
+            latencies.record(self.agent_name, time.perf_counter() - started)
+        response = raw.parse()
+        if limiter:
+            limiter.observe(raw.headers)
+            if started is not None:
+                # Streams settle from their final chunk (see _settled_stream).
+                limiter.settle(reserved, getattr(getattr(response, "usage", None), "total_tokens", None))
+        return response
+
+    def _cache_key(self, messages, max_tokens: int) -> str:
+        return cache_key(
             model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
             temperature=self.temperature,
             max_tokens=max_tokens,
+            messages=messages,
         )
-        return response.choices[0].message.content.strip()
 
-    def _call_llm_json(self, system_prompt: str, user_prompt: str, max_tokens: int = 1500) -> Dict[str, Any]:
-        raw = self._call_llm(system_prompt, user_prompt, max_tokens)
+    def _cache_lookup(self, key: str) -> Optional[str]:
+        return self.cache.get(key) if self.cache else None
+
+    def _cache_store(self, key: str, response) -> str:
+        return self._cache_store_text(key, response.choices[0].message.content, response.choices[0].finish_reason)
+
+    def _cache_store_text(self, key: str, content: str, finish_reason: Optional[str]) -> str:
+        content = content.strip()
+        if self._cacheable(finish_reason):
+            self.cache.set(key, content)
+        return content
+
+    # The async paths keep the cache's SQLite I/O off the event loop.
+
+    async def _acache_lookup(self, key: str) -> Optional[str]:
+        return await self.cache.aget(key) if self.cache else None
+
+    async def _acache_store_text(self, key: str, content: str, finish_reason: Optional[str]) -> str:
+        content = content.strip()
+        if self._cacheable(finish_reason):
+            await self.cache.aset(key, content)
+        return content
+
+    def _cacheable(self, finish_reason: Optional[str]) -> bool:
+        # Truncated completions are not worth replaying, and fallback-model
+        # answers are not cached under the routed model's key.
+        return bool(self.cache) and finish_reason in (None, "stop") and self._answered_model() == self.model
+
+    def _call_llm_json(
+        self, system_prompt: str, user_prompt: str, max_tokens: int = 1500, schema: Optional[Schema] = None
+    ) -> Dict[str, Any]:
+        """The completion's JSON object.  A reply with prose around it or cut
+        off mid-object is repaired locally, and ``schema`` fields it still
+        lacks are asked for in one follow-up call rather than a full retry.
+        """
+        messages = self._messages(system_prompt, user_prompt)
+        raw = self._call_messages(messages, max_tokens)
+        result = self._parse_cached_json(raw, messages, max_tokens)
+        return self._fill_missing(result, messages, raw, max_tokens, schema)
+
+    async def _acall_llm_json(
+        self, system_prompt: str, user_prompt: str, max_tokens: int = 1500, schema: Optional[Schema] = None
+    ) -> Dict[str, Any]:
+        messages = self._messages(system_prompt, user_prompt)
+        raw = await self._acall_messages(messages, max_tokens)
+        result = await self._aparse_cached_json(raw, messages, max_tokens)
+        return await self._afill_missing(result, messages, raw, max_tokens, schema)
+
+    def _stream_llm_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        on_field: FieldCallback,
+        max_tokens: int = 1500,
+        schema: Optional[Schema] = None,
+    ) -> Dict[str, Any]:
+        """Like ``_call_llm_json`` but streams the completion, reporting each
+        top-level field through ``on_field`` as soon as it has been parsed.
+        """
+        _answered_by.set(None)
+        messages = self._messages(system_prompt, user_prompt)
+        key = self._cache_key(messages, max_tokens)
+        fields = JSONFieldStream()
+        raw = self._cache_lookup(key)
+        if raw is not None:
+            self._report_fields(fields.feed(raw), on_field)
+        else:
+            stream = self._create_completion(messages, max_tokens, stream=True)
+            parts, finish_reason = [], None
+            for chunk in stream:
+                record_usage(self.agent_name, getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                parts.append(delta)
+                self._report_fields(fields.feed(delta), on_field)
+            raw = self._cache_store_text(key, "".join(parts), finish_reason)
+        result = self._parse_cached_json(raw, messages, max_tokens)
+        return self._fill_missing(result, messages, raw, max_tokens, schema, on_field)
+
+    async def _astream_llm_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        on_field: FieldCallback,
+        max_tokens: int = 1500,
+        schema: Optional[Schema] = None,
+    ) -> Dict[str, Any]:
+        _answered_by.set(None)
+        if self.async_client is None:
+            return await asyncio.to_thread(
+                self._stream_llm_json, system_prompt, user_prompt, on_field, max_tokens, schema
+            )
+
+        messages = self._messages(system_prompt, user_prompt)
+        key = self._cache_key(messages, max_tokens)
+        fields = JSONFieldStream()
+        raw = await self._acache_lookup(key)
+        if raw is not None:
+            self._report_fields(fields.feed(raw), on_field)
+        else:
+            stream = await self._acreate_completion(messages, max_tokens, stream=True)
+            parts, finish_reason = [], None
+            async for chunk in stream:
+                record_usage(self.agent_name, getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                parts.append(delta)
+                self._report_fields(fields.feed(delta), on_field)
+            raw = await self._acache_store_text(key, "".join(parts), finish_reason)
+        result = await self._aparse_cached_json(raw, messages, max_tokens)
+        return await self._afill_missing(result, messages, raw, max_tokens, schema, on_field)
+
+    def _report_fields(self, fields, on_field: FieldCallback) -> None:
+        for name, value in fields:
+            try:
+                on_field(name, value)
+            except Exception as e:
+                # A broken consumer must not fail the agent.
+                logger.warning("%s: field callback failed for %r: %s", self.agent_name, name, e)
+
+    def _parse_cached_json(self, raw: str, messages, max_tokens: int) -> Dict[str, Any]:
+        try:
+            return parse_json_object(raw)
+        except ValueError:
+            # Never keep serving a completion that could not be parsed.
+            if self.cache:
+                self.cache.delete(self._cache_key(messages, max_tokens))
+            raise
+
+    async def _aparse_cached_json(self, raw: str, messages, max_tokens: int) -> Dict[str, Any]:
+        try:
+            return parse_json_object(raw)
+        except ValueError:
+            if self.cache:
+                await self.cache.adelete(self._cache_key(messages, max_tokens))
+            raise
+
+    def _fill_missing(
+        self,
+        result: Dict[str, Any],
+        messages,
+        raw: str,
+        max_tokens: int,
+        schema: Optional[Schema],
+        on_field: Optional[FieldCallback] = None,
+    ) -> Dict[str, Any]:
+        """Ask once for the ``schema`` fields ``result`` lacks and merge them in."""
+        missing = missing_fields(result, schema)
+        if not missing:
+            return result
+        followup = self._followup_messages(messages, raw, schema, missing)
+        try:
+            extra = self._parse_cached_json(self._call_messages(followup, max_tokens), followup, max_tokens)
+        except Exception as e:
+            logger.warning("%s: could not complete missing fields %s: %s", self.agent_name, missing, e)
+            extra = {}
+        return self._merge_missing(result, extra, schema, missing, on_field)
+
+    async def _afill_missing(
+        self,
+        result: Dict[str, Any],
+        messages,
+        raw: str,
+        max_tokens: int,
+        schema: Optional[Schema],
+        on_field: Optional[FieldCallback] = None,
+    ) -> Dict[str, Any]:
+        missing = missing_fields(result, schema)
+        if not missing:
+            return result
+        followup = self._followup_messages(messages, raw, schema, missing)
+        try:
+            extra = await self._aparse_cached_json(await self._acall_messages(followup, max_tokens), followup, max_tokens)
+        except Exception as e:
+            logger.warning("%s: could not complete missing fields %s: %s", self.agent_name, missing, e)
+            extra = {}
+        return self._merge_missing(result, extra, schema, missing, on_field)
 
-        if raw.startswith("```json"):
-            raw = raw[len("```json"):].strip()
-        if raw.startswith("```"):
-            raw = raw[len("```"):].strip()
-        if raw.endswith("```"):
-            raw = raw[:-3].strip()
+    @staticmethod
+    def _followup_messages(messages, raw: str, schema: Schema, missing) -> list:
+        """The original exchange plus a request for just the missing fields,
+        so the provider can serve the original prompt from its cache.
+        """
+        outline = json.dumps(schema_outline(schema, missing), indent=2)
+        return messages + [
+            {"role": "assistant", "content": raw},
+            {
+                "role": "user",
+                "content": f"Your answer was cut off or left out these fields: {', '.join(missing)}. "
+                f"Return a JSON object with only those fields, shaped like this (values show the JSON type):\n{outline}",
+            },
+        ]
 
-        return json.loads(raw)
+    def _merge_missing(
+        self,
+        result: Dict[str, Any],
+        extra: Dict[str, Any],
+        schema: Schema,
+        missing,
+        on_field: Optional[FieldCallback],
+    ) -> Dict[str, Any]:
+        fields = dict.fromkeys(path.split(".")[0] for path in missing)
+        result = merge_fields(result, {field: value for field, value in extra.items() if field in fields})
+        if on_field:
+            self._report_fields([(field, result[field]) for field in fields if field in result], on_field)
+        still_missing = missing_fields(result, schema)
+        if still_missing:
+            # Marks degraded output so callers don't cache or reuse it.
+            result["_incomplete"] = still_missing
+        return result
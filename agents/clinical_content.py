@@ -1,21 +1,24 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
 class ClinicalContentAgent(BaseAgent):
     agent_name = "clinical_content"
     agent_description = "Clinical content accuracy and completeness evaluation"
-
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        transcript = context["cleaned_transcript"]
+    schema = {
+        "score": "number",
+        "elements_present": "array",
+        "elements_missing": "array",
+        "terminology_issues": "array",
+        "content_analysis": "string",
+        "service_specific_notes": "string",
+    }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
 
         system_prompt = f"""You are an attending physician evaluating the CLINICAL CONTENT of a medical student's oral presentation.
 
-SERVICE: {service_context['name']}
-SPECIALTY: {service_context['specialty']}
-CLINICAL FOCUS: {service_context['focus']}
-
 EVALUATE:
 1. Medical terminology — accurate and appropriate?
 2. HPI completeness — pertinent positives and negatives included?
@@ -24,7 +27,7 @@ EVALUATE:
 5. Data interpretation — labs, imaging referenced correctly?
 6. Service-specific knowledge — does content reflect understanding of {service_context['name']}?
 
-Required elements for this service: {', '.join(service_context['key_elements'])}
+Judge completeness against the required elements for this service listed above.
 
 Return JSON:
 {{
@@ -38,21 +41,16 @@ Return JSON:
 
 Score 1-10. Be specific — cite examples from the transcript."""
 
-        user_prompt = f"""Evaluate the clinical content of this presentation for {service_context['name']}:
-
-TRANSCRIPT:
-{transcript}"""
+        user_prompt = f"Evaluate the clinical content of the presentation above for {service_context['name']}."
 
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=1500)
-        except Exception as e:
-            result = {
-                "score": 0,
-                "elements_present": [],
-                "elements_missing": [],
-                "terminology_issues": [],
-                "content_analysis": f"Error during clinical content analysis: {e}",
-                "service_specific_notes": "",
-            }
+        return system_prompt, user_prompt
 
-        return result
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "score": 0,
+            "elements_present": [],
+            "elements_missing": [],
+            "terminology_issues": [],
+            "content_analysis": f"Error during clinical content analysis: {error}",
+            "service_specific_notes": "",
+        }
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
@@ -9,15 +9,21 @@ class ClinicalReasoningAgent(BaseAgent):
 
     agent_name = "clinical_reasoning"
     agent_description = "Clinical reasoning, differential diagnosis, and plan coherence evaluation"
+    schema = {
+        "score": "number",
+        "differential_assessment": "string",
+        "summary_statement_quality": "string",
+        "data_selectivity": "string",
+        "plan_coherence": "string",
+        "reasoning_analysis": "string",
+        "reasoning_strengths": "array",
+        "reasoning_gaps": "array",
+    }
 
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        transcript = context["cleaned_transcript"]
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
 
-        system_prompt = f"""You are an attending physician evaluating the CLINICAL REASONING of a medical student's oral presentation.
-
-SERVICE: {service_context['name']}
-SPECIALTY: {service_context['specialty']}
+        system_prompt = """You are an attending physician evaluating the CLINICAL REASONING of a medical student's oral presentation.
 
 EVALUATE:
 1. **Differential Diagnosis**: Appropriate breadth? Most likely diagnosis justified? Dangerous diagnoses considered?
@@ -30,7 +36,7 @@ EVALUATE:
 PLAN COHERENCE is critical — this evaluates whether the COMMUNICATION of the case builds a narrative that makes the plan feel like a natural conclusion. A student can have a correct plan but present the information in a way that doesn't lead the listener there.
 
 Return JSON:
-{{
+{
     "score": 7,
     "differential_assessment": "2-3 sentences evaluating the differential diagnosis",
     "summary_statement_quality": "2-3 sentences on the quality of the problem synthesis/summary statement",
@@ -39,27 +45,22 @@ Return JSON:
     "reasoning_analysis": "4-6 sentence overall analysis of clinical reasoning with specific examples",
     "reasoning_strengths": ["specific strengths in reasoning"],
     "reasoning_gaps": ["specific gaps or weaknesses in reasoning"]
-}}
+}
 
 Score 1-10. Cite specific examples from the transcript."""
 
-        user_prompt = f"""Evaluate the clinical reasoning in this presentation for {service_context['name']}:
-
-TRANSCRIPT:
-{transcript}"""
+        user_prompt = f"Evaluate the clinical reasoning in the presentation above for {service_context['name']}."
 
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=1500)
-        except Exception as e:
-            result = {
-                "score": 0,
-                "differential_assessment": f"Error: {e}",
-                "summary_statement_quality": "",
-                "data_selectivity": "",
-                "plan_coherence": "",
-                "reasoning_analysis": "",
-                "reasoning_strengths": [],
-                "reasoning_gaps": [],
-            }
+        return system_prompt, user_prompt
 
-        return result
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "score": 0,
+            "differential_assessment": f"Error: {error}",
+            "summary_statement_quality": "",
+            "data_selectivity": "",
+            "plan_coherence": "",
+            "reasoning_analysis": "",
+            "reasoning_strengths": [],
+            "reasoning_gaps": [],
+        }
@@ -1,19 +1,25 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
 class CommunicationProfessionalismAgent(BaseAgent):
     agent_name = "communication_professionalism"
     agent_description = "Communication quality and professionalism evaluation"
-
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        transcript = context["cleaned_transcript"]
+    max_tokens = 1200
+    schema = {
+        "score": "number",
+        "audience_adaptation": "string",
+        "patient_centered_language": "string",
+        "language_appropriateness": "string",
+        "confidence_assessment": "string",
+        "communication_strengths": "array",
+        "communication_improvements": "array",
+    }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
 
-        system_prompt = f"""You are an attending physician evaluating the COMMUNICATION and PROFESSIONALISM of a medical student's oral presentation.
-
-SERVICE: {service_context['name']}
-SPECIALTY: {service_context['specialty']}
+        system_prompt = """You are an attending physician evaluating the COMMUNICATION and PROFESSIONALISM of a medical student's oral presentation.
 
 NOTE: This is a transcribed oral presentation. Do NOT penalize for transcription artifacts.
 
@@ -25,7 +31,7 @@ EVALUATE:
 5. **Professional Tone**: Appropriate clinical detachment while maintaining empathy?
 
 Return JSON:
-{{
+{
     "score": 7,
     "audience_adaptation": "2-3 sentences on how well the presentation was calibrated for the audience and setting",
     "patient_centered_language": "2-3 sentences on respectful, person-centered communication",
@@ -33,26 +39,21 @@ Return JSON:
     "confidence_assessment": "2-3 sentences on confidence and assertiveness",
     "communication_strengths": ["specific strengths"],
     "communication_improvements": ["specific actionable improvements"]
-}}
+}
 
 Score 1-10. Cite specific examples from the transcript."""
 
-        user_prompt = f"""Evaluate the communication and professionalism of this presentation for {service_context['name']}:
-
-TRANSCRIPT:
-{transcript}"""
-
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=1200)
-        except Exception as e:
-            result = {
-                "score": 0,
-                "audience_adaptation": f"Error: {e}",
-                "patient_centered_language": "",
-                "language_appropriateness": "",
-                "confidence_assessment": "",
-                "communication_strengths": [],
-                "communication_improvements": [],
-            }
-
-        return result
+        user_prompt = f"Evaluate the communication and professionalism of the presentation above for {service_context['name']}."
+
+        return system_prompt, user_prompt
+
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "score": 0,
+            "audience_adaptation": f"Error: {error}",
+            "patient_centered_language": "",
+            "language_appropriateness": "",
+            "confidence_assessment": "",
+            "communication_strengths": [],
+            "communication_improvements": [],
+        }
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
@@ -14,9 +14,21 @@ class ContrastiveFeedbackAgent(BaseAgent):
 
     agent_name = "contrastive_feedback"
     agent_description = "Targeted before/after rewrites showing how weak sections could be improved"
-
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        transcript = context["cleaned_transcript"]
+    requires = (
+        "cleaned_transcript",
+        "service_context",
+        "clinical_content_result",
+        "clinical_reasoning_result",
+        "structure_delivery_result",
+        "communication_professionalism_result",
+    )
+    max_tokens = 2000
+    schema = {
+        "rewrites": "array",
+        "note": "string",
+    }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
 
         # Gather weakness signals from all agents
@@ -36,9 +48,6 @@ RULES:
 KNOWN WEAKNESSES:
 {weaknesses}
 
-TRANSCRIPT:
-{transcript}
-
 Return JSON:
 {{
     "rewrites": [
@@ -57,15 +66,13 @@ Provide 2-4 rewrites targeting the highest-impact improvements."""
 
         user_prompt = "Generate contrastive before/after rewrites for the weakest sections of this presentation."
 
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=2000)
-        except Exception as e:
-            result = {
-                "rewrites": [],
-                "note": f"Error during contrastive feedback: {e}",
-            }
+        return system_prompt, user_prompt
 
-        return result
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "rewrites": [],
+            "note": f"Error during contrastive feedback: {error}",
+        }
 
     def _collect_weaknesses(self, context: Dict[str, Any]) -> str:
         items = []
@@ -0,0 +1,75 @@
+from typing import Dict, Any, List, Tuple
+from agents.base import BaseAgent
+
+
+class CoreEvaluationAgent(BaseAgent):
+    """Runs the four core evaluators (content, reasoning, structure,
+    communication) as one structured call.
+
+    The prompt is assembled from the evaluators' own prompts, so each of the
+    four results has exactly the schema the separate agent would return and
+    downstream agents consume.  One round trip and one copy of the
+    transcript instead of four; worth it for short formats such as SBAR.
+    """
+
+    agent_name = "core_evaluation"
+    agent_description = "Clinical content, reasoning, structure and communication in a single call"
+    requires = ("cleaned_transcript", "service_context", "format_config")
+    max_tokens = 5000
+
+    def __init__(self, *args, evaluators: List[BaseAgent] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evaluators = list(evaluators)
+
+    @property
+    def provides(self) -> Tuple[str, ...]:
+        return tuple(f"{evaluator.agent_name}_result" for evaluator in self.evaluators)
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        return {evaluator.agent_name: evaluator.schema for evaluator in self.evaluators}
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
+        sections = []
+        for evaluator in self.evaluators:
+            evaluator_prompt, _ = evaluator._build_prompts(context)
+            sections.append(f"=== {evaluator.agent_name} ===\n{evaluator_prompt}")
+        keys = ", ".join(f'"{evaluator.agent_name}": {{...}}' for evaluator in self.evaluators)
+
+        system_prompt = f"""You are a panel of {len(self.evaluators)} attending physicians. Each section below gives one panelist's evaluation task for the presentation above. Complete every evaluation independently, exactly as its section instructs.
+
+{chr(10).join(sections)}
+
+Return a single JSON object with one key per section, each holding the JSON object that section asks for:
+{{{keys}}}"""
+
+        user_prompt = f"Complete all {len(self.evaluators)} evaluations of the presentation above."
+
+        return system_prompt, user_prompt
+
+    def _postprocess(self, result: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        results = {}
+        incomplete = result.get("_incomplete", [])
+        for evaluator in self.evaluators:
+            part = result.get(evaluator.agent_name)
+            if isinstance(part, dict):
+                missing = [path.split(".", 1)[1] for path in incomplete if path.startswith(f"{evaluator.agent_name}.")]
+                if missing:
+                    part["_incomplete"] = missing
+                results[f"{evaluator.agent_name}_result"] = evaluator._postprocess(part, context)
+            else:
+                results[f"{evaluator.agent_name}_result"] = evaluator._error_result(
+                    context, ValueError(f"Fused evaluation returned no {evaluator.agent_name} result")
+                )
+        return results
+
+    def _record_model(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        for part in result.values():
+            part["_model"] = self._answered_model()
+        return result
+
+    def _error_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            f"{evaluator.agent_name}_result": evaluator._error_result(context, error)
+            for evaluator in self.evaluators
+        }
@@ -1,5 +1,5 @@
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
@@ -14,8 +14,22 @@ class DebateAgent(BaseAgent):
 
     agent_name = "debate"
     agent_description = "Inter-agent deliberation between generous and strict evaluator perspectives"
-
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    requires = (
+        "service_context",
+        "clinical_content_result",
+        "clinical_reasoning_result",
+        "structure_delivery_result",
+        "communication_professionalism_result",
+    )
+    max_tokens = 2000
+    schema = {
+        "contested_points": "array",
+        "consensus_strengths": "array",
+        "consensus_weaknesses": "array",
+        "overall_calibration": "string",
+    }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
         agent_summary = self._build_summary(context)
 
@@ -54,17 +68,15 @@ Generate 3-5 contested points. Focus on the most impactful disagreements, not tr
 
         user_prompt = "Conduct the deliberation between generous and strict evaluators based on the agent results above."
 
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=2000)
-        except Exception as e:
-            result = {
-                "contested_points": [],
-                "consensus_strengths": [],
-                "consensus_weaknesses": [],
-                "overall_calibration": f"Error during debate: {e}",
-            }
-
-        return result
+        return system_prompt, user_prompt
+
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "contested_points": [],
+            "consensus_strengths": [],
+            "consensus_weaknesses": [],
+            "overall_calibration": f"Error during debate: {error}",
+        }
 
     def _build_summary(self, context: Dict[str, Any]) -> str:
         sections = []
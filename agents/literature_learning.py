@@ -1,13 +1,18 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
 class LiteratureLearningAgent(BaseAgent):
     agent_name = "literature_learning"
     agent_description = "Teaching points and learning resource identification"
-
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        transcript = context["cleaned_transcript"]
+    requires = ("cleaned_transcript", "service_context", "clinical_reasoning_result")
+    schema = {
+        "teaching_points": "array",
+        "suggested_reading": "array",
+        "case_learning_summary": "string",
+    }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
         # Pull reasoning gaps from the clinical reasoning agent if available
         reasoning_result = context.get("clinical_reasoning_result", {})
@@ -40,18 +45,13 @@ Return JSON:
 
 Provide 3-5 teaching points. Quality over quantity."""
 
-        user_prompt = f"""Based on this presentation for {service_context['name']}, identify key learning opportunities:
-
-TRANSCRIPT:
-{transcript}"""
+        user_prompt = f"Based on the presentation above for {service_context['name']}, identify key learning opportunities."
 
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=1500)
-        except Exception as e:
-            result = {
-                "teaching_points": [],
-                "suggested_reading": [],
-                "case_learning_summary": f"Error during literature analysis: {e}",
-            }
+        return system_prompt, user_prompt
 
-        return result
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "teaching_points": [],
+            "suggested_reading": [],
+            "case_learning_summary": f"Error during literature analysis: {error}",
+        }
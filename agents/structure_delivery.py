@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
@@ -10,27 +10,30 @@ class StructureDeliveryAgent(BaseAgent):
 
     agent_name = "structure_delivery"
     agent_description = "Presentation structure, format conformance, and information efficiency"
-
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        transcript = context["cleaned_transcript"]
+    requires = ("cleaned_transcript", "service_context", "format_config")
+    schema = {
+        "score": "number",
+        "format_conformance": "string",
+        "sections_present": "array",
+        "sections_missing": "array",
+        "organization_flow": "string",
+        "semantic_density": {
+            "analysis": "string",
+            "over_represented": "array",
+            "under_represented": "array",
+            "efficiency_rating": "string",
+        },
+        "delivery_notes": "string",
+        "structure_strengths": "array",
+        "structure_improvements": "array",
+    }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
-        format_config = context.get("format_config", {})
-
-        format_name = format_config.get("name", "Full H&P")
-        expected_sections = format_config.get("expected_sections", [])
-        time_expectation = format_config.get("time_expectation", "5-8 minutes")
-        evaluation_focus = format_config.get("evaluation_focus", [])
+        format_name = context.get("format_config", {}).get("name", "Full H&P")
 
         system_prompt = f"""You are an attending physician evaluating the STRUCTURE and DELIVERY of a medical student's oral presentation.
 
-SERVICE: {service_context['name']}
-SPECIALTY: {service_context['specialty']}
-
-PRESENTATION FORMAT: {format_name}
-EXPECTED SECTIONS: {', '.join(expected_sections) if expected_sections else 'Standard H&P format'}
-TIME EXPECTATION: {time_expectation}
-FORMAT-SPECIFIC EVALUATION FOCUS: {', '.join(evaluation_focus) if evaluation_focus else 'Standard organization and flow'}
-
 EVALUATE:
 
 1. **Format Conformance**: Did the student follow the expected {format_name} format? Were all expected sections present and in appropriate order?
@@ -63,29 +66,24 @@ Return JSON:
 
 Score 1-10. Cite specific examples."""
 
-        user_prompt = f"""Evaluate the structure and delivery of this {format_name} presentation for {service_context['name']}:
-
-TRANSCRIPT:
-{transcript}"""
-
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=1500)
-        except Exception as e:
-            result = {
-                "score": 0,
-                "format_conformance": f"Error: {e}",
-                "sections_present": [],
-                "sections_missing": [],
-                "organization_flow": "",
-                "semantic_density": {
-                    "analysis": "",
-                    "over_represented": [],
-                    "under_represented": [],
-                    "efficiency_rating": "unknown",
-                },
-                "delivery_notes": "",
-                "structure_strengths": [],
-                "structure_improvements": [],
-            }
-
-        return result
+        user_prompt = f"Evaluate the structure and delivery of the {format_name} presentation above for {service_context['name']}."
+
+        return system_prompt, user_prompt
+
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "score": 0,
+            "format_conformance": f"Error: {error}",
+            "sections_present": [],
+            "sections_missing": [],
+            "organization_flow": "",
+            "semantic_density": {
+                "analysis": "",
+                "over_represented": [],
+                "under_represented": [],
+                "efficiency_rating": "unknown",
+            },
+            "delivery_notes": "",
+            "structure_strengths": [],
+            "structure_improvements": [],
+        }
@@ -1,8 +1,11 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import json
 from agents.base import BaseAgent
 
 
+_SELECTION_SCHEMA = {"candidates": "array", "best_candidate": "number"}
+
+
 class SynthesisCriticAgent(BaseAgent):
     """Reviews the synthesizer's output for internal contradictions, vague
     advice, and missed priorities.  If issues are found, the synthesizer
@@ -11,8 +14,14 @@ class SynthesisCriticAgent(BaseAgent):
 
     agent_name = "synthesis_critic"
     agent_description = "Reviews synthesized feedback for contradictions, vagueness, and missed priorities"
+    requires = ("synthesis", "agent_results_summary")
+    schema = {
+        "issues_found": "array",
+        "is_acceptable": "boolean",
+        "revision_instructions": "string",
+    }
 
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         synthesis = context["synthesis"]
         agent_results = context.get("agent_results_summary", "")
 
@@ -47,13 +56,99 @@ Be strict. Students deserve feedback that is internally consistent and genuinely
 
         user_prompt = f"Review this synthesis for quality:\n\n{json.dumps(synthesis, indent=2)}"
 
+        return system_prompt, user_prompt
+
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "issues_found": [],
+            "is_acceptable": True,
+            "revision_instructions": f"Error during critique: {error}",
+        }
+
+    # -- Candidate selection -----------------------------------------------
+    #
+    # With several synthesis candidates generated in parallel, the critic
+    # scores them all in one call and picks the best instead of asking for a
+    # revision.  The result keeps the critic's shape (with the chosen
+    # candidate's issues) plus every candidate's score.
+
+    def select(self, context: Dict[str, Any], candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        system_prompt, user_prompt = self._selection_prompts(context, candidates)
         try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=1500)
+            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=self.max_tokens, schema=_SELECTION_SCHEMA)
         except Exception as e:
-            result = {
-                "issues_found": [],
-                "is_acceptable": True,
-                "revision_instructions": f"Error during critique: {e}",
-            }
+            return self._selection_result({}, len(candidates), e)
+        return self._record_model(self._selection_result(result, len(candidates)))
+
+    async def aselect(self, context: Dict[str, Any], candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        system_prompt, user_prompt = self._selection_prompts(context, candidates)
+        try:
+            result = await self._acall_llm_json(
+                system_prompt, user_prompt, max_tokens=self.max_tokens, schema=_SELECTION_SCHEMA
+            )
+        except Exception as e:
+            return self._selection_result({}, len(candidates), e)
+        return self._record_model(self._selection_result(result, len(candidates)))
+
+    def _selection_prompts(self, context: Dict[str, Any], candidates: List[Dict[str, Any]]) -> Tuple[str, str]:
+        agent_results = context.get("agent_results_summary", "")
 
-        return result
+        system_prompt = f"""You are a quality reviewer for medical education feedback. Several candidate feedback reports were written independently from the same specialist evaluations of a medical student's presentation. Pick the one the student should receive.
+
+SCORE EACH CANDIDATE 1-10, penalizing:
+1. CONTRADICTIONS: one section praises something another section criticizes
+2. VAGUE ADVICE: generic "areas for improvement" instead of specific, actionable ones
+3. MISSED PRIORITIES: an important finding from the evaluations buried or omitted
+4. TONE INCONSISTENCY: tone that does not match the actual assessment
+
+ORIGINAL AGENT EVALUATIONS (for reference):
+{agent_results}
+
+Return JSON:
+{{
+    "candidates": [
+        {{
+            "candidate": 1,
+            "score": 7,
+            "issues_found": [
+                {{
+                    "type": "contradiction | vague_advice | missed_priority | tone_inconsistency",
+                    "description": "what the problem is",
+                    "location": "which field(s) in the synthesis are affected",
+                    "suggested_fix": "how to resolve it"
+                }}
+            ]
+        }}
+    ],
+    "best_candidate": 1
+}}
+
+Score every candidate. "best_candidate" is the number of the highest-scoring one."""
+
+        sections = [f"CANDIDATE {i}:\n{json.dumps(candidate, ensure_ascii=False)}" for i, candidate in enumerate(candidates, 1)]
+        user_prompt = "Score these feedback reports and pick the best:\n\n" + "\n\n".join(sections)
+
+        return system_prompt, user_prompt
+
+    @staticmethod
+    def _selection_result(result: Dict[str, Any], count: int, error: Optional[Exception] = None) -> Dict[str, Any]:
+        scored = [entry for entry in result.get("candidates") or [] if isinstance(entry, dict)]
+        best = result.get("best_candidate")
+        if not isinstance(best, int) or not 1 <= best <= count:
+            numbered = [entry for entry in scored if isinstance(entry.get("score"), (int, float))]
+            best = max(numbered, key=lambda entry: entry["score"]).get("candidate", 1) if numbered else 1
+            best = best if isinstance(best, int) and 1 <= best <= count else 1
+        chosen = next((entry for entry in scored if entry.get("candidate") == best), {})
+        selection = {
+            "issues_found": chosen.get("issues_found") or [],
+            "is_acceptable": True,
+            "revision_instructions": "No revision needed.",
+            "candidate_scores": [
+                {"candidate": entry.get("candidate"), "score": entry.get("score")} for entry in scored
+            ],
+            "selected_candidate": best,
+        }
+        if error is not None:
+            # Marks degraded output so callers don't cache or reuse it.
+            selection["_error"] = str(error)
+        return selection
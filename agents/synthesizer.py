@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from agents.base import BaseAgent
 
 
@@ -9,8 +9,35 @@ class SynthesizerAgent(BaseAgent):
 
     agent_name = "synthesizer"
     agent_description = "Synthesizes all agent outputs into cohesive attending-level feedback"
-
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    requires = (
+        "service_context",
+        "format_config",
+        "clinical_content_result",
+        "clinical_reasoning_result",
+        "structure_delivery_result",
+        "communication_professionalism_result",
+        "anticipatory_reasoning_result",
+        "literature_learning_result",
+        "debate_result",
+    )
+    max_tokens = 2500
+    schema = {
+        "overall_score": "number",
+        "overall_assessment": "string",
+        "clinical_content": "string",
+        "clinical_reasoning": "string",
+        "presentation_structure": "string",
+        "communication_professionalism": "string",
+        "service_specific_feedback": "string",
+        "strengths": "array",
+        "areas_for_improvement": "array",
+        "teaching_points": "array",
+        "suggested_reading": "array",
+        "semantic_density_summary": "string",
+        "plan_coherence_summary": "string",
+    }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         service_context = context["service_context"]
         format_config = context.get("format_config", {})
 
@@ -71,18 +98,22 @@ The overall_score must be an integer 1-10. Be honest but constructive."""
 
         user_prompt = "Synthesize the agent evaluations above into a single cohesive feedback report."
 
-        try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=2500)
-            # Ensure score is valid integer
-            result["overall_score"] = self._clean_score(result.get("overall_score", 7))
-        except Exception as e:
-            result = self._create_fallback_synthesis(
-                content_result, reasoning_result, structure_result,
-                communication_result, str(e)
-            )
+        return system_prompt, user_prompt
 
+    def _postprocess(self, result: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        # Ensure score is valid integer
+        result["overall_score"] = self._clean_score(result.get("overall_score", 7))
         return result
 
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return self._create_fallback_synthesis(
+            context.get("clinical_content_result", {}),
+            context.get("clinical_reasoning_result", {}),
+            context.get("structure_delivery_result", {}),
+            context.get("communication_professionalism_result", {}),
+            str(error),
+        )
+
     def _compile_debate_summary(self, debate: Dict[str, Any]) -> str:
         if not debate or not debate.get("contested_points"):
             return ""
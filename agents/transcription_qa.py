@@ -1,5 +1,137 @@
-from typing import Dict, Any
-from agents.base import BaseAgent
+import asyncio
+import contextvars
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Tuple
+from agents.base import BaseAgent, FieldCallback
+from token_usage import count_tokens
+
+
+_SENTENCE_SEPARATOR = re.compile(r"(?<=[.!?])(\s+)")
+
+# Transcripts longer than this are cleaned in chunks of about this many
+# tokens, concurrently; each chunk sees this many neighbouring sentences on
+# either side as read-only context.  Chunks well below the model's output
+# limit only add per-call overhead and cut context, so this stays large.
+CHUNK_TOKENS = int(os.getenv("QA_CHUNK_TOKENS", "3000"))
+CHUNK_OVERLAP_SENTENCES = int(os.getenv("QA_CHUNK_OVERLAP_SENTENCES", "1"))
+
+_QUALITY_SCORES = {"poor": 0, "fair": 1, "good": 2}
+
+# "full" returns the whole cleaned transcript; "edits" returns only span-level
+# edits, which are applied locally (see apply_edits).
+OUTPUT_MODE = os.getenv("QA_OUTPUT_MODE", "full")
+
+_CLEANUP_SCHEMA = {
+    "cleaned_transcript": "string",
+    "corrections_made": "array",
+    "unclear_segments": "array",
+    "transcript_quality": "string",
+}
+_EDITS_SCHEMA = {"edits": "array", "transcript_quality": "string"}
+_SEGMENTS_SCHEMA = {"segments": "array"}
+
+_RULES = """RULES:
+1. Fix obvious speech-to-text errors in medical terminology (e.g., "hyper tension" -> "hypertension", "bee pap" -> "BiPAP")
+2. Do NOT change the student's actual words, reasoning, or medical content
+3. Do NOT add information that wasn't said
+4. Flag segments that seem garbled or unclear as [UNCLEAR]
+5. Preserve filler words and speech patterns — they are relevant for delivery analysis"""
+
+
+def split_separated(text: str) -> List[Tuple[str, str]]:
+    """Split ``text`` into (sentence, whitespace after it) pairs, so the
+    original line and paragraph breaks can be restored.
+    """
+    parts = _SENTENCE_SEPARATOR.split(text.strip())
+    return [(sentence, separator) for sentence, separator in zip(parts[0::2], parts[1::2] + [""]) if sentence]
+
+
+def _join_separated(sentences: List[Tuple[str, str]]) -> str:
+    return "".join(sentence + separator for sentence, separator in sentences[:-1]) + (
+        sentences[-1][0] if sentences else ""
+    )
+
+
+def chunk_sentences(sentences: List[Tuple[str, str]], max_tokens: int, overlap: int) -> List[Tuple[str, str, str, str]]:
+    """Group (sentence, separator) pairs into (context before, text, context
+    after, separator after the text) chunks of roughly ``max_tokens`` tokens
+    each, never splitting a sentence.
+    """
+    groups, current, size = [], [], 0
+    for index, (sentence, _) in enumerate(sentences):
+        tokens = count_tokens(sentence)
+        if current and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += tokens
+    if current:
+        groups.append(current)
+
+    return [
+        (
+            _join_separated(sentences[max(0, group[0] - overlap):group[0]]),
+            _join_separated(sentences[group[0]:group[-1] + 1]),
+            _join_separated(sentences[group[-1] + 1:group[-1] + 1 + overlap]),
+            sentences[group[-1]][1],
+        )
+        for group in groups
+    ]
+
+
+def apply_edits(text: str, edits: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Apply span-level edits to ``text``.  Returns (edited text, applied
+    edits with their offsets, rejected edits).
+
+    Each edit's ``original`` must occur verbatim in ``text``.  Edits are
+    matched in order, each after the previous one, falling back to the first
+    occurrence that does not overlap an edit already applied; edits whose
+    original cannot be placed are rejected rather than guessed at, as are
+    edits whose ``original`` or ``replacement`` is not a string.  Unclear
+    spans keep their text and are flagged with an [UNCLEAR] marker.
+    """
+    spans, rejected = [], []
+    cursor = 0
+    for edit in edits:
+        original = edit.get("original") if isinstance(edit, dict) else None
+        if not isinstance(original, str) or not original:
+            rejected.append(edit)
+            continue
+        if not isinstance(edit.get("replacement", original), (str, type(None))):
+            rejected.append(edit)
+            continue
+        start = text.find(original, cursor)
+        if start < 0:
+            start = next(
+                (
+                    match.start() for match in re.finditer(re.escape(original), text)
+                    if all(match.end() <= s or match.start() >= e for s, e, _ in spans)
+                ),
+                -1,
+            )
+        end = start + len(original)
+        if start < 0 or any(start < e and end > s for s, e, _ in spans):
+            rejected.append(edit)
+            continue
+        spans.append((start, end, edit))
+        cursor = end
+
+    applied, parts, position = [], [], 0
+    for start, end, edit in sorted(spans, key=lambda span: span[0]):
+        replacement = edit.get("replacement")
+        if replacement is None:
+            replacement = edit["original"]
+        unclear = bool(edit.get("unclear"))
+        parts.append(text[position:start])
+        parts.append(f"{replacement} [UNCLEAR]" if unclear else replacement)
+        position = end
+        applied.append({"original": edit["original"], "replacement": replacement, "unclear": unclear, "start": start})
+    parts.append(text[position:])
+    return "".join(parts), applied, rejected
 
 
 class TranscriptionQAAgent(BaseAgent):
@@ -9,40 +141,366 @@ class TranscriptionQAAgent(BaseAgent):
 
     agent_name = "transcription_qa"
     agent_description = "Transcription quality assurance and cleanup"
+    requires = ("transcript",)
+    max_tokens = 2000
+    output_mode = OUTPUT_MODE
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        return _EDITS_SCHEMA if self.output_mode == "edits" else _CLEANUP_SCHEMA
 
-    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "output_mode": self.output_mode,
+            "chunk_tokens": CHUNK_TOKENS,
+            "chunk_overlap_sentences": CHUNK_OVERLAP_SENTENCES,
+        }
+
+    def _build_prompts(self, context: Dict[str, Any]) -> Tuple[str, str]:
         transcript = context["transcript"]
+        if self.output_mode == "edits":
+            return self._edit_prompts(transcript)
 
-        system_prompt = """You are a medical transcription QA specialist. Your job is to clean up a speech-to-text transcript of a medical student's oral presentation.
+        system_prompt = f"""You are a medical transcription QA specialist. Your job is to clean up a speech-to-text transcript of a medical student's oral presentation.
 
-RULES:
-1. Fix obvious speech-to-text errors in medical terminology (e.g., "hyper tension" -> "hypertension", "bee pap" -> "BiPAP")
-2. Do NOT change the student's actual words, reasoning, or medical content
-3. Do NOT add information that wasn't said
-4. Flag segments that seem garbled or unclear as [UNCLEAR]
-5. Preserve filler words and speech patterns — they are relevant for delivery analysis
+{_RULES}
 
 Return JSON:
-{
+{{
     "cleaned_transcript": "the cleaned transcript text",
     "corrections_made": ["list of corrections: 'original' -> 'corrected'"],
     "unclear_segments": ["list of segments that could not be confidently interpreted"],
     "transcript_quality": "good | fair | poor"
-}"""
+}}"""
 
         user_prompt = f"""Clean up this medical presentation transcript:
 
 {transcript}"""
 
+        return system_prompt, user_prompt
+
+    # -- Chunked cleanup ----------------------------------------------------
+    #
+    # Returning a long transcript inside one JSON string is the slowest call
+    # of the pipeline and blocks every other agent.  Long transcripts are
+    # instead cut at sentence boundaries, the chunks are cleaned concurrently,
+    # and the cleaned chunks are joined back in order.
+
+    def run(self, context: Dict[str, Any], on_field: Optional[FieldCallback] = None) -> Dict[str, Any]:
+        chunks = [] if self.output_mode == "edits" else self._chunks(context["transcript"])
+        if len(chunks) < 2:
+            return super().run(context, on_field)
+        with ThreadPoolExecutor(max_workers=len(chunks), thread_name_prefix="qa-chunk") as pool:
+            # Copy the context so the run's deadline and usage ledger apply in each chunk.
+            futures = [pool.submit(contextvars.copy_context().run, self._clean_chunk, chunk) for chunk in chunks]
+            parts = [future.result() for future in futures]
+        return self._stitch(parts, [chunk[3] for chunk in chunks])
+
+    async def arun(self, context: Dict[str, Any], on_field: Optional[FieldCallback] = None) -> Dict[str, Any]:
+        chunks = [] if self.output_mode == "edits" else self._chunks(context["transcript"])
+        if len(chunks) < 2:
+            return await super().arun(context, on_field)
+        parts = await asyncio.gather(*(self._aclean_chunk(chunk) for chunk in chunks))
+        return self._stitch(list(parts), [chunk[3] for chunk in chunks])
+
+    @staticmethod
+    def _chunks(transcript: str) -> List[Tuple[str, str, str, str]]:
+        if count_tokens(transcript) <= CHUNK_TOKENS:
+            return []
+        return chunk_sentences(split_separated(transcript), CHUNK_TOKENS, CHUNK_OVERLAP_SENTENCES)
+
+    def _clean_chunk(self, chunk: Tuple[str, str, str, str]) -> Dict[str, Any]:
         try:
-            result = self._call_llm_json(system_prompt, user_prompt, max_tokens=2000)
-        except Exception:
-            # If parsing fails, pass through the original transcript
-            result = {
-                "cleaned_transcript": transcript,
-                "corrections_made": [],
-                "unclear_segments": [],
-                "transcript_quality": "unknown",
-            }
+            cleaned = self._call_llm_json(
+                *self._chunk_prompts(chunk), max_tokens=self._segment_max_tokens([chunk[1]]), schema=_CLEANUP_SCHEMA
+            )
+        except Exception as e:
+            return {"cleaned_transcript": chunk[1], "_error": str(e)}
+        return self._checked_chunk(cleaned, chunk)
+
+    async def _aclean_chunk(self, chunk: Tuple[str, str, str, str]) -> Dict[str, Any]:
+        try:
+            cleaned = await self._acall_llm_json(
+                *self._chunk_prompts(chunk), max_tokens=self._segment_max_tokens([chunk[1]]), schema=_CLEANUP_SCHEMA
+            )
+        except Exception as e:
+            return {"cleaned_transcript": chunk[1], "_error": str(e)}
+        return self._checked_chunk(cleaned, chunk)
+
+    def _checked_chunk(self, cleaned: Dict[str, Any], chunk: Tuple[str, str, str, str]) -> Dict[str, Any]:
+        if not isinstance(cleaned.get("cleaned_transcript"), str):
+            # Never drop a chunk's text because its cleanup came back without it.
+            return {"cleaned_transcript": chunk[1], "_error": "chunk cleanup returned no transcript"}
+        cleaned["_model"] = self._answered_model()
+        return cleaned
 
+    def _chunk_prompts(self, chunk: Tuple[str, str, str, str]) -> Tuple[str, str]:
+        before, text, after, _ = chunk
+        system_prompt = f"""You are a medical transcription QA specialist. Your job is to clean up one excerpt of a speech-to-text transcript of a medical student's oral presentation. The sentences just before and after the excerpt are given for context only — do not clean or return them.
+
+{_RULES}
+
+Return JSON:
+{{
+    "cleaned_transcript": "the cleaned excerpt text only",
+    "corrections_made": ["list of corrections: 'original' -> 'corrected'"],
+    "unclear_segments": ["list of segments that could not be confidently interpreted"],
+    "transcript_quality": "good | fair | poor"
+}}"""
+
+        user_prompt = f"""CONTEXT BEFORE (do not return):
+{before or "(start of presentation)"}
+
+EXCERPT TO CLEAN:
+{text}
+
+CONTEXT AFTER (do not return):
+{after or "(end of presentation)"}"""
+
+        return system_prompt, user_prompt
+
+    def _stitch(self, parts: List[Dict[str, Any]], separators: List[str]) -> Dict[str, Any]:
+        """Join cleaned chunks in transcript order, each followed by the
+        whitespace that followed it in the transcript.  Quality is the
+        length-weighted average of the chunks' ratings.
+        """
+        texts = [part.get("cleaned_transcript") or "" for part in parts]
+        weighted = [
+            (_QUALITY_SCORES[part["transcript_quality"]], len(text.split()))
+            for part, text in zip(parts, texts)
+            if part.get("transcript_quality") in _QUALITY_SCORES
+        ]
+        quality = "unknown"
+        total_words = sum(words for _, words in weighted)
+        if total_words:
+            score = round(sum(score * words for score, words in weighted) / total_words)
+            quality = next(name for name, value in _QUALITY_SCORES.items() if value == score)
+
+        result = {
+            "cleaned_transcript": "".join(
+                text.strip() + separator for text, separator in zip(texts, separators) if text.strip()
+            ).strip(),
+            "corrections_made": [c for part in parts for c in part.get("corrections_made", [])],
+            "unclear_segments": [u for part in parts for u in part.get("unclear_segments", [])],
+            "transcript_quality": quality,
+            "_chunks": len(parts),
+            "_model": ", ".join(sorted({part["_model"] for part in parts if "_model" in part})) or self.model,
+        }
+        errors = [part["_error"] for part in parts if "_error" in part]
+        errors += [f"incomplete output: {part['_incomplete']}" for part in parts if "_incomplete" in part]
+        if errors:
+            # Failed chunks pass through uncleaned; mark the result as degraded.
+            result["_error"] = f"{len(errors)} of {len(parts)} chunks failed: {errors[0]}"
         return result
+
+    def _output_tokens(self, context: Dict[str, Any]) -> int:
+        tokens = count_tokens(context["transcript"], self.model)
+        if self.output_mode == "edits":
+            # Edits cover a small fraction of the transcript.
+            return 400 + int(0.3 * tokens)
+        # The whole transcript comes back cleaned, plus the corrections list.
+        return max(self.max_tokens, 500 + int(1.3 * tokens))
+
+    # -- Edit-list output -----------------------------------------------------
+    #
+    # Most of a cleaned transcript is unchanged, so in "edits" mode the model
+    # returns only what it would change and the transcript is rebuilt here.
+    # Every edit is checked against the raw transcript and kept in the result
+    # (with its offset), so the cleanup can be audited.
+
+    def _edit_prompts(self, transcript: str) -> Tuple[str, str]:
+        system_prompt = f"""You are a medical transcription QA specialist. Your job is to review a speech-to-text transcript of a medical student's oral presentation and list the edits needed to clean it up.
+
+{_RULES}
+
+Do NOT return the transcript. Return only the edits, in transcript order, one per occurrence. Copy each "original" exactly from the transcript — a few words, enough to be unambiguous. "replacement" is the corrected text. For a garbled or unclear span, set "unclear" to true and repeat the original as the replacement; it will be flagged [UNCLEAR] for you.
+
+Return JSON:
+{{
+    "edits": [
+        {{"original": "exact text from the transcript", "replacement": "corrected text", "unclear": false}}
+    ],
+    "transcript_quality": "good | fair | poor"
+}}"""
+
+        user_prompt = f"""List the cleanup edits for this medical presentation transcript:
+
+{transcript}"""
+
+        return system_prompt, user_prompt
+
+    def _postprocess(self, result: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        if self.output_mode != "edits":
+            return result
+        edits = result.get("edits")
+        cleaned, applied, rejected = apply_edits(context["transcript"], edits if isinstance(edits, list) else [])
+        processed = {
+            "cleaned_transcript": cleaned,
+            "corrections_made": [
+                f"'{edit['original']}' -> '{edit['replacement']}'"
+                for edit in applied if not edit["unclear"] and edit["original"] != edit["replacement"]
+            ],
+            "unclear_segments": [edit["original"] for edit in applied if edit["unclear"]],
+            "transcript_quality": result.get("transcript_quality", "unknown"),
+            "edits": applied,
+        }
+        if rejected:
+            processed["_rejected_edits"] = rejected
+        return processed
+
+    def _fallback_result(self, context: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        # If parsing fails, pass through the original transcript
+        return {
+            "cleaned_transcript": context["transcript"],
+            "corrections_made": [],
+            "unclear_segments": [],
+            "transcript_quality": "unknown",
+        }
+
+    # -- Incremental re-cleaning -------------------------------------------
+    #
+    # After a student edits an already-analyzed transcript, only the sentences
+    # they touched are sent back for cleanup and spliced into the previous
+    # cleaned transcript.  Returns None whenever the edit cannot be mapped onto
+    # the previous cleanup; the caller then runs a full QA pass.
+
+    def reclean(
+        self, transcript: str, previous_transcript: str, previous_result: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        plan = self._plan_reclean(transcript, previous_transcript, previous_result)
+        if plan is None:
+            return None
+        segments = [text for _, _, text, _ in plan[1] if text]
+        if not segments:
+            return self._apply_reclean(plan, [], previous_result)
+        try:
+            cleaned = self._call_llm_json(
+                *self._segment_prompts(segments), max_tokens=self._segment_max_tokens(segments), schema=_SEGMENTS_SCHEMA
+            )
+        except Exception:
+            return None
+        return self._apply_reclean(plan, cleaned.get("segments", []), previous_result)
+
+    async def areclean(
+        self, transcript: str, previous_transcript: str, previous_result: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        plan = self._plan_reclean(transcript, previous_transcript, previous_result)
+        if plan is None:
+            return None
+        segments = [text for _, _, text, _ in plan[1] if text]
+        if not segments:
+            return self._apply_reclean(plan, [], previous_result)
+        try:
+            cleaned = await self._acall_llm_json(
+                *self._segment_prompts(segments), max_tokens=self._segment_max_tokens(segments), schema=_SEGMENTS_SCHEMA
+            )
+        except Exception:
+            return None
+        return self._apply_reclean(plan, cleaned.get("segments", []), previous_result)
+
+    def _plan_reclean(self, transcript: str, previous_transcript: str, previous_result: Dict[str, Any]):
+        """Map each edited run of raw sentences onto the previous cleaned
+        sentences it produced.  Yields (cleaned (sentence, separator) pairs,
+        [(start, end, new raw text, (separator before, separator after))]),
+        the separators being the new transcript's whitespace around the run.
+        """
+        if "_error" in previous_result or not previous_result.get("cleaned_transcript"):
+            return None
+
+        old_raw = [sentence for sentence, _ in split_separated(previous_transcript)]
+        new_separated = split_separated(transcript)
+        new_raw = [sentence for sentence, _ in new_separated]
+        cleaned = split_separated(previous_result["cleaned_transcript"])
+        if not old_raw:
+            return None
+
+        # Cleanup normally edits words inside sentences, so raw and cleaned
+        # sentences align 1:1; blocks where QA merged or split sentences stay unmapped.
+        mapping = {}
+        cleaned_text = [sentence for sentence, _ in cleaned]
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_raw, cleaned_text, autojunk=False).get_opcodes():
+            if tag in ("equal", "replace") and i2 - i1 == j2 - j1:
+                mapping.update({i1 + k: j1 + k for k in range(i2 - i1)})
+
+        edits = []
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_raw, new_raw, autojunk=False).get_opcodes():
+            if tag == "equal":
+                continue
+            if i1 < i2:
+                span = [mapping.get(i) for i in range(i1, i2)]
+                if None in span or span != list(range(span[0], span[0] + len(span))):
+                    return None
+                start, end = span[0], span[-1] + 1
+            elif i1 in mapping:
+                start = end = mapping[i1]
+            elif i1 == len(old_raw) and (i1 - 1) in mapping:
+                start = end = mapping[i1 - 1] + 1
+            else:
+                return None
+            layout = (new_separated[j1 - 1][1] if j1 else None, new_separated[j2 - 1][1] if j1 < j2 else None)
+            edits.append((start, end, _join_separated(new_separated[j1:j2]), layout))
+
+        return cleaned, edits
+
+    def _segment_prompts(self, segments: List[str]) -> Tuple[str, str]:
+        system_prompt = f"""You are a medical transcription QA specialist. A medical student corrected parts of a speech-to-text transcript of their oral presentation. Clean up each corrected excerpt.
+
+{_RULES}
+
+Return JSON with exactly one entry per excerpt, in the same order:
+{{
+    "segments": [
+        {{
+            "cleaned": "the cleaned excerpt text",
+            "corrections_made": ["list of corrections: 'original' -> 'corrected'"],
+            "unclear_segments": ["parts of this excerpt that could not be confidently interpreted"]
+        }}
+    ]
+}}"""
+
+        user_prompt = f"""Clean up these {len(segments)} transcript excerpts:
+
+{json.dumps(segments, indent=2, ensure_ascii=False)}"""
+
+        return system_prompt, user_prompt
+
+    def _segment_max_tokens(self, segments: List[str]) -> int:
+        return 300 + int(1.5 * count_tokens(" ".join(segments), self.model))
+
+    def _apply_reclean(self, plan, cleaned_segments: List[Dict[str, Any]], previous_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        sentences, edits = plan
+        if len(cleaned_segments) != sum(1 for _, _, text, _ in edits if text):
+            return None
+
+        replacements = iter(cleaned_segments)
+        corrections, unclear = [], []
+        patched = []
+        for start, end, text, (before, after) in edits:
+            if not text:
+                patched.append((start, end, [], before))
+                continue
+            segment = next(replacements)
+            cleaned = segment.get("cleaned")
+            patched.append((start, end, [((cleaned if isinstance(cleaned, str) else "") or text, after)], before))
+            corrections.extend(segment.get("corrections_made", []))
+            unclear.extend(segment.get("unclear_segments", []))
+
+        # Each patched run takes the transcript's own line and paragraph
+        # breaks around it, as a full clean would.
+        sentences = list(sentences)
+        for start, end, replacement, before in reversed(patched):
+            sentences[start:end] = replacement
+            if before is not None and start:
+                sentences[start - 1] = (sentences[start - 1][0], before)
+        cleaned_transcript = _join_separated(sentences).strip()
+
+        return {
+            "cleaned_transcript": cleaned_transcript,
+            "corrections_made": previous_result.get("corrections_made", []) + corrections,
+            "unclear_segments": [
+                u for u in previous_result.get("unclear_segments", []) if u in cleaned_transcript
+            ] + unclear,
+            "transcript_quality": previous_result.get("transcript_quality", "unknown"),
+            "_recleaned_segments": len(cleaned_segments),
+            "_model": self._answered_model() if cleaned_segments else previous_result.get("_model", self.model),
+        }
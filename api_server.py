@@ -9,22 +9,52 @@ Run with: uvicorn api_server:app --host 0.0.0.0 --port 8000 --reload
 
 import os
 import json
-from typing import AsyncGenerator
+import asyncio
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncGenerator, Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from pipeline import FeedbackPipeline
 from feedback_generator import FeedbackGenerator
+from llm_clients import awarm_clients
+from llm_cache import get_llm_cache
+from rate_limiter import rate_limiter_stats
 
 load_dotenv()
 
+
+@lru_cache(maxsize=None)
+def get_feedback_generator() -> FeedbackGenerator:
+    """Process-wide generator (service contexts + legacy path)."""
+    return FeedbackGenerator(provider="OpenAI")
+
+
+@lru_cache(maxsize=None)
+def get_pipeline() -> FeedbackPipeline:
+    """Process-wide pipeline; agents are stateless and share pooled clients."""
+    return FeedbackPipeline(provider="OpenAI")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay connection setup once at startup, not on the first analysis.
+    if os.getenv("OPENAI_API_KEY"):
+        await awarm_clients(["OpenAI"])
+    yield
+
+
 app = FastAPI(
     title="PresentIQ API",
     description="Multi-agent feedback pipeline for medical presentations",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Enable CORS for local development
@@ -37,95 +67,227 @@ app.add_middleware(
 )
 
 
+class AnalysisLimiter:
+    """Admission control for pipeline runs.
+
+    At most ``max_concurrent`` analyses run at once; up to ``max_queued``
+    more wait for a slot.  Beyond that requests are rejected with 429, and a
+    queued request that waits longer than ``queue_timeout`` seconds gets 503.
+    Both carry a Retry-After header.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float, retry_after: int):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.running = 0
+        self.queued = 0
+
+    async def acquire(self):
+        if not self._semaphore.locked():
+            # A slot is free: Semaphore.acquire returns without suspending.
+            await self._semaphore.acquire()
+            self.running += 1
+            return
+
+        if self.queued >= self.max_queued:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many analyses in progress. Please retry shortly.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis queue is saturated. Please retry shortly.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        finally:
+            self.queued -= 1
+        self.running += 1
+
+    def release(self):
+        self.running -= 1
+        self._semaphore.release()
+
+    async def admit(self) -> "Admission":
+        """``acquire``, returning a handle that releases the slot at most once."""
+        await self.acquire()
+        return Admission(self)
+
+
+class Admission:
+    """A held limiter slot.  ``release`` is idempotent, so every code path
+    that may end a request can call it.
+    """
+
+    def __init__(self, limiter: AnalysisLimiter):
+        self._limiter = limiter
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._limiter.release()
+
+
+limiter = AnalysisLimiter(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_ANALYSES", "8")),
+    max_queued=int(os.getenv("MAX_QUEUED_ANALYSES", "32")),
+    queue_timeout=float(os.getenv("ANALYSIS_QUEUE_TIMEOUT", "30")),
+    retry_after=int(os.getenv("ANALYSIS_RETRY_AFTER", "30")),
+)
+
+
 class AnalyzeRequest(BaseModel):
     transcript: str
     service: str = "im_hospitalist"
     presentation_format: str = "full_hp"
     enable_anticipatory: bool = True
+    deadline_s: Optional[float] = None  # latency budget; optional agents are dropped to meet it
+    late_anticipatory: bool = False  # /analyze/stream only: opt in to anticipatory reasoning after the result
 
 
 class HealthResponse(BaseModel):
     status: str
     version: str
+    analyses_running: int
+    analyses_queued: int
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
-    return HealthResponse(status="healthy", version="1.0.0")
+    return HealthResponse(
+        status="healthy",
+        version="1.0.0",
+        analyses_running=limiter.running,
+        analyses_queued=limiter.queued,
+    )
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and size of the LLM response cache."""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
 
+@app.get("/rate-limits")
+async def rate_limits():
+    """Learned limits, pacing waits and 429 counts per model."""
+    return {"models": rate_limiter_stats()}
 
-async def generate_analysis_stream(request: AnalyzeRequest) -> AsyncGenerator[str, None]:
-    """Stream analysis progress and results."""
+
+async def generate_analysis_stream(request: AnalyzeRequest, admission: Admission) -> AsyncGenerator[str, None]:
+    """Stream analysis progress and results.
+
+    Emits ``agent_started`` / ``agent_completed`` events (the latter with the
+    agent's wall time and JSON output) as the pipeline runs, a
+    ``synthesis_field`` event for each top-level field of the synthesis (and
+    any revision) as it streams in, ``progress`` events, and finally the
+    full ``result``.  With ``late_anticipatory`` the result does not wait for
+    the anticipatory agent: it lists the agent under ``_pending`` and the
+    stream stays open until a ``late_result`` event delivers it.
+    ``admission`` is the caller's limiter slot; it is released here once the
+    stream finishes (or the client disconnects).
+    """
     try:
         # Validate API key is present
         if not os.getenv("OPENAI_API_KEY"):
             yield f"data: {json.dumps({'type': 'error', 'message': 'OPENAI_API_KEY not configured'})}\n\n"
             return
 
-        yield f"data: {json.dumps({'type': 'progress', 'step': 'Initializing pipeline...', 'progress': 5})}\n\n"
-
-        # Initialize the feedback generator to get service contexts
-        feedback_generator = FeedbackGenerator(provider="OpenAI")
-
-        # Initialize the pipeline
-        pipeline = FeedbackPipeline(provider="OpenAI")
-
-        yield f"data: {json.dumps({'type': 'progress', 'step': 'Pipeline ready', 'progress': 10})}\n\n"
-
-        # Define progress callback
-        steps = [
-            ("Cleaning transcript...", 15),
-            ("Analyzing clinical content...", 25),
-            ("Evaluating clinical reasoning...", 40),
-            ("Assessing structure & delivery...", 50),
-            ("Analyzing communication...", 55),
-            ("Running literature analysis...", 60),
-            ("Running anticipatory reasoning...", 70),
-            ("Debate: Generous vs Strict evaluator...", 80),
-            ("Generating contrastive feedback...", 85),
-            ("Synthesizing final feedback...", 90),
-            ("Running synthesis critic...", 95),
-        ]
-        step_index = [0]
-
-        def progress_callback(step_name: str):
-            if step_index[0] < len(steps):
-                step_index[0] += 1
-
-        # Run the multi-agent analysis with progress updates
-        # Since we can't easily inject streaming into the existing pipeline,
-        # we'll run it and report completion
-        yield f"data: {json.dumps({'type': 'progress', 'step': 'Running multi-agent analysis...', 'progress': 20})}\n\n"
-
-        feedback = pipeline.run(
+        # Shared generator (service contexts) and pipeline
+        feedback_generator = get_feedback_generator()
+        pipeline = get_pipeline()
+
+        # Each agent's start/finish is pushed here by the pipeline so its
+        # result can be rendered while downstream agents are still running.
+        events: asyncio.Queue = asyncio.Queue()
+        analysis = asyncio.ensure_future(pipeline.arun(
             transcript=request.transcript,
             service=request.service,
             service_contexts=feedback_generator.service_contexts,
             presentation_format=request.presentation_format,
             enable_anticipatory=request.enable_anticipatory,
-            progress_callback=progress_callback,
-        )
+            event_callback=events.put_nowait,
+            deadline_s=request.deadline_s,
+            late_anticipatory=request.late_anticipatory,
+        ))
+
+        delivered = set()
+        try:
+            while not analysis.done() or not events.empty():
+                next_event = asyncio.ensure_future(events.get())
+                await asyncio.wait({next_event, analysis}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_event.done():
+                    next_event.cancel()
+                    continue
+                event = next_event.result()
+                if event["type"] == "late_result":
+                    delivered.add(event["agent"])
+                yield f"data: {json.dumps(event)}\n\n"
+                if event["type"] == "agent_completed":
+                    progress = int(100 * event["completed"] / event["total"])
+                    yield f"data: {json.dumps({'type': 'progress', 'step': event['label'], 'progress': progress})}\n\n"
+
+            feedback = analysis.result()
+        finally:
+            # Client went away mid-stream: stop spending tokens on it.
+            analysis.cancel()
 
         yield f"data: {json.dumps({'type': 'progress', 'step': 'Analysis complete!', 'progress': 100})}\n\n"
-        yield f"data: {json.dumps({'type': 'result', 'data': feedback})}\n\n"
+        # The report is never updated after it is returned: the agents it
+        # lists as pending arrive as late_result events (unless already sent).
+        pending = set(feedback.get("_pending", ())) - delivered
+        try:
+            yield f"data: {json.dumps({'type': 'result', 'data': feedback})}\n\n"
+            while pending:
+                event = await events.get()
+                if event["type"] == "late_result":
+                    pending.discard(event["agent"])
+                    yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            # Client went away before the late results: stop producing them.
+            if pending:
+                pipeline.cancel_late(feedback)
 
     except Exception as e:
         print(f"Analysis error: {e}")
         yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+    finally:
+        admission.release()
 
 
 @app.post("/analyze/stream")
 async def analyze_presentation_stream(request: AnalyzeRequest):
     """Analyze with streaming progress updates."""
-    return StreamingResponse(
-        generate_analysis_stream(request),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        }
-    )
+    # Admission happens before the response starts so 429/503 reach the client.
+    admission = await limiter.admit()
+    try:
+        return StreamingResponse(
+            generate_analysis_stream(request, admission),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive",
+            },
+            # Runs with the response even if the body was never iterated (the
+            # client left first), when the generator's own cleanup does not.
+            background=BackgroundTask(admission.release),
+        )
+    except BaseException:
+        admission.release()
+        raise
 
 
 @app.post("/analyze")
@@ -138,27 +300,29 @@ async def analyze_presentation(request: AnalyzeRequest):
     Returns:
         Comprehensive feedback from the multi-agent pipeline
     """
-    try:
-        # Validate API key is present
-        if not os.getenv("OPENAI_API_KEY"):
-            raise HTTPException(
-                status_code=500,
-                detail="OPENAI_API_KEY not configured"
-            )
-
-        # Initialize the feedback generator to get service contexts
-        feedback_generator = FeedbackGenerator(provider="OpenAI")
+    # Validate API key is present
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(
+            status_code=500,
+            detail="OPENAI_API_KEY not configured"
+        )
 
-        # Initialize the pipeline
-        pipeline = FeedbackPipeline(provider="OpenAI")
+    await limiter.acquire()
+    try:
+        # Shared generator (service contexts) and pipeline
+        feedback_generator = get_feedback_generator()
+        pipeline = get_pipeline()
 
-        # Run the multi-agent analysis
-        feedback = pipeline.run(
+        # Run the multi-agent analysis on the event loop without blocking it
+        feedback = await pipeline.arun(
             transcript=request.transcript,
             service=request.service,
             service_contexts=feedback_generator.service_contexts,
             presentation_format=request.presentation_format,
             enable_anticipatory=request.enable_anticipatory,
+            deadline_s=request.deadline_s,
+            # Nothing can be pushed after this response, so wait for every agent.
+            late_anticipatory=False,
         )
 
         return feedback
@@ -169,6 +333,8 @@ async def analyze_presentation(request: AnalyzeRequest):
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
+    finally:
+        limiter.release()
 
 
 @app.post("/analyze/legacy")
@@ -177,11 +343,14 @@ async def analyze_presentation_legacy(request: AnalyzeRequest):
 
     For comparison or fallback purposes.
     """
+    await limiter.acquire()
     try:
-        generator = FeedbackGenerator(provider="OpenAI")
-        feedback = generator.generate_feedback(
+        generator = get_feedback_generator()
+        # The legacy generator is synchronous; keep it off the event loop.
+        feedback = await run_in_threadpool(
+            generator.generate_feedback,
             request.transcript,
-            medical_service=request.service,
+            service=request.service,
         )
         return feedback
 
@@ -191,6 +360,8 @@ async def analyze_presentation_legacy(request: AnalyzeRequest):
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
+    finally:
+        limiter.release()
 
 
 if __name__ == "__main__":
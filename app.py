@@ -1,10 +1,13 @@
 import streamlit as st
 import tempfile
 import os
+import queue
+import threading
 from pathlib import Path
-import openai
 from dotenv import load_dotenv
 from feedback_generator import FeedbackGenerator
+from llm_clients import get_client, warm_clients
+from llm_retry import call_with_retries
 from pipeline import FeedbackPipeline, get_format_options
 from simple_recorder import audio_recorder_component
 
@@ -22,6 +25,8 @@ if 'edited_transcription' not in st.session_state:
     st.session_state.edited_transcription = None
 if 'feedback' not in st.session_state:
     st.session_state.feedback = None
+if 'previous_feedback' not in st.session_state:
+    st.session_state.previous_feedback = None
 if 'current_audio_file' not in st.session_state:
     st.session_state.current_audio_file = None
 if 'processing_transcription' not in st.session_state:
@@ -30,6 +35,8 @@ if 'processing_feedback' not in st.session_state:
     st.session_state.processing_feedback = False
 if 'pipeline_step' not in st.session_state:
     st.session_state.pipeline_step = ""
+if 'late_events' not in st.session_state:
+    st.session_state.late_events = None
 
 st.markdown("""
 <style>
@@ -84,14 +91,109 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def warm_llm_connections(provider, api_key):
+    """Open the pooled connection once per provider/key for the server process."""
+    warm_clients([provider])
+
+
 def transcribe_audio(file_path, api_key):
-    client = openai.OpenAI(api_key=api_key)
-    with open(file_path, "rb") as audio_file:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
-    return transcript.text
+    client = get_client("OpenAI", api_key=api_key)
+
+    def _transcribe():
+        with open(file_path, "rb") as audio_file:
+            return client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file
+            )
+
+    return call_with_retries(_transcribe).text
+
+
+def _run_pipeline_live(pipeline, progress_bar, status_text, draft_area, **kwargs):
+    """Run the pipeline on a worker thread and render its events as they arrive.
+
+    Streamlit elements can only be updated from the script thread, so the
+    pipeline's event callback just queues events for this loop to draw.
+    """
+    events = queue.Queue()
+    outcome = {}
+
+    def _worker():
+        try:
+            outcome["feedback"] = pipeline.run(event_callback=events.put, **kwargs)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            events.put(None)
+
+    threading.Thread(target=_worker, daemon=True).start()
+
+    draft = {}
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        if event["type"] == "agent_started":
+            status_text.text(f"{event['label']}...")
+            st.session_state.pipeline_step = f"{event['label']}..."
+        elif event["type"] == "agent_completed":
+            progress_bar.progress(event["completed"] / event["total"])
+        elif event["type"] == "synthesis_field":
+            draft[event["field"]] = event["value"]
+            _display_draft_feedback(draft_area, draft)
+
+    if "error" in outcome:
+        raise outcome["error"]
+    # Agents still running in the background report here after the run.
+    st.session_state.late_events = events
+    return outcome["feedback"]
+
+
+def _display_draft_feedback(area, draft):
+    """Render the synthesis fields streamed so far."""
+    with area.container():
+        st.markdown("#### Feedback (streaming...)")
+        for field, value in draft.items():
+            label = field.replace("_", " ").title()
+            if field == "overall_score":
+                st.markdown(f"**Performance Score:** {value}/10")
+            elif isinstance(value, list):
+                st.markdown(f"**{label}**")
+                for item in value:
+                    st.write(f"- {item}")
+            elif value:
+                st.markdown(f"**{label}**")
+                st.write(value)
+
+
+def _merge_late_results(feedback):
+    """Fold the ``late_result`` events received so far into ``feedback``.
+
+    The pipeline never edits a report it has returned, so this is the only
+    place it changes, and it runs on the script thread.
+    """
+    events = st.session_state.late_events
+    while events is not None:
+        try:
+            event = events.get_nowait()
+        except queue.Empty:
+            break
+        if event and event["type"] == "late_result":
+            feedback["_agent_results"][event["agent"]] = event["result"]
+            feedback["_pending"] = [name for name in feedback.get("_pending", ()) if name != event["agent"]]
+
+
+@st.fragment(run_every=2)
+def _await_late_result(feedback, agent, message):
+    """Poll for an agent the pipeline is still running in the background and
+    redraw the whole report once its result has arrived.
+    """
+    _merge_late_results(feedback)
+    if agent in feedback.get("_pending", ()):
+        st.info(message)
+    else:
+        st.rerun()
 
 
 def _display_multi_agent_feedback(feedback):
@@ -298,7 +400,12 @@ def _display_multi_agent_feedback(feedback):
         anticipatory = agent_results.get("anticipatory_reasoning", {})
         monologue = anticipatory.get("inner_monologue", [])
 
-        if monologue:
+        if "anticipatory_reasoning" in feedback.get("_pending", ()):
+            _await_late_result(
+                feedback, "anticipatory_reasoning",
+                "The attending's inner monologue is still being traced. It will appear here when ready.",
+            )
+        elif monologue:
             st.subheader("What an Attending Would Be Thinking")
             st.caption("This experimental feature shows the inner monologue of an experienced attending as they listen to your presentation.")
 
@@ -580,6 +687,7 @@ with st.sidebar:
     )
 
     enable_anticipatory = False
+    incremental = False
     if use_multi_agent:
         enable_anticipatory = st.toggle(
             "Attending Inner Monologue (Experimental)",
@@ -587,6 +695,12 @@ with st.sidebar:
             help="Walk through the transcript with annotations of what an attending would be thinking at each point"
         )
 
+        incremental = st.toggle(
+            "Incremental Re-analysis",
+            value=True,
+            help="After editing the transcript, re-clean only the changed sentences and reuse agent results whose inputs did not change"
+        )
+
 st.markdown("---")
 
 if not openai_key:
@@ -600,6 +714,7 @@ else:
         else:
             os.environ["XAI_API_KEY"] = xai_key
         os.environ["AI_MODEL"] = model
+        warm_llm_connections(ai_provider, openai_key if ai_provider == "OpenAI" else xai_key)
 
         feedback_generator = FeedbackGenerator(provider=ai_provider)
         st.sidebar.success(f"{ai_provider} Ready")
@@ -674,6 +789,7 @@ else:
                     if edited_text != st.session_state.edited_transcription:
                         st.session_state.edited_transcription = edited_text
                         if st.session_state.feedback:
+                            st.session_state.previous_feedback = st.session_state.feedback
                             st.session_state.feedback = None
                             st.info("Transcription edited. Please generate feedback again to analyze the updated text.")
 
@@ -697,19 +813,17 @@ else:
                                 pipeline = FeedbackPipeline(provider=ai_provider)
                                 progress_bar = st.progress(0)
                                 status_text = st.empty()
+                                draft_area = st.empty()
 
-                                def update_progress(step_name, step_num, total):
-                                    progress_bar.progress(step_num / total)
-                                    status_text.text(f"Step {step_num}/{total}: {step_name}...")
-                                    st.session_state.pipeline_step = f"Step {step_num}/{total}: {step_name}..."
-
-                                feedback = pipeline.run(
+                                feedback = _run_pipeline_live(
+                                    pipeline, progress_bar, status_text, draft_area,
                                     transcript=text_to_analyze,
                                     service=service,
                                     service_contexts=feedback_generator.service_contexts,
                                     presentation_format=presentation_format,
                                     enable_anticipatory=enable_anticipatory,
-                                    progress_callback=update_progress,
+                                    late_anticipatory=True,
+                                    previous=st.session_state.previous_feedback if incremental else None,
                                 )
                                 progress_bar.progress(1.0)
                                 status_text.text("Analysis complete!")
@@ -769,10 +883,12 @@ else:
                     st.session_state.transcription = None
                     st.session_state.edited_transcription = None
                     st.session_state.feedback = None
+                    st.session_state.previous_feedback = None
                     st.session_state.current_audio_file = None
                     st.session_state.processing_transcription = False
                     st.session_state.processing_feedback = False
                     st.session_state.pipeline_step = ""
+                    st.session_state.late_events = None
 
                     st.rerun()
 
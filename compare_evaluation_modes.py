@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Compare the fused and separate core-evaluation modes on one transcript.
+
+Runs the pipeline once per mode (LLM cache off) and reports wall time,
+prompt tokens spent on the core evaluators, each dimension's score, and
+whether every fused result carries the fields the separate agent returns.
+
+    python compare_evaluation_modes.py --format sbar --transcript my_sbar.txt
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from feedback_generator import FeedbackGenerator
+from pipeline import FeedbackPipeline
+
+
+SAMPLE_SBAR = """Situation: I'm calling about Mr. Jones in room 12, a 68-year-old man who became acutely short of breath over the last hour. His oxygen saturation dropped to 86 percent on room air and he is now on 4 liters nasal cannula at 92 percent.
+Background: He was admitted two days ago for a COPD exacerbation. He has a history of heart failure with an ejection fraction of 35 percent and he received two liters of IV fluid overnight for low blood pressure.
+Assessment: I'm worried about volume overload. He has crackles at both bases, new JVD and his weight is up two kilograms since admission.
+Recommendation: I'd like to give IV furosemide 40 milligrams, get a chest x-ray and a BNP, and I'd like you to come see him within the next thirty minutes."""
+
+CORE_EVALUATORS = (
+    "clinical_content",
+    "clinical_reasoning",
+    "structure_delivery",
+    "communication_professionalism",
+)
+
+
+def run_mode(pipeline, mode, transcript, args, service_contexts):
+    pipeline.core_evaluation_mode = mode
+    started = time.perf_counter()
+    result = pipeline.run(
+        transcript,
+        args.service,
+        service_contexts,
+        presentation_format=args.format,
+        enable_anticipatory=args.anticipatory,
+    )
+    return result, time.perf_counter() - started
+
+
+def core_prompt_tokens(result):
+    agents = result.get("_usage", {}).get("agents", {})
+    return sum(
+        agents.get(name, {}).get("prompt_tokens", 0)
+        for name in CORE_EVALUATORS + ("core_evaluation",)
+    )
+
+
+def missing_fields(pipeline, result):
+    missing = {}
+    for agent in pipeline.core_evaluation.evaluators:
+        expected = set(agent._fallback_result({}, Exception()))
+        got = set(result["_agent_results"].get(agent.agent_name, {}))
+        if expected - got:
+            missing[agent.agent_name] = sorted(expected - got)
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcript", help="file with the presentation transcript (default: a sample SBAR)")
+    parser.add_argument("--service", default="internal_medicine_hospitalist")
+    parser.add_argument("--format", default="sbar")
+    parser.add_argument("--provider", default="OpenAI", choices=["OpenAI", "xAI"])
+    parser.add_argument("--anticipatory", action="store_true", help="also run the anticipatory agent")
+    args = parser.parse_args()
+
+    transcript = SAMPLE_SBAR
+    if args.transcript:
+        with open(args.transcript) as f:
+            transcript = f.read()
+
+    print("PresentIQ - Core Evaluation Modes")
+    print("=" * 60)
+
+    service_contexts = FeedbackGenerator(args.provider).service_contexts
+    pipeline = FeedbackPipeline(args.provider)
+
+    results = {}
+    for mode in ("separate", "fused"):
+        print(f"\nRunning {mode} mode...")
+        try:
+            results[mode] = run_mode(pipeline, mode, transcript, args, service_contexts)
+        except Exception as e:
+            print(f"  [FAIL] {mode} run crashed: {e}")
+            return
+        result, elapsed = results[mode]
+        print(f"  [OK] {elapsed:.1f}s, {core_prompt_tokens(result)} core prompt tokens, overall {result.get('overall_score', 'N/A')}/10")
+
+    print("\n" + "=" * 60)
+    print("COMPARISON")
+    print("=" * 60)
+
+    (separate, separate_s), (fused, fused_s) = results["separate"], results["fused"]
+    print(f"  Wall time:          {separate_s:6.1f}s separate  {fused_s:6.1f}s fused")
+    print(f"  Core prompt tokens: {core_prompt_tokens(separate):7d} separate  {core_prompt_tokens(fused):7d} fused")
+    for name in CORE_EVALUATORS + ("overall",):
+        if name == "overall":
+            a, b = separate.get("overall_score"), fused.get("overall_score")
+        else:
+            a = separate["_agent_results"][name].get("score")
+            b = fused["_agent_results"][name].get("score")
+        print(f"  {name:31s} {a!s:>4} separate  {b!s:>4} fused")
+
+    errors = [
+        name for name in CORE_EVALUATORS
+        if "_error" in fused["_agent_results"][name]
+    ]
+    missing = missing_fields(pipeline, fused)
+    if errors:
+        print(f"\n  [FAIL] Fused results fell back for: {', '.join(errors)}")
+    elif missing:
+        print(f"\n  [WARN] Fused results missing fields: {missing}")
+    else:
+        print("\n  [OK] Fused results match the separate-agent schemas")
+
+
+if __name__ == "__main__":
+    main()
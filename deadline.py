@@ -0,0 +1,80 @@
+"""Latency budgets for pipeline runs.
+
+``FeedbackPipeline.run(..., deadline_s=45)`` creates a ``RunBudget`` and gives
+every step a share of it.  The step's absolute deadline is held in a context
+variable while it runs, so each LLM call underneath it (including retries
+and re-cleans) is sent with a timeout of whatever time is left and is never
+started once the deadline has passed.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline (None when there is none)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline() -> Optional[float]:
+    """Raise if the current deadline has passed; otherwise return time left."""
+    left = time_left()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Latency budget exhausted")
+    return left
+
+
+@contextmanager
+def deadline_at(when: Optional[float]):
+    """Run the block under the absolute (monotonic) deadline ``when``; an
+    enclosing, earlier deadline still wins.
+    """
+    current = _deadline.get()
+    if when is not None and current is not None:
+        when = min(when, current)
+    token = _deadline.set(when if when is not None else current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class RunBudget:
+    """Wall-clock budget for one pipeline run and a record of what was dropped."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self._dropped: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+
+    def mark(self, fraction: float) -> float:
+        """Absolute deadline ``fraction`` of the way through the budget."""
+        return self.started + fraction * self.seconds
+
+    def drop(self, step: str, reason: str) -> None:
+        with self._lock:
+            self._dropped.append({"step": step, "reason": reason})
+
+    @property
+    def dropped(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return list(self._dropped)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "deadline_s": self.seconds,
+            "elapsed_s": round(time.monotonic() - self.started, 3),
+            "dropped": self.dropped,
+        }
@@ -1,21 +1,18 @@
-import openai
 import os
 import json
 from typing import Dict, Any
 import streamlit as st
+from llm_clients import get_client
+from llm_retry import call_with_retries
 
 class FeedbackGenerator:
     def __init__(self, provider="OpenAI"):
         self.provider = provider
         
+        self.client = get_client(provider)
         if provider == "OpenAI":
-            self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             self.model = os.getenv("AI_MODEL", "gpt-4")
         else:
-            self.client = openai.OpenAI(
-                api_key=os.getenv("XAI_API_KEY"),
-                base_url="https://api.x.ai/v1"
-            )
             self.model = os.getenv("AI_MODEL", "grok-3")
             
         self.temperature = float(os.getenv("FEEDBACK_TEMPERATURE", "0.3"))
@@ -181,7 +178,7 @@ class FeedbackGenerator:
         user_prompt = self._create_user_prompt(transcription, service_context)
         
         try:
-            response = self.client.chat.completions.create(
+            response = call_with_retries(lambda: self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -189,7 +186,7 @@ class FeedbackGenerator:
                 ],
                 temperature=self.temperature,
                 max_tokens=2500
-            )
+            ))
             
             feedback_text = response.choices[0].message.content.strip()
 
@@ -0,0 +1,81 @@
+"""Incremental parser for a streamed JSON object.
+
+LLM completions arrive token by token; ``JSONFieldStream`` consumes the raw
+text as it comes and yields each top-level ``(key, value)`` pair the moment
+that value is complete, so callers can show e.g. ``overall_assessment``
+long before the closing brace arrives.  Anything before the opening brace
+(such as a ```json fence) is ignored.
+"""
+
+import json
+from typing import Any, List, Tuple
+
+
+class JSONFieldStream:
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expecting_key = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume ``text`` and return the top-level fields it completed."""
+        self._buffer += text
+        fields = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self.done:
+            i, c = self._pos, buffer[self._pos]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expecting_key:
+                        self._key = json.loads(buffer[self._key_start:i + 1])
+                continue
+
+            if self._depth == 0:
+                # Skip fences and chatter before the object starts.
+                if c == "{":
+                    self._depth = 1
+                    self._expecting_key = True
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expecting_key:
+                    self._key_start = i
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(buffer, i, fields)
+                    self.done = True
+            elif self._depth == 1 and c == ":":
+                self._expecting_key = False
+                self._value_start = i + 1
+            elif self._depth == 1 and c == ",":
+                self._emit(buffer, i, fields)
+                self._expecting_key = True
+        return fields
+
+    def _emit(self, buffer: str, end: int, fields: List[Tuple[str, Any]]) -> None:
+        if self._key is None or self._value_start is None:
+            return
+        try:
+            fields.append((self._key, json.loads(buffer[self._value_start:end])))
+        except ValueError:
+            pass
+        self._key = None
+        self._value_start = None
@@ -0,0 +1,202 @@
+"""Content-addressed response cache for LLM calls.
+
+Entries are keyed on a SHA-256 of everything that determines a completion
+(model, temperature, max_tokens and the full message list), so identical
+work — a student re-clicking "Analyze", or replaying the regression corpus —
+is answered from cache instead of the provider.
+
+Two tiers: a bounded in-memory LRU in front of a persistent SQLite store with
+size-based eviction (least recently used first) and a TTL.  Async callers use
+``aget``/``aset``/``adelete``, which do the SQLite work on a worker thread so
+a slow disk or a locked database never stalls the event loop.
+
+Configuration (environment):
+    LLM_CACHE_ENABLED         "0" disables caching (default "1"); also the
+                              whole-run cache, but not the per-step memo,
+                              which has its own STEP_MEMO_ENABLED
+    LLM_CACHE_PATH            SQLite file (default .cache/presentiq.sqlite3)
+    LLM_CACHE_MEMORY_ENTRIES  in-memory LRU capacity (default 512)
+    LLM_CACHE_MAX_MB          disk tier size cap in MB (default 256)
+    LLM_CACHE_TTL_HOURS       entry lifetime in hours (default 168)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def cache_key(**parts: Any) -> str:
+    """Stable hash of the keyword arguments (order-independent)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: str,
+        table: str = "llm_responses",
+        memory_entries: int = 512,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_s: float = 7 * 24 * 3600,
+    ):
+        self.table = table
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl_s:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            row = self._db.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_s:
+                if row is not None:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._counters["misses"] += 1
+                return None
+
+            self._db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            self._counters["disk_hits"] += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._remember(key, value, now)
+            self._counters["writes"] += 1
+            self._evict(now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    async def aget(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    async def adelete(self, key: str) -> None:
+        await asyncio.to_thread(self.delete, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._db.execute(f"DELETE FROM {self.table}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._db.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+            counters = dict(self._counters)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        counters.update(
+            hit_rate=round(hits / lookups, 3) if lookups else 0.0,
+            memory_entries=len(self._memory),
+            disk_entries=entries,
+            disk_bytes=total,
+        )
+        return counters
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        expired = self._db.execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_s,)
+        ).rowcount
+        self._counters["evictions"] += max(expired, 0)
+
+        total = self._db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used rows until we are back under 90% of the cap.
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self._db.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC"
+        ):
+            victims.append(key)
+            freed += size
+            if freed >= target:
+                break
+        self._db.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in victims])
+        for key in victims:
+            self._memory.pop(key, None)
+        self._counters["evictions"] += len(victims)
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(table: str = "llm_responses", toggle: str = "LLM_CACHE_ENABLED") -> Optional[ResponseCache]:
+    """Process-wide cache for ``table`` (None when the ``toggle`` environment
+    variable is "0").
+    """
+    if os.getenv(toggle, "1") == "0":
+        return None
+
+    with _caches_lock:
+        cache = _caches.get(table)
+        if cache is None:
+            cache = ResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", ".cache/presentiq.sqlite3"),
+                table=table,
+                memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512")),
+                max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024),
+                ttl_s=float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600,
+            )
+            _caches[table] = cache
+        return cache
+
+
+def get_llm_cache() -> Optional[ResponseCache]:
+    return get_cache("llm_responses")
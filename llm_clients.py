@@ -0,0 +1,119 @@
+"""Process-wide LLM client registry.
+
+Every agent, pipeline and request shares one long-lived client per provider
+(and API key), so the ~11 LLM calls of an analysis reuse pooled keep-alive
+connections instead of paying a fresh TLS handshake each time.
+
+Pool and timeout settings come from the environment:
+    LLM_POOL_MAX_CONNECTIONS   total connections per client (default 100)
+    LLM_POOL_MAX_KEEPALIVE     idle keep-alive connections kept (default 20)
+    LLM_POOL_KEEPALIVE_EXPIRY  seconds an idle connection is kept (default 120)
+    LLM_TIMEOUT                read/write timeout in seconds (default 120)
+    LLM_CONNECT_TIMEOUT        connect timeout in seconds (default 10)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+import openai
+
+
+logger = logging.getLogger(__name__)
+
+XAI_BASE_URL = "https://api.x.ai/v1"
+
+_lock = threading.Lock()
+_clients: Dict[Tuple, openai.OpenAI] = {}
+# Keyed by event loop first, so clients die with the loop they belong to.
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_unbound_async_clients: Dict[Tuple, openai.AsyncOpenAI] = {}
+
+
+def _provider_settings(provider: str, api_key: Optional[str]) -> Dict[str, Optional[str]]:
+    if provider == "OpenAI":
+        return {"api_key": api_key or os.getenv("OPENAI_API_KEY"), "base_url": None}
+    return {"api_key": api_key or os.getenv("XAI_API_KEY"), "base_url": XAI_BASE_URL}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "120")),
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("LLM_TIMEOUT", "120")),
+        connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "10")),
+    )
+
+
+def get_client(provider: str = "OpenAI", api_key: Optional[str] = None) -> openai.OpenAI:
+    """Return the shared synchronous client for ``provider``."""
+    settings = _provider_settings(provider, api_key)
+    key = (settings["base_url"], settings["api_key"])
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = openai.OpenAI(
+                api_key=settings["api_key"],
+                base_url=settings["base_url"],
+                timeout=_timeout(),
+                max_retries=0,  # retries are handled per call (llm_retry.py)
+                http_client=openai.DefaultHttpxClient(limits=_limits(), timeout=_timeout()),
+            )
+            _clients[key] = client
+        return client
+
+
+def get_async_client(provider: str = "OpenAI", api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    """Return the shared async client for ``provider``.
+
+    Async connection pools are bound to the event loop that opened them, so
+    clients are kept per running loop (one in the API server).
+    """
+    settings = _provider_settings(provider, api_key)
+    key = (settings["base_url"], settings["api_key"])
+
+    with _lock:
+        try:
+            clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+        except RuntimeError:
+            clients = _unbound_async_clients
+        client = clients.get(key)
+        if client is None:
+            client = openai.AsyncOpenAI(
+                api_key=settings["api_key"],
+                base_url=settings["base_url"],
+                timeout=_timeout(),
+                max_retries=0,  # retries are handled per call (llm_retry.py)
+                http_client=openai.DefaultAsyncHttpxClient(limits=_limits(), timeout=_timeout()),
+            )
+            clients[key] = client
+        return client
+
+
+def warm_clients(providers: Iterable[str] = ("OpenAI",)) -> None:
+    """Open a pooled connection per provider ahead of the first analysis."""
+    for provider in providers:
+        try:
+            get_client(provider).with_options(timeout=10).models.list()
+        except Exception as e:
+            logger.warning("Client warm-up failed for %s: %s", provider, e)
+
+
+async def awarm_clients(providers: Iterable[str] = ("OpenAI",)) -> None:
+    """Async counterpart of ``warm_clients`` for the running event loop."""
+    for provider in providers:
+        try:
+            await get_async_client(provider).with_options(timeout=10).models.list()
+        except Exception as e:
+            logger.warning("Client warm-up failed for %s: %s", provider, e)
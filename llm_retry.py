@@ -0,0 +1,169 @@
+"""Retries and hedged requests for LLM calls.
+
+Transient failures (rate limits, timeouts, dropped connections, 5xx) are
+retried with full-jitter exponential backoff instead of degrading an agent
+to its fallback result.  Optionally, a call that is still running after its
+agent's p95 latency gets a duplicate ("hedge") request, and whichever
+finishes first wins — cutting the straggler tail that dominates p99.
+
+Configuration (environment):
+    LLM_MAX_RETRIES       retries after the first attempt (default 3)
+    LLM_RETRY_BASE_S      backoff base in seconds (default 0.5)
+    LLM_RETRY_MAX_S       backoff cap in seconds (default 20)
+    LLM_HEDGE_ENABLED     "1" enables hedged requests (default "0")
+    LLM_HEDGE_MIN_SAMPLES calls observed per agent before hedging (default 20)
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import openai
+
+from deadline import time_left
+
+
+_TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in _TRANSIENT_STATUS
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number ``attempt`` (0-based)."""
+    base = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+    cap = float(os.getenv("LLM_RETRY_MAX_S", "20"))
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _max_retries() -> int:
+    return int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+
+def _retry_delay(error: Exception, attempt: int, retries: int) -> Optional[float]:
+    """Backoff before the next attempt, or None if ``error`` should be raised."""
+    if attempt == retries or not is_transient(error):
+        return None
+    delay = backoff_delay(attempt)
+    left = time_left()
+    if left is not None and delay >= left:
+        return None  # no time left in the latency budget for another attempt
+    return delay
+
+
+def call_with_retries(call: Callable[[], Any]) -> Any:
+    retries = _max_retries()
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, retries)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def acall_with_retries(call: Callable[[], Awaitable[Any]]) -> Any:
+    retries = _max_retries()
+    for attempt in range(retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, retries)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+class LatencyTracker:
+    """Recent call latencies per agent, for hedging and deadline planning."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, name: str, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[int(q * (len(samples) - 1))]
+
+    def p95(self, name: str) -> Optional[float]:
+        return self.percentile(name, 0.95, int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")))
+
+
+latencies = LatencyTracker()
+
+
+def hedge_delay(name: str) -> Optional[float]:
+    """Seconds after which a call for ``name`` should be hedged (None = never)."""
+    if os.getenv("LLM_HEDGE_ENABLED", "0") != "1":
+        return None
+    return latencies.p95(name)
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+
+def hedged_call(call: Callable[[], Any], delay: Optional[float]) -> Any:
+    """Run ``call``; if it is still running after ``delay`` seconds, start a
+    duplicate and return whichever succeeds first.
+    """
+    if delay is None:
+        return call()
+
+    # Carry context variables (e.g. the latency deadline) into the pool.
+    primary = _hedge_pool.submit(contextvars.copy_context().run, call)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    pending = {primary, _hedge_pool.submit(contextvars.copy_context().run, call)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # The loser cannot be interrupted mid-request; its result is dropped.
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def ahedged_call(call: Callable[[], Awaitable[Any]], delay: Optional[float]) -> Any:
+    if delay is None:
+        return await call()
+
+    primary = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    pending = {primary, asyncio.ensure_future(call())}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,363 @@
+"""Local medical-lexicon pre-pass for transcription cleanup.
+
+Many speech-to-text errors are mechanical: a term split in two ("hyper
+tension"), a known mishearing ("bee pap" for BiPAP) or a one-letter slip
+("pnemonia").  ``MedicalLexicon.check`` fixes those locally with a single
+multi-pattern regex over known mishearings, a lookup of adjacent words
+joined together, and an edit-distance index of medical terms.
+
+It then scores how much of the transcript it can vouch for: the share of
+words it knows (medical terms or everyday presentation English), times the
+share of medical-looking words (by prefix or suffix) that are terms it
+knows.  An unknown word such as "beeties" or a stray "hyper" lowers the
+score, so text that merely looks clean still reaches the LLM.  Only when
+the score is high enough does the pipeline use the locally corrected
+transcript and skip the LLM cleanup call.
+
+The vocabulary is a small built-in core plus every word of the services'
+``key_elements``, ``common_presentations`` and ``focus``.  Everyday words
+one letter away from a term ("plural") are only corrected next to another
+medical term ("plural effusion").
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+# Known mishearings of spoken abbreviations and terms.
+_ALIASES = {
+    "bee pap": "BiPAP",
+    "bi pap": "BiPAP",
+    "by pap": "BiPAP",
+    "see pap": "CPAP",
+    "sea pap": "CPAP",
+    "a fib": "AFib",
+    "ay fib": "AFib",
+    "c o p d": "COPD",
+    "see o p d": "COPD",
+    "e k g": "EKG",
+    "e c g": "ECG",
+    "n p o": "NPO",
+    "b n p": "BNP",
+    "p r n": "PRN",
+    "h and p": "H&P",
+    "i v": "IV",
+    "st elevation": "ST elevation",
+    "trope onin": "troponin",
+    "tro ponin": "troponin",
+}
+
+_CORE_TERMS = """
+abdomen abdominal acetaminophen albuterol allergies amiodarone amlodipine amoxicillin anemia aneurysm angina
+angiography anticoagulation antibiotics aortic apixaban appendicitis arrhythmia arterial ascites aspirin
+atelectasis atorvastatin auscultation azithromycin bacteremia bilateral bilirubin biopsy bradycardia bronchitis
+bronchoscopy cardiomegaly cardiomyopathy catheterization ceftriaxone cellulitis cholecystitis cirrhosis clopidogrel
+colonoscopy creatinine cyanosis cannula dehydration delirium dermatitis diabetes diaphoresis diarrhea diastolic diuresis
+diverticulitis dyspnea dysphagia dysuria echocardiogram edema electrolyte embolism emphysema encephalopathy
+ejection endocarditis endoscopy enoxaparin epinephrine erythema esophagitis exacerbation extremities febrile fibrillation furosemide
+gabapentin gastroenteritis gastrointestinal glucose heparin hematocrit hematuria hemodynamic hemoglobin hemoptysis
+hemorrhage hepatitis hydrochlorothiazide hyperglycemia hyperkalemia hyperlipidemia hypertension hypoglycemia
+hypokalemia hyponatremia hypotension hypothyroidism hypoxia ibuprofen infiltrate insulin intubation ischemia
+jaundice ketoacidosis lactate leukocytosis levothyroxine lisinopril lymphadenopathy metformin metoprolol
+murmur myocardial nausea nephropathy neuropathy nitroglycerin normocytic ondansetron orthopnea osteomyelitis
+palpitations pancreatitis paracentesis pericarditis peritonitis pharyngitis platelets pleural pneumonia
+pneumothorax polyuria potassium prednisone pyelonephritis radiculopathy rhonchi sepsis sodium spironolactone
+splenomegaly stenosis syncope tachycardia tachypnea thoracentesis thrombocytopenia thrombosis troponin ultrasound
+urinalysis vancomycin vasopressor ventilator vomiting warfarin wheezing effusion consolidation crackles rales
+"""
+
+# Everyday words of case presentations.  Words outside this list and the
+# medical terms are "unknown" and count against the confidence score.
+_COMMON_WORDS = """
+a about above absent acute add added admission admit admitted afebrile after again against ago all allergic
+allergy alert also an and any appears are around as assessment at attending awake back bad based be because bed
+been before being below benign best better between bilaterally blood bowel breath breathing brought but by call
+came can care case cause changes check chest chief chronic clear clinic complaint concern concerning consistent
+continue continued could course current currently daily day days decreased denies denied deny describes diagnosis
+did diet differential disease do does dose doses down drink drinks due during each early emergency end evaluate
+evaluation even ever every exam examination except exercise family father female few findings first floor
+follow following for found four from full further gave general given go going good had has have he head health
+heart her here high him his history home hospital hours how i if impression improved in including increased
+initial inpatient intact is it its jaw just labs last left leg legs likely lower lungs made major male mass may
+me medical medication medications medicine mild minutes moderate month months more morning most mother much
+my nausea negative neck new next night no non none normal not noted now of off office old on once one only or
+oral other our out over pain past patient patients per physical plan please plural point positive possible
+presented presenting presents previous previously primary prior problem problems pulse radiating rate recent
+recently regular relevant remarkable report reported reports rest review right room said saw see seen severe
+she shortness should side since sitting situation sleep small smoker smokes social some start started status
+still stool stopped strength substantial such surgery surgical symptoms take taking temperature than that the
+their them then there these they think this three time times to today took treatment two unit up upper urine
+us use used very vital vitals was we week weeks well were what when which while white who will with within
+without woman man worse worsening year years yesterday you
+able across air already base although always amount another anything appropriate arrival ask asked assess
+became become began believe bit both brief bring calling carry clinical cold come comes coming concerned
+consider considering consult consulting contact couple cover covering cross decided decline describe
+developed difficulty discharge discussed doing done drop dropped dry either else episode episodes evidence
+exposure feel feeling felt fever fevers fine fluid fluids fraction gain get getting give giving goal goals
+goes got happened hard help hold hour however increase infusion instead involved keep kilogram kilograms
+kind know known lab large later let level levels like liter liters long look looked looks lot low making
+management many means might milligram milligrams milliliter milliliters minimal monitor monitoring moved
+multiple nasal near need needed needs never nothing number obtained onset otherwise output overload
+overnight oxygen pattern pending people percent perhaps physician plus pretty probably quite rather ray
+reason received recommend recommendation recommendations related remains repeat require required result
+results return returned rounds saturation seems sent several short showed shows sign signs significant
+similar slightly something sometimes soon stable stay stayed sudden suggest suggests support sure system
+team telemetry tell test tested tests thank things though through throughout tired together tolerated
+tomorrow tonight tried trend trending trying unable unchanged under until usual usually value values
+various volume want wanted ways weakness weight whether why work working worried would yes
+background situation subjective objective chart note notes five six seven eight nine ten eleven twelve
+fifteen twenty thirty forty fifty sixty seventy eighty ninety hundred
+"""
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]*")
+# Spans the recognizer itself marks as not understood, and encoding garbage.
+_GARBLE = re.compile(r"\[(?:inaudible|unintelligible|unclear|blank_audio|music)[^\]]*\]|\(inaudible\)|�|\?{2,}", re.I)
+# The same 1-4 word phrase repeated 3+ times in a row (a typical recognizer loop).
+_LOOP = re.compile(r"\b((?:\w+\W+){1,4}?)\1{2,}", re.I)
+# Words this long or longer are checked against the edit-distance index.
+_MIN_FUZZY_LEN = 6
+# Medical-looking words, by common prefix or suffix.
+_MEDICAL_SHAPE = re.compile(
+    r"^(?:hyper|hypo|tachy|brady|dys|cardi|hepat|nephr|gastr|pneum|pulmon|neur|hemat|thromb|angi|arthr|oste|enceph)"
+    r"|(?:itis|emia|osis|ectomy|otomy|ostomy|pathy|algia|uria|penia|megaly|plasty|scopy|graphy|cardia|pnea|lysis)$"
+)
+
+
+class LexiconCheck(NamedTuple):
+    text: str
+    corrections: List[str]
+    suspicious: List[str]
+    unknown: List[str]
+    confidence: float
+
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` if larger."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _deletes(word: str) -> Iterable[str]:
+    yield word
+    for i in range(len(word)):
+        yield word[:i] + word[i + 1:]
+
+
+# Words after these are names, not transcription errors.
+_TITLES = {"mr", "mrs", "ms", "miss", "dr"}
+
+
+def _stems(word: str) -> Iterable[str]:
+    yield word
+    if "'" in word:
+        yield word.split("'")[0]
+    for suffix in ("s", "es", "ed", "ing", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            yield word[: -len(suffix)]
+
+
+def _match_case(replacement: str, original: str) -> str:
+    if replacement.islower() and original[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+class MedicalLexicon:
+    def __init__(
+        self,
+        terms: Iterable[str],
+        aliases: Optional[Dict[str, str]] = None,
+        common_words: Iterable[str] = (),
+    ):
+        self.common = {word.lower() for word in common_words}
+        # Lower-case form -> canonical spelling (keeps casing such as "HPI").
+        self.terms: Dict[str, str] = {}
+        for term in terms:
+            if len(term) > 2 and term.lower() not in self.common:
+                self.terms.setdefault(term.lower(), term)
+        self.aliases = {alias.lower(): target for alias, target in (aliases or {}).items()}
+        for target in self.aliases.values():
+            if " " not in target:
+                self.terms.setdefault(target.lower(), target)
+        self._alias_pattern = re.compile(
+            r"\b(?:" + "|".join(re.escape(a) for a in sorted(self.aliases, key=len, reverse=True)) + r")\b",
+            re.I,
+        ) if self.aliases else None
+
+        # Single-deletion index: every term under itself and each of its deletions.
+        self._fuzzy: Dict[str, List[str]] = {}
+        for term in self.terms:
+            if len(term) >= _MIN_FUZZY_LEN:
+                for key in set(_deletes(term)):
+                    self._fuzzy.setdefault(key, []).append(term)
+
+    @classmethod
+    def from_service_contexts(cls, service_contexts: Dict[str, Dict[str, Any]]) -> "MedicalLexicon":
+        words = _WORD.findall(_CORE_TERMS)
+        for service in service_contexts.values():
+            seeds = list(service.get("key_elements", []))
+            seeds += [service.get("common_presentations", ""), service.get("focus", "")]
+            for seed in seeds:
+                words.extend(word.strip("'-") for word in _WORD.findall(seed))
+        return cls(words, _ALIASES, _COMMON_WORDS.split())
+
+    def check(self, text: str) -> LexiconCheck:
+        """Correct the mechanical errors in ``text`` and score what is left."""
+        corrections: List[str] = []
+        text = self._replace_aliases(text, corrections)
+        text = self._join_split_terms(text, corrections)
+        text, near_misses = self._fix_misspellings(text, corrections)
+
+        suspicious = near_misses + [m.group(0) for m in _GARBLE.finditer(text)]
+        suspicious += [m.group(0).strip() for m in _LOOP.finditer(text)]
+        words = _WORD.findall(text)
+        if not words:
+            return LexiconCheck(text, corrections, suspicious, [], 0.0)
+
+        # Words inside recognizer markers are already counted as flagged.
+        scored = _WORD.findall(_GARBLE.sub(" ", text))
+        unknown = [
+            word for i, word in enumerate(scored)
+            if not self._known(word) and not (i and scored[i - 1].lower() in _TITLES)
+        ]
+        flagged = sum(max(1, len(_WORD.findall(span))) for span in suspicious)
+        known_share = max(0.0, 1.0 - (len(unknown) + flagged) / len(words))
+        # A clinical presentation without a single recognizable term is not one
+        # the lexicon can vouch for.
+        medical = [word.lower() for word in words if self._medical(word)]
+        confirmed = sum(1 for word in medical if self._term(word))
+        medical_share = confirmed / len(medical) if medical else 0.0
+        return LexiconCheck(text, corrections, suspicious, unknown, round(known_share * medical_share, 4))
+
+    def _term(self, word: str) -> bool:
+        return any(stem in self.terms for stem in _stems(word.lower()))
+
+    def _known(self, word: str) -> bool:
+        # Short words and spoken abbreviations ("BP", "CBC") are not scored.
+        if len(word) <= 2 or (word.isupper() and len(word) <= 5):
+            return True
+        if "-" in word.strip("-"):
+            return all(self._known(part) for part in word.split("-") if part)
+        return self._term(word) or any(stem in self.common for stem in _stems(word.lower()))
+
+    def _medical(self, word: str) -> bool:
+        lower = word.lower()
+        return self._term(lower) or (len(lower) >= 5 and lower not in self.common and bool(_MEDICAL_SHAPE.search(lower)))
+
+    def _replace_aliases(self, text: str, corrections: List[str]) -> str:
+        if self._alias_pattern is None:
+            return text
+
+        def _replace(match):
+            replacement = self.aliases[match.group(0).lower()]
+            corrections.append(f"'{match.group(0)}' -> '{replacement}'")
+            return replacement
+
+        return self._alias_pattern.sub(_replace, text)
+
+    def _join_split_terms(self, text: str, corrections: List[str]) -> str:
+        """Rejoin terms the recognizer split into two or three words."""
+        tokens = list(_WORD.finditer(text))
+        replacements: List[Tuple[int, int, str]] = []
+        i = 0
+        while i < len(tokens):
+            for size in (3, 2):
+                group = tokens[i:i + size]
+                if len(group) < size or any(not text[a.end():b.start()].isspace() for a, b in zip(group, group[1:])):
+                    continue
+                joined = "".join(token.group(0) for token in group).lower()
+                parts_known = all(token.group(0).lower() in self.terms for token in group)
+                if len(joined) >= _MIN_FUZZY_LEN and joined in self.terms and not parts_known:
+                    original = text[group[0].start():group[-1].end()]
+                    replacement = _match_case(self.terms[joined], original)
+                    replacements.append((group[0].start(), group[-1].end(), replacement))
+                    corrections.append(f"'{original}' -> '{replacement}'")
+                    i += size - 1
+                    break
+            i += 1
+        for start, end, replacement in reversed(replacements):
+            text = text[:start] + replacement + text[end:]
+        return text
+
+    def _fix_misspellings(self, text: str, corrections: List[str]) -> Tuple[str, List[str]]:
+        """Correct words one edit away from exactly one term; report words
+        two edits away (or ambiguous) as near misses.  Candidates must share
+        the word's first letter, which keeps ordinary words such as
+        "ejection" from being pulled onto a term ("rejection").
+        """
+        near_misses = []
+        words = list(_WORD.finditer(text))
+
+        def _replace(match, i):
+            word = match.group(0)
+            lower = word.lower()
+            if len(lower) < _MIN_FUZZY_LEN or lower in self.terms:
+                return word
+            # An everyday word is only a mishearing when a neighbour is medical.
+            if lower in self.common and not any(
+                self._term(words[j].group(0)) for j in (i - 1, i + 1) if 0 <= j < len(words)
+            ):
+                return word
+            candidates = {
+                term for key in set(_deletes(lower)) for term in self._fuzzy.get(key, ())
+                if term[0] == lower[0] and _distance(lower, term, 1) <= 1 and not _inflection(lower, term)
+            }
+            if len(candidates) == 1:
+                replacement = _match_case(self.terms[candidates.pop()], word)
+                corrections.append(f"'{word}' -> '{replacement}'")
+                return replacement
+            if lower not in self.common and (candidates or self._near(lower)):
+                near_misses.append(word)
+            return word
+
+        parts, end = [], 0
+        for i, match in enumerate(words):
+            parts += [text[end:match.start()], _replace(match, i)]
+            end = match.end()
+        return "".join(parts) + text[end:], near_misses
+
+    def _near(self, word: str) -> bool:
+        """Whether ``word`` is two edits from a term (and not an inflection of one)."""
+        return any(
+            _distance(word, term, 2) <= 2 and not _inflection(word, term)
+            for term in self.terms
+            if len(term) >= _MIN_FUZZY_LEN and abs(len(term) - len(word)) <= 2 and term[0] == word[0]
+        )
+
+
+def _inflection(word: str, term: str) -> bool:
+    """Plurals and derived forms ("hypertensive" for "hypertension") are not
+    misspellings: they share all but the last few letters of the shorter word.
+    """
+    shared = 0
+    for a, b in zip(word, term):
+        if a != b:
+            break
+        shared += 1
+    return shared >= min(len(word), len(term)) - 3
+
+
+_lexicons: Dict[str, MedicalLexicon] = {}
+_lexicons_lock = threading.Lock()
+
+
+def lexicon_for(service_contexts: Dict[str, Dict[str, Any]]) -> MedicalLexicon:
+    """Process-wide lexicon for a set of service contexts (built once)."""
+    key = json.dumps(service_contexts, sort_keys=True, default=str)
+    with _lexicons_lock:
+        lexicon = _lexicons.get(key)
+        if lexicon is None:
+            lexicon = MedicalLexicon.from_service_contexts(service_contexts)
+            _lexicons[key] = lexicon
+        return lexicon
@@ -1,34 +1,58 @@
 """Multi-agent pipeline orchestrator for PresentIQ.
 
-Pipeline:
+Pipeline (dependency-driven — each agent starts as soon as its inputs exist):
 1. Transcription QA Agent
-2. Clinical Content Agent
-3. Clinical Reasoning Agent (with plan coherence)
-4. Parallel: Structure, Communication, Literature, Anticipatory (optional)
-5. Parallel: Debate (generous vs strict) + Contrastive Feedback
-6. Attending Synthesizer Agent (informed by debate + contrastive)
-7. Synthesis Critic → optional revision
+2. Parallel on the cleaned transcript: Clinical Content, Clinical Reasoning
+   (with plan coherence), Structure, Communication, Anticipatory (optional)
+3. Literature (needs reasoning gaps) alongside Debate (generous vs strict) and
+   Contrastive Feedback (both need the four core evaluator results)
+4. Attending Synthesizer Agent (informed by debate)
+5. Synthesis Critic → optional revision
+
+With late binding the Anticipatory agent leaves the graph: it runs in the
+background and its result is attached to the report when it finishes.
 """
 
-import openai
 import os
+import re
+import copy
+import sys
 import json
+import asyncio
+import contextvars
+import inspect
+import hashlib
 import yaml
-from typing import Dict, Any, Optional
+import threading
+import time
+import uuid
 from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from functools import partial
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
 from pathlib import Path
 
+from agents.base import BaseAgent, FieldCallback
 from agents.transcription_qa import TranscriptionQAAgent
 from agents.clinical_content import ClinicalContentAgent
 from agents.clinical_reasoning import ClinicalReasoningAgent
 from agents.structure_delivery import StructureDeliveryAgent
 from agents.communication_professionalism import CommunicationProfessionalismAgent
+from agents.core_evaluation import CoreEvaluationAgent
 from agents.anticipatory_reasoning import AnticipatoryReasoningAgent
 from agents.literature_learning import LiteratureLearningAgent
 from agents.debate import DebateAgent
 from agents.contrastive_feedback import ContrastiveFeedbackAgent
 from agents.synthesizer import SynthesizerAgent
 from agents.synthesis_critic import SynthesisCriticAgent
+from deadline import RunBudget, deadline_at, time_left
+from llm_cache import cache_key, get_cache
+from llm_clients import get_async_client, get_client
+from llm_retry import latencies
+from medical_lexicon import MedicalLexicon, lexicon_for
+from scheduler import Step, arun_graph, run_graph
+from synthesis_rules import LocalReview, review_synthesis
+from token_usage import UsageLedger, recording_usage
 
 
 _FORMATS_PATH = Path(__file__).parent / "configs" / "presentation_formats.yaml"
@@ -44,35 +68,236 @@ def load_presentation_formats() -> Dict[str, Any]:
 
 PRESENTATION_FORMATS = load_presentation_formats()
 
+_ROUTING_PATH = Path(os.getenv("MODEL_ROUTING_PATH", Path(__file__).parent / "configs" / "model_routing.yaml"))
+
+
+def load_model_routing(provider: str) -> Dict[str, Any]:
+    """Per-agent model settings for ``provider`` from configs/model_routing.yaml."""
+    if _ROUTING_PATH.exists():
+        with open(_ROUTING_PATH) as f:
+            data = yaml.safe_load(f) or {}
+        return data.get("OpenAI" if provider == "OpenAI" else "xAI") or {}
+    return {}
+
+# Edits that change less than this fraction of the transcript's words are
+# re-cleaned segment by segment and do not invalidate downstream agents.
+SIGNIFICANCE_THRESHOLD = float(os.getenv("INCREMENTAL_SIGNIFICANCE_THRESHOLD", "0.02"))
+
+# Transcripts the local medical-lexicon pass scores at or above this confidence
+# (with nothing left it could not resolve) skip the LLM cleanup call.  At 1.0
+# every word must be one the lexicon knows; lower values tolerate that share
+# of unknown words.
+LEXICON_PREPASS = os.getenv("QA_LEXICON_PREPASS", "1") == "1"
+LEXICON_SKIP_CONFIDENCE = float(os.getenv("QA_SKIP_CONFIDENCE", "1.0"))
+
+# Context keys kept in ``_run_state`` beyond what ``_agent_results`` holds.
+_STATE_KEYS = ("transcript", "cleaned_transcript", "service_context", "format_config", "synthesizer_result")
+
+# Markers of step outputs that are fallbacks, were cut short by a deadline, or
+# are still running in the background.
+_DEGRADED_MARKERS = ("_error", "_incomplete", "_revision_attempted", "_skipped", "_revision_skipped", "_pending")
+
+# Deadline mode: the fraction of ``deadline_s`` by which each step must finish.
+_DEADLINE_SHARES = {
+    "transcription_qa": 0.25,
+    "clinical_content": 0.6,
+    "clinical_reasoning": 0.6,
+    "structure_delivery": 0.6,
+    "communication_professionalism": 0.6,
+    "core_evaluation": 0.6,
+    "anticipatory_reasoning": 0.6,
+    "literature_learning": 0.75,
+    "debate": 0.75,
+    "contrastive_feedback": 0.8,
+    "synthesizer": 0.95,
+    "synthesis_critic": 1.0,
+}
+# Steps skipped, rather than started, when too little of their share is left.
+_OPTIONAL_STEPS = ("anticipatory_reasoning", "debate", "synthesis_critic")
+# Least time worth starting an optional LLM call with, absent latency history.
+MIN_STEP_S = float(os.getenv("DEADLINE_MIN_STEP_S", "5"))
+
+# Check the synthesis with local rules first and call the LLM critic only for
+# what the rules cannot settle.
+CRITIC_PRECHECK = os.getenv("CRITIC_PRECHECK", "1") == "1"
+
+# Completion budget for rewriting one synthesis field during targeted revision.
+FIELD_REVISION_TOKENS = int(os.getenv("FIELD_REVISION_TOKENS", "600"))
+
+# With several synthesis candidates, each one after the first runs this much
+# hotter than the one before it (capped at 1.0).
+CANDIDATE_TEMPERATURE_STEP = 0.3
+
+# Run the anticipatory agent in the background instead of ahead of the
+# synthesizer: the report comes back without waiting for it, and its result
+# is attached (and pushed as a ``late_result`` event) once it finishes.
+LATE_ANTICIPATORY = os.getenv("LATE_ANTICIPATORY", "0") == "1"
+
+# Late steps run here on the threaded path; on the async path they are tasks
+# on the caller's loop, referenced until done so they are not collected.
+_late_pool = ThreadPoolExecutor(thread_name_prefix="late-step")
+_late_tasks = set()
+
+# The critic step reads the synthesis plus every result it summarizes.
+_REVIEW_REQUIRES = (
+    "synthesizer_result",
+    "service_context",
+    "clinical_content_result",
+    "clinical_reasoning_result",
+    "structure_delivery_result",
+    "communication_professionalism_result",
+    "anticipatory_reasoning_result",
+    "literature_learning_result",
+)
+
+
+class _ReadTracker(dict):
+    """Context snapshot that records which keys a step actually reads."""
+
+    def __init__(self, context: Dict[str, Any]):
+        super().__init__(context)
+        self.reads = set()
+
+    def __getitem__(self, key):
+        self.reads.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.reads.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.reads.add(key)
+        return super().__contains__(key)
+
+
+# Keys each step has been seen reading beyond its declared ``requires``.
+_observed_reads: Dict[str, frozenset] = {}
+_observed_reads_lock = threading.Lock()
+
+
+class _LateSteps:
+    """Optional steps that run in the background instead of gating the report.
+
+    Each one starts as soon as its inputs exist (or is satisfied from an
+    earlier run or the step memo).  Results that are in by the time the
+    report is assembled go straight into it; the rest are attached later.
+    """
+
+    def __init__(self, steps: List[Step], reuse: Callable, memoized: Callable):
+        self.steps = steps
+        self.reuse = reuse
+        # The step-memo lookup reads SQLite: on the async path it runs in the
+        # step's task, on a worker thread, rather than on the loop.
+        self.memoized = memoized
+        self.asynchronous = False
+        self.lock = threading.Lock()
+        self.results: Dict[str, Dict[str, Any]] = {}
+        # Step name -> (future or task, start time).
+        self.running: Dict[str, Tuple[Any, float]] = {}
+
+    def launch_ready(self, context: Dict[str, Any], event_callback: Optional[callable]) -> None:
+        for step in self.steps:
+            if step.name in self.results or step.name in self.running:
+                continue
+            if not all(key in context for key in step.requires):
+                continue
+            reused = self.reuse(step, context)
+            if reused is None and not self.asynchronous:
+                reused = self.memoized(step, context)
+            if reused is not None:
+                self.results[step.name] = reused
+                continue
+            if self.asynchronous:
+                future = asyncio.ensure_future(self._arun_unless_memoized(step, dict(context)))
+                _late_tasks.add(future)
+                future.add_done_callback(_late_tasks.discard)
+            else:
+                future = _late_pool.submit(contextvars.copy_context().run, step.run, dict(context))
+            self.running[step.name] = (future, time.perf_counter())
+            if event_callback:
+                event_callback({"type": "late_started", "agent": step.name, "label": step.label})
+
+    async def _arun_unless_memoized(self, step: Step, context: Dict[str, Any]) -> Dict[str, Any]:
+        memoized = await asyncio.to_thread(self.memoized, step, context)
+        return memoized if memoized is not None else await step.arun(context)
+
+    def launching(self, on_finish: Callable, context: Dict[str, Any], event_callback: Optional[callable]) -> Callable:
+        """``on_finish`` hook that also starts the late steps whose inputs now exist."""
+        if not self.steps:
+            return on_finish
+
+        def _on_finish(step, updates, elapsed_s):
+            on_finish(step, updates, elapsed_s)
+            self.launch_ready(context, event_callback)
+
+        return _on_finish
+
+
+class _RunPlan(NamedTuple):
+    steps: List[Step]
+    reuse: Callable
+    # ``reuse`` for arun_graph, with the step-memo lookup off the event loop.
+    areuse: Callable
+    on_start: Callable
+    on_finish: Callable
+    reused: List[str]
+    previous_context: Optional[Dict[str, Any]]
+    budget: Optional[RunBudget]
+    usage: UsageLedger
+    late: _LateSteps
+
+
+def _degraded(result: Dict[str, Any]) -> bool:
+    """Whether a step output is a fallback or was cut short (never cache or reuse these)."""
+    return any(marker in result for marker in _DEGRADED_MARKERS)
+
 
 class FeedbackPipeline:
     def __init__(self, provider: str = "OpenAI"):
         self.provider = provider
 
         if provider == "OpenAI":
-            self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             self.model = os.getenv("AI_MODEL", "gpt-4")
         else:
-            self.client = openai.OpenAI(
-                api_key=os.getenv("XAI_API_KEY"),
-                base_url="https://api.x.ai/v1",
-            )
             self.model = os.getenv("AI_MODEL", "grok-3")
 
+        # Shared, connection-pooled clients (see llm_clients.py)
+        self.client = get_client(provider)
+        self.async_client = get_async_client(provider)
+
         self.temperature = float(os.getenv("FEEDBACK_TEMPERATURE", "0.3"))
 
-        kwargs = dict(client=self.client, model=self.model, temperature=self.temperature)
-        self.transcription_qa = TranscriptionQAAgent(**kwargs)
-        self.clinical_content = ClinicalContentAgent(**kwargs)
-        self.clinical_reasoning = ClinicalReasoningAgent(**kwargs)
-        self.structure_delivery = StructureDeliveryAgent(**kwargs)
-        self.communication_prof = CommunicationProfessionalismAgent(**kwargs)
-        self.anticipatory_reasoning = AnticipatoryReasoningAgent(**kwargs)
-        self.literature_learning = LiteratureLearningAgent(**kwargs)
-        self.debate = DebateAgent(**kwargs)
-        self.contrastive_feedback = ContrastiveFeedbackAgent(**kwargs)
-        self.synthesizer = SynthesizerAgent(**kwargs)
-        self.synthesis_critic = SynthesisCriticAgent(**kwargs)
+        # Each agent gets its own model, temperature and max_tokens from the routing table.
+        self.routing = load_model_routing(provider)
+        self.transcription_qa = self._make_agent(TranscriptionQAAgent)
+        self.clinical_content = self._make_agent(ClinicalContentAgent)
+        self.clinical_reasoning = self._make_agent(ClinicalReasoningAgent)
+        self.structure_delivery = self._make_agent(StructureDeliveryAgent)
+        self.communication_prof = self._make_agent(CommunicationProfessionalismAgent)
+        self.anticipatory_reasoning = self._make_agent(AnticipatoryReasoningAgent)
+        self.literature_learning = self._make_agent(LiteratureLearningAgent)
+        self.debate = self._make_agent(DebateAgent)
+        self.contrastive_feedback = self._make_agent(ContrastiveFeedbackAgent)
+        self.synthesizer = self._make_agent(SynthesizerAgent)
+        self.synthesis_critic = self._make_agent(SynthesisCriticAgent)
+        self.core_evaluation = self._make_agent(
+            CoreEvaluationAgent,
+            evaluators=[self.clinical_content, self.clinical_reasoning, self.structure_delivery, self.communication_prof],
+        )
+        # "separate" (one call per core evaluator), "fused" (one call for all
+        # four) or "auto" (fused for formats marked fused_evaluation).
+        self.core_evaluation_mode = os.getenv("CORE_EVALUATION_MODE", "separate")
+        # Above 1, that many syntheses are written concurrently and the critic
+        # picks the best instead of requesting a revision.
+        self.synthesis_candidates = int(os.getenv("SYNTHESIS_CANDIDATES", "1"))
+
+        self.prompt_version = self._prompt_version()
+        # Late steps still running, by the ``_late_id`` of their report.
+        self._late_runs: Dict[str, _LateSteps] = {}
+        self.run_cache = get_cache("pipeline_runs")
+        # Separate toggle: turning off the LLM response cache keeps step reuse.
+        self.step_cache = get_cache("step_results", toggle="STEP_MEMO_ENABLED")
 
     def run(
         self,
@@ -82,123 +307,1140 @@ class FeedbackPipeline:
         presentation_format: str = "full_hp",
         enable_anticipatory: bool = True,
         progress_callback: Optional[callable] = None,
+        event_callback: Optional[callable] = None,
+        previous: Optional[Dict[str, Any]] = None,
+        significance_threshold: Optional[float] = None,
+        deadline_s: Optional[float] = None,
+        late_anticipatory: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Run the full agent graph.
+
+        Pass the report of an earlier run as ``previous`` to re-analyze
+        incrementally: an edited transcript is re-cleaned only where it
+        changed, and every agent whose inputs are unchanged (or, for the
+        cleaned transcript, changed by less than ``significance_threshold``
+        of its words) reuses its earlier result instead of calling the LLM.
+
+        ``event_callback`` receives a dict when each step starts and when it
+        finishes (with its wall time and output), so callers can render
+        partial results before the synthesis is done.  With it, the
+        synthesizer and revision output are also streamed: each top-level
+        field arrives as a ``synthesis_field`` event once it is complete.
+
+        ``deadline_s`` bounds the run's wall time: every step gets a share of
+        the budget that caps its LLM calls, optional work (anticipatory
+        reasoning, debate, critic/revision) is skipped when its share is
+        nearly spent, and whatever was dropped is listed under ``_deadline``.
+
+        With ``late_anticipatory`` (default: ``LATE_ANTICIPATORY``) the
+        anticipatory agent does not gate the synthesizer.  If it is still
+        running when the report is ready, the report lists it under
+        ``_pending``, and the result arrives later as a ``late_result`` event
+        (the returned dict is not modified; the run is cached once it is
+        complete).  ``cancel_late`` stops it.  The deadline does not apply.
+        """
+        late = self._late_binding(enable_anticipatory, late_anticipatory)
+        context = self._initial_context(
+            transcript, service, service_contexts, presentation_format, enable_anticipatory and not late
+        )
+        run_key = self._run_cache_key(context, enable_anticipatory, late)
+        cached = self._cached_run(run_key)
+        if cached is not None:
+            return cached
+
+        plan = self._plan_run(
+            context, enable_anticipatory, progress_callback, event_callback,
+            previous, significance_threshold, deadline_s,
+            lexicon=lexicon_for(service_contexts) if LEXICON_PREPASS else None,
+            late=late,
+        )
+        run_graph(plan.steps, context, on_start=plan.on_start, reuse=plan.reuse, on_finish=plan.on_finish)
+        return self._finish_run(run_key, context, plan, event_callback)
+
+    async def arun(
+        self,
+        transcript: str,
+        service: str,
+        service_contexts: Dict[str, Dict],
+        presentation_format: str = "full_hp",
+        enable_anticipatory: bool = True,
+        progress_callback: Optional[callable] = None,
+        event_callback: Optional[callable] = None,
+        previous: Optional[Dict[str, Any]] = None,
+        significance_threshold: Optional[float] = None,
+        deadline_s: Optional[float] = None,
+        late_anticipatory: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Async variant of ``run`` on the async client.  Same agents, same
+        prompts and the same result shape, but every LLM call is awaited on
+        the caller's event loop instead of occupying a worker thread.
+        """
+        self._bind_async_client(get_async_client(self.provider))
+        late = self._late_binding(enable_anticipatory, late_anticipatory)
+        context = self._initial_context(
+            transcript, service, service_contexts, presentation_format, enable_anticipatory and not late
+        )
+        run_key = self._run_cache_key(context, enable_anticipatory, late)
+        # Cache and memo reads and writes go through worker threads, so a
+        # slow disk or a locked database never stalls the event loop.
+        cached = await asyncio.to_thread(self._cached_run, run_key)
+        if cached is not None:
+            return cached
+
+        plan = self._plan_run(
+            context, enable_anticipatory, progress_callback, event_callback,
+            previous, significance_threshold, deadline_s,
+            lexicon=lexicon_for(service_contexts) if LEXICON_PREPASS else None,
+            late=late,
+        )
+        # Late steps become tasks on this loop rather than pool threads.
+        plan.late.asynchronous = True
+        await arun_graph(plan.steps, context, on_start=plan.on_start, reuse=plan.areuse, on_finish=plan.on_finish)
+        result = self._finish_run(run_key, context, plan, event_callback, store=False)
+        return await asyncio.to_thread(self._store_run, run_key, result)
+
+    def _plan_run(
+        self,
+        context: Dict[str, Any],
+        enable_anticipatory: bool,
+        progress_callback: Optional[callable],
+        event_callback: Optional[callable],
+        previous: Optional[Dict[str, Any]],
+        significance_threshold: Optional[float],
+        deadline_s: Optional[float],
+        lexicon: Optional[MedicalLexicon] = None,
+        late: bool = False,
+    ) -> "_RunPlan":
+        previous_context = self._previous_context(previous)
+        threshold = SIGNIFICANCE_THRESHOLD if significance_threshold is None else significance_threshold
+        budget = RunBudget(deadline_s) if deadline_s else None
+        reused = []
+        usage = UsageLedger()
+
+        steps = self._build_steps(
+            enable_anticipatory and not late,
+            self._reclean_base(context, previous_context, threshold),
+            event_callback,
+            fused=self._fuses(context["format_config"]),
+            lexicon=lexicon,
+        )
+        if budget:
+            steps = [self._bounded(step, budget) for step in steps]
+        steps = [self._metered(step, usage) for step in steps]
+        on_start, on_finish = self._observers(steps, progress_callback, event_callback)
+        previous_reuse = self._reuse_hook(previous_context, threshold, reused)
+        reuse = self._chain_reuse(previous_reuse, self._memoized_result, self._budget_hook(budget))
+        areuse = self._achain_reuse(previous_reuse, self._amemoized_result, self._budget_hook(budget))
+
+        # Late steps are metered but not bounded: they no longer hold up the report.
+        late_steps = _LateSteps(
+            [self._metered(step, usage) for step in self._late_steps(enable_anticipatory and late)],
+            self._chain_reuse(previous_reuse),
+            self._memoized_result,
+        )
+        on_finish = late_steps.launching(on_finish, context, event_callback)
+        return _RunPlan(steps, reuse, areuse, on_start, on_finish, reused, previous_context, budget, usage, late_steps)
+
+    @staticmethod
+    def _late_binding(enable_anticipatory: bool, late_anticipatory: Optional[bool]) -> bool:
+        return enable_anticipatory and (LATE_ANTICIPATORY if late_anticipatory is None else late_anticipatory)
+
+    def _fuses(self, format_config: Dict[str, Any]) -> bool:
+        """Whether the core evaluators run as one fused call for this format."""
+        if self.core_evaluation_mode == "auto":
+            return bool(format_config.get("fused_evaluation"))
+        return self.core_evaluation_mode == "fused"
+
+    def _make_agent(self, agent_cls, **kwargs):
+        settings = {
+            **(self.routing.get("default") or {}),
+            **((self.routing.get("agents") or {}).get(agent_cls.agent_name) or {}),
+        }
+        temperature = settings.get("temperature")
+        return agent_cls(
+            client=self.client,
+            async_client=self.async_client,
+            model=settings.get("model") or self.model,
+            temperature=self.temperature if temperature is None else float(temperature),
+            max_tokens=settings.get("max_tokens"),
+            fallback_model=settings.get("fallback_model"),
+            **kwargs,
+        )
+
+    def _routes(self) -> Dict[str, Any]:
+        """The settings each agent actually runs with (part of every cache key)."""
+        routes = {
+            agent.agent_name: [agent.model, agent.temperature, agent.max_tokens, agent.fallback_model]
+            for agent in self._agents()
+        }
+        if self.synthesis_candidates > 1:
+            routes[self.synthesizer.agent_name].append(self.synthesis_candidates)
+        return routes
+
+    def _prompt_version(self) -> str:
+        """Hash of every agent module's source, the revision prompts and the
+        local lexicon and synthesis rules.
+
+        Any edit to a prompt template in agents/*.py, a lexicon term or a
+        synthesis rule changes this, so cached results produced by older
+        versions are never served.
+        """
+        modules = {type(agent).__module__ for agent in self._agents()} | {
+            BaseAgent.__module__,
+            MedicalLexicon.__module__,
+            LocalReview.__module__,
+        }
+        digest = hashlib.sha256()
+        for name in sorted(modules):
+            digest.update(inspect.getsource(sys.modules[name]).encode("utf-8"))
+        digest.update(inspect.getsource(FeedbackPipeline._revision_prompts).encode("utf-8"))
+        digest.update(inspect.getsource(FeedbackPipeline._field_revision_prompts).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _run_cache_key(self, context: Dict[str, Any], enable_anticipatory: bool, late: bool = False) -> str:
+        return cache_key(
+            transcript=context["transcript"],
+            service_context=context["service_context"],
+            format_config=context["format_config"],
+            enable_anticipatory=enable_anticipatory,
+            late_anticipatory=late,
+            fused=self._fuses(context["format_config"]),
+            routes=self._routes(),
+            prompt_version=self.prompt_version,
+        )
+
+    def _cached_run(self, run_key: str) -> Optional[Dict[str, Any]]:
+        cached = self.run_cache.get(run_key) if self.run_cache else None
+        if cached is None:
+            return None
+        result = json.loads(cached)
+        result["_from_cache"] = True
+        result["_usage"] = UsageLedger().report()
+        return result
+
+    def _store_run(self, run_key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache the final report unless some agent fell back, was cut short
+        or is still running.
+        """
+        degraded = _degraded(result) or any(
+            _degraded(agent_result) for agent_result in result["_agent_results"].values()
+        ) or bool(result.get("_deadline", {}).get("dropped"))
+        if self.run_cache and not degraded:
+            self.run_cache.set(run_key, json.dumps(result))
+        return result
+
+    # -- Late binding -------------------------------------------------------
+    #
+    # A late step's result goes into the report if it is in by the time the
+    # graph finishes; otherwise the report is returned with a ``_pending``
+    # placeholder and a ``_late_id``.  The caller's dict is never touched
+    # again: the result arrives as a ``late_result`` event, and is attached
+    # to the pipeline's own copy of the report, which is cached once nothing
+    # is pending.  ``cancel_late`` stops what is still running.
+
+    def _late_steps(self, enabled: bool) -> List[Step]:
+        if not enabled:
+            return []
+        return [self._memoize(self._agent_step(self.anticipatory_reasoning, "Tracing attending inner monologue"))]
+
+    def _finish_run(
+        self,
+        run_key: str,
+        context: Dict[str, Any],
+        plan: _RunPlan,
+        event_callback: Optional[callable],
+        store: bool = True,
+    ) -> Dict[str, Any]:
+        """Assemble the report, cached here if ``store`` and nothing is pending."""
+        result = self._assemble_result(context, plan)
+        late = plan.late
+        with late.lock:
+            for step in late.steps:
+                future = late.running.get(step.name, (None,))[0]
+                if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+                    # Finished (or answered from the step memo) just in time.
+                    late.results[step.name] = future.result()
+                    del late.running[step.name]
+                if step.name in late.results:
+                    result["_agent_results"][step.name] = late.results[step.name][step.provides[0]]
+                elif step.name in late.running:
+                    result["_agent_results"][step.name] = {"_pending": "running in the background"}
+                    result.setdefault("_pending", []).append(step.name)
+            if not result.get("_pending"):
+                return self._store_run(run_key, result) if store else result
+            result["_late_id"] = uuid.uuid4().hex
+            stored = json.loads(json.dumps(result))
+            self._late_runs[result["_late_id"]] = late
+
+        # Outside the lock: a future that is already done runs its callback here.
+        for step in late.steps:
+            if step.name in late.running:
+                future, started = late.running[step.name]
+                future.add_done_callback(
+                    partial(self._attach_late, run_key, stored, plan, step, started, event_callback)
+                )
+        return result
+
+    def cancel_late(self, result: Dict[str, Any]) -> None:
+        """Stop the late steps a report is still waiting for (e.g. its client
+        went away).  Async steps are cancelled outright; threaded ones only
+        if they have not started.
+        """
+        late = self._late_runs.pop(result.get("_late_id"), None)
+        if late is None:
+            return
+        for future, _ in list(late.running.values()):
+            future.cancel()
+
+    def _attach_late(
+        self,
+        run_key: str,
+        stored: Dict[str, Any],
+        plan: _RunPlan,
+        step: Step,
+        started: float,
+        event_callback: Optional[callable],
+        future,
+    ) -> None:
+        """Put a finished late step's result into the pipeline's copy of the
+        report, and hand it to the caller as a ``late_result`` event.
+        """
+        try:
+            value = future.result()[step.provides[0]]
+        except (Exception, asyncio.CancelledError) as e:
+            value = {"_error": str(e) or type(e).__name__}
+        elapsed_s = time.perf_counter() - started
+
+        with plan.late.lock:
+            stored["_agent_results"][step.name] = value
+            stored["_pending"] = [name for name in stored["_pending"] if name != step.name]
+            complete = not stored["_pending"]
+            if complete:
+                del stored["_pending"]
+                self._late_runs.pop(stored.pop("_late_id"), None)
+                stored["_usage"] = plan.usage.report()
+        if complete and plan.late.asynchronous:
+            # This callback runs on the event loop: write from a worker thread.
+            asyncio.get_running_loop().run_in_executor(None, self._store_run, run_key, stored)
+        elif complete:
+            self._store_run(run_key, stored)
+
+        if event_callback:
+            event_callback({
+                "type": "late_result",
+                "agent": step.name,
+                "label": step.label,
+                "elapsed_s": round(elapsed_s, 3),
+                "result": value,
+            })
+
+    # -- Per-step memo ------------------------------------------------------
+    #
+    # Every step's output is cached under the values of the context keys it
+    # reads, so re-running a transcript under another format or with the
+    # anticipatory agent toggled recomputes only the steps that read what
+    # changed (structure, synthesizer, critic) and reuses the rest.
+
+    @staticmethod
+    def _step_inputs(step: Step) -> Tuple[str, ...]:
+        with _observed_reads_lock:
+            extra = _observed_reads.get(step.name, frozenset())
+        return tuple(sorted(set(step.requires) | extra))
+
+    def _step_key(self, step: Step, context: Dict[str, Any]) -> Optional[str]:
+        inputs = self._step_inputs(step)
+        if not all(key in context for key in inputs):
+            return None
+        return cache_key(
+            step=step.name,
+            inputs={key: context[key] for key in inputs},
+            settings=self._step_settings(step.name),
+            routes=self._routes(),
+            prompt_version=self.prompt_version,
+        )
+
+    def _step_settings(self, name: str) -> Dict[str, Any]:
+        """Settings outside the routes that change a step's output."""
+        agent = next((agent for agent in self._agents() if agent.agent_name == name), None)
+        settings = agent.settings() if agent else {}
+        if name == self.transcription_qa.agent_name:
+            settings = {**settings, "lexicon_prepass": LEXICON_PREPASS, "skip_confidence": LEXICON_SKIP_CONFIDENCE}
+        return settings
+
+    def _memoized_result(self, step: Step, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = self._step_key(step, context) if self.step_cache else None
+        cached = self.step_cache.get(key) if key else None
+        return json.loads(cached) if cached is not None else None
+
+    async def _amemoized_result(self, step: Step, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.step_cache:
+            return None
+        return await asyncio.to_thread(self._memoized_result, step, context)
+
+    def _remember_step(self, step: Step, tracker: _ReadTracker, updates: Dict[str, Any]) -> None:
+        extra = frozenset(tracker.reads) - set(step.requires)
+        if extra:
+            with _observed_reads_lock:
+                _observed_reads[step.name] = _observed_reads.get(step.name, frozenset()) | extra
+
+        degraded = any(_degraded(value) for value in updates.values() if isinstance(value, dict))
+        key = self._step_key(step, tracker) if self.step_cache and not degraded else None
+        if key:
+            self.step_cache.set(key, json.dumps(_compact(updates)))
+
+    def _memoize(self, step: Step) -> Step:
+        def _run(context):
+            tracker = _ReadTracker(context)
+            updates = step.run(tracker)
+            self._remember_step(step, tracker, updates)
+            return updates
+
+        async def _arun(context):
+            tracker = _ReadTracker(context)
+            updates = await step.arun(tracker)
+            await asyncio.to_thread(self._remember_step, step, tracker, updates)
+            return updates
+
+        return step._replace(run=_run, arun=_arun)
+
+    @staticmethod
+    def _chain_reuse(*hooks):
+        hooks = [hook for hook in hooks if hook is not None]
+
+        def _reuse(step: Step, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            for hook in hooks:
+                reused = hook(step, context)
+                if reused is not None:
+                    return reused
+            return None
+
+        return _reuse
+
+    @staticmethod
+    def _achain_reuse(*hooks):
+        """``_chain_reuse`` for arun_graph: hooks may be coroutine functions."""
+        hooks = [hook for hook in hooks if hook is not None]
+
+        async def _reuse(step: Step, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            for hook in hooks:
+                reused = hook(step, context)
+                if inspect.isawaitable(reused):
+                    reused = await reused
+                if reused is not None:
+                    return reused
+            return None
+
+        return _reuse
+
+    @staticmethod
+    def _metered(step: Step, usage: UsageLedger) -> Step:
+        """Record the token usage of ``step``'s LLM calls into the run's ledger."""
+        def _run(context):
+            with recording_usage(usage):
+                return step.run(context)
+
+        async def _arun(context):
+            with recording_usage(usage):
+                return await step.arun(context)
+
+        return step._replace(run=_run, arun=_arun)
+
+    # -- Deadline mode ------------------------------------------------------
+
+    @staticmethod
+    def _expected_latency(agent_name: str) -> float:
+        return max(MIN_STEP_S, latencies.percentile(agent_name, 0.5) or 0.0)
+
+    def _bounded(self, step: Step, budget: RunBudget) -> Step:
+        """Run ``step`` under its share of the budget and record overruns."""
+        deadline = budget.mark(_DEADLINE_SHARES.get(step.name, 1.0))
+
+        def _run(context):
+            with deadline_at(deadline):
+                updates = step.run(context)
+            self._note_overrun(step, updates, budget, deadline)
+            return updates
+
+        async def _arun(context):
+            with deadline_at(deadline):
+                updates = await step.arun(context)
+            self._note_overrun(step, updates, budget, deadline)
+            return updates
+
+        return step._replace(run=_run, arun=_arun)
+
+    @staticmethod
+    def _note_overrun(step: Step, updates: Dict[str, Any], budget: RunBudget, deadline: float) -> None:
+        # An error this close to the step's deadline means the budget cut it short.
+        out_of_time = deadline - time.monotonic() < 1.0
+        for value in updates.values():
+            if not isinstance(value, dict):
+                continue
+            if "_error" in value and out_of_time:
+                budget.drop(step.name, "out of budget; fallback result used")
+            if "_revision_skipped" in value:
+                budget.drop("revision", value["_revision_skipped"])
+
+    def _budget_hook(self, budget: Optional[RunBudget]):
+        """Reuse hook that skips optional steps whose budget share is nearly spent."""
+        if budget is None:
+            return None
+
+        def _skip(step: Step, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if step.name not in _OPTIONAL_STEPS:
+                return None
+            left = budget.mark(_DEADLINE_SHARES[step.name]) - time.monotonic()
+            if left >= self._expected_latency(step.name):
+                return None
+            budget.drop(step.name, f"skipped: {max(left, 0.0):.1f}s of budget left")
+            if step.name == "synthesis_critic":
+                synthesis = _without_candidates(context["synthesizer_result"])
+                return {"synthesis_critic_result": {"_skipped": "deadline"}, "synthesis": synthesis}
+            return {key: {"_skipped": "deadline"} for key in step.provides}
+
+        return _skip
+
+    @staticmethod
+    def _previous_context(previous: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Rebuild the context of an earlier run from its report."""
+        if not previous or "_run_state" not in previous:
+            return None
+        context = dict(previous["_run_state"])
+        for name, result in previous.get("_agent_results", {}).items():
+            context[f"{name}_result"] = result
+        return context
+
+    @staticmethod
+    def _reclean_base(
+        context: Dict[str, Any], previous_context: Optional[Dict[str, Any]], threshold: float
+    ) -> Optional[Dict[str, Any]]:
+        """The earlier run to re-clean against, if the transcript edit is small."""
+        if previous_context is None or "transcription_qa_result" not in previous_context:
+            return None
+        if _change_ratio(previous_context["transcript"], context["transcript"]) > threshold:
+            return None
+        return previous_context
+
+    @staticmethod
+    def _reuse_hook(previous_context: Optional[Dict[str, Any]], threshold: float, reused: List[str]):
+        if previous_context is None:
+            return None
+        # Downstream agents judged the transcript they were run on, which may
+        # predate several small edits; measure drift against that text.
+        evaluated = previous_context.get("evaluated_transcript", previous_context.get("cleaned_transcript"))
+
+        def _unchanged(key: str, value: Any) -> bool:
+            if key not in previous_context:
+                return False
+            if key == "cleaned_transcript":
+                return _change_ratio(evaluated, value) <= threshold
+            return previous_context[key] == value
+
+        def _reuse(step: Step, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if not all(key in previous_context for key in step.provides):
+                return None
+            if any(_degraded(previous_context[key]) for key in step.provides if isinstance(previous_context[key], dict)):
+                return None
+            if not all(_unchanged(key, context[key]) for key in step.requires):
+                return None
+            reused.append(step.name)
+            return {key: previous_context[key] for key in step.provides}
+
+        return _reuse
+
+    def _agents(self) -> List[BaseAgent]:
+        return [agent for agent in vars(self).values() if isinstance(agent, BaseAgent)]
+
+    def _bind_async_client(self, async_client) -> None:
+        """Point the agents at the pooled async client of the running loop."""
+        if async_client is self.async_client:
+            return
+        self.async_client = async_client
+        for agent in self._agents():
+            agent.async_client = async_client
+
+    def _initial_context(
+        self,
+        transcript: str,
+        service: str,
+        service_contexts: Dict[str, Dict],
+        presentation_format: str,
+        enable_anticipatory: bool,
     ) -> Dict[str, Any]:
         service_context = service_contexts.get(
             service, service_contexts.get("internal_medicine_hospitalist", {})
         )
         format_config = PRESENTATION_FORMATS.get(presentation_format, {})
 
-        total_steps = 7
-
-        def _progress(name, step):
-            if progress_callback:
-                progress_callback(name, step, total_steps)
-
         context = {
             "transcript": transcript,
             "service_context": service_context,
             "format_config": format_config,
         }
+        if not enable_anticipatory:
+            context["anticipatory_reasoning_result"] = {}
+        return context
 
-        _progress("Cleaning transcription", 1)
-        qa_result = self.transcription_qa.run(context)
-        context["transcription_qa_result"] = qa_result
-        context["cleaned_transcript"] = qa_result.get("cleaned_transcript", transcript)
+    @staticmethod
+    def _observers(
+        steps: List[Step], progress_callback: Optional[callable], event_callback: Optional[callable]
+    ):
+        """Scheduler hooks feeding ``progress_callback(label, step, total)``
+        and per-step ``agent_started`` / ``agent_completed`` events.
+        """
+        started, finished = [], []
+
+        def _on_start(step):
+            started.append(step.name)
+            if progress_callback:
+                progress_callback(step.label, len(started), len(steps))
+            if event_callback:
+                event_callback({
+                    "type": "agent_started",
+                    "agent": step.name,
+                    "label": step.label,
+                    "completed": len(finished),
+                    "total": len(steps),
+                })
 
-        _progress("Evaluating clinical content", 2)
-        content_result = self.clinical_content.run(context)
-        context["clinical_content_result"] = content_result
+        def _on_finish(step, updates, elapsed_s):
+            finished.append(step.name)
+            if event_callback:
+                event_callback({
+                    "type": "agent_completed",
+                    "agent": step.name,
+                    "label": step.label,
+                    "elapsed_s": None if elapsed_s is None else round(elapsed_s, 3),
+                    "cached": elapsed_s is None,
+                    "completed": len(finished),
+                    "total": len(steps),
+                    "result": _compact(updates),
+                })
 
-        _progress("Evaluating clinical reasoning", 3)
-        reasoning_result = self.clinical_reasoning.run(context)
-        context["clinical_reasoning_result"] = reasoning_result
+        return _on_start, _on_finish
 
-        _progress("Running parallel evaluations", 4)
-        parallel_agents = {
-            "structure": self.structure_delivery,
-            "communication": self.communication_prof,
-            "literature": self.literature_learning,
+    def _assemble_result(self, context: Dict[str, Any], plan: _RunPlan) -> Dict[str, Any]:
+        steps, reused, previous_context = plan.steps, plan.reused, plan.previous_context
+        service_context = context["service_context"]
+        format_config = context["format_config"]
+
+        # Copy: without revision the synthesis is the synthesizer result itself.
+        synthesis = dict(context["synthesis"])
+        run_state = _compact({key: context[key] for key in _STATE_KEYS})
+        run_state["synthesis"] = context["synthesis"]
+        run_state["evaluated_transcript"] = context["cleaned_transcript"]
+        if any("cleaned_transcript" in step.requires for step in steps if step.name in reused):
+            run_state["evaluated_transcript"] = previous_context.get(
+                "evaluated_transcript", previous_context["cleaned_transcript"]
+            )
+        run_state["reused_steps"] = reused
+
+        synthesis["_agent_results"] = {
+            "transcription_qa": context["transcription_qa_result"],
+            "clinical_content": context["clinical_content_result"],
+            "clinical_reasoning": context["clinical_reasoning_result"],
+            "structure_delivery": context["structure_delivery_result"],
+            "communication_professionalism": context["communication_professionalism_result"],
+            "anticipatory_reasoning": context["anticipatory_reasoning_result"],
+            "literature_learning": context["literature_learning_result"],
+            "debate": context["debate_result"],
+            "contrastive_feedback": context["contrastive_feedback_result"],
+            "synthesis_critic": context["synthesis_critic_result"],
         }
+        synthesis["_run_state"] = run_state
+        if plan.budget:
+            synthesis["_deadline"] = plan.budget.report()
+        synthesis["_usage"] = plan.usage.report()
+
+        synthesis["service"] = service_context.get("name", "Unknown")
+        synthesis["specialty"] = service_context.get("specialty", "Unknown")
+        synthesis["presentation_format"] = format_config.get("name", "Standard")
+
+        return synthesis
+
+    def _build_steps(
+        self,
+        enable_anticipatory: bool,
+        reclean_base: Optional[Dict[str, Any]] = None,
+        event_callback: Optional[callable] = None,
+        fused: bool = False,
+        lexicon: Optional[MedicalLexicon] = None,
+    ) -> List[Step]:
+        """Declare the agent graph.  Each step starts as soon as the context
+        keys it reads exist, so e.g. structure and communication run alongside
+        content and reasoning rather than after them.  With ``fused`` the four
+        core evaluators are a single step producing all four results.  With a
+        ``lexicon`` transcription cleanup starts with the local lexicon pass.
+        """
+        if fused:
+            core = [self._fused_step(self.core_evaluation, "Evaluating content, reasoning, structure and communication")]
+        else:
+            core = [
+                self._agent_step(self.clinical_content, "Evaluating clinical content"),
+                self._agent_step(self.clinical_reasoning, "Evaluating clinical reasoning"),
+                self._agent_step(self.structure_delivery, "Assessing structure and delivery"),
+                self._agent_step(self.communication_prof, "Assessing communication"),
+            ]
         if enable_anticipatory:
-            parallel_agents["anticipatory"] = self.anticipatory_reasoning
+            core.append(self._agent_step(self.anticipatory_reasoning, "Tracing attending inner monologue"))
 
-        with ThreadPoolExecutor(max_workers=len(parallel_agents)) as executor:
-            futures = {
-                key: executor.submit(agent.run, context)
-                for key, agent in parallel_agents.items()
-            }
-            results = {key: future.result() for key, future in futures.items()}
+        steps = [
+            Step("transcription_qa", self.transcription_qa.requires,
+                 ("transcription_qa_result", "cleaned_transcript"),
+                 partial(self._run_transcription_qa, reclean_base=reclean_base, lexicon=lexicon),
+                 partial(self._arun_transcription_qa, reclean_base=reclean_base, lexicon=lexicon),
+                 "Cleaning transcription"),
+            *core,
+            self._agent_step(self.literature_learning, "Identifying teaching points"),
+            self._agent_step(self.debate, "Deliberating: generous vs strict"),
+            self._agent_step(self.contrastive_feedback, "Generating rewrites"),
+            self._synthesis_step(self._field_reporter("synthesizer", event_callback)),
+            Step("synthesis_critic", _REVIEW_REQUIRES, ("synthesis_critic_result", "synthesis"),
+                 partial(self._review_synthesis, on_field=self._field_reporter("revision", event_callback)),
+                 partial(self._areview_synthesis, on_field=self._field_reporter("revision", event_callback)),
+                 "Quality review"),
+        ]
+        return [self._memoize(step) for step in steps]
+
+    @staticmethod
+    def _field_reporter(source: str, event_callback: Optional[callable]) -> Optional[FieldCallback]:
+        if event_callback is None:
+            return None
+
+        def _on_field(field: str, value: Any) -> None:
+            event_callback({"type": "synthesis_field", "agent": source, "field": field, "value": value})
+
+        return _on_field
+
+    @staticmethod
+    def _agent_step(agent, label: str, on_field: Optional[FieldCallback] = None) -> Step:
+        key = f"{agent.agent_name}_result"
+
+        def _run(context):
+            return {key: agent.run(context, on_field=on_field)}
+
+        async def _arun(context):
+            return {key: await agent.arun(context, on_field=on_field)}
+
+        return Step(agent.agent_name, agent.requires, (key,), _run, _arun, label)
+
+    def _synthesis_step(self, on_field: Optional[FieldCallback]) -> Step:
+        """The synthesizer step; with ``synthesis_candidates`` above 1 it writes
+        that many candidates concurrently, at rising temperatures.  Only the
+        first is streamed.  The candidates ride along under ``_candidates``
+        for the critic to choose from; nothing stored or sent (the step memo,
+        ``_run_state``, ``agent_completed`` events) keeps more than their
+        count.
+        """
+        if self.synthesis_candidates <= 1:
+            return self._agent_step(self.synthesizer, "Synthesizing feedback", on_field)
+        variants = self._synthesizer_variants()
+
+        def _run(context):
+            with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, agent.run, context, on_field if i == 0 else None)
+                    for i, agent in enumerate(variants)
+                ]
+                return {"synthesizer_result": self._with_candidates([future.result() for future in futures])}
 
-        structure_result = results["structure"]
-        communication_result = results["communication"]
-        literature_result = results["literature"]
+        async def _arun(context):
+            results = await asyncio.gather(
+                *(agent.arun(context, on_field=on_field if i == 0 else None) for i, agent in enumerate(variants))
+            )
+            return {"synthesizer_result": self._with_candidates(list(results))}
+
+        return Step(self.synthesizer.agent_name, self.synthesizer.requires, ("synthesizer_result",), _run, _arun,
+                    f"Synthesizing {len(variants)} feedback candidates")
 
-        context["structure_delivery_result"] = structure_result
-        context["communication_professionalism_result"] = communication_result
-        context["literature_learning_result"] = literature_result
-        context["anticipatory_reasoning_result"] = results.get("anticipatory", {})
+    def _synthesizer_variants(self) -> List[SynthesizerAgent]:
+        variants = [self.synthesizer]
+        for i in range(1, self.synthesis_candidates):
+            variant = copy.copy(self.synthesizer)
+            variant.temperature = round(min(1.0, self.synthesizer.temperature + CANDIDATE_TEMPERATURE_STEP * i), 2)
+            variants.append(variant)
+        return variants
 
-        # Step 5: Debate + Contrastive Feedback in parallel
-        _progress("Deliberating and generating rewrites", 5)
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            future_debate = executor.submit(self.debate.run, context)
-            future_contrastive = executor.submit(self.contrastive_feedback.run, context)
+    @staticmethod
+    def _with_candidates(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """The first usable candidate, carrying every usable one under ``_candidates``."""
+        usable = [result for result in results if not _degraded(result)] or results[:1]
+        synthesis = dict(usable[0])
+        if len(usable) > 1:
+            synthesis["_candidates"] = usable
+        return synthesis
 
-            debate_result = future_debate.result()
-            contrastive_result = future_contrastive.result()
+    @staticmethod
+    def _fused_step(agent: CoreEvaluationAgent, label: str) -> Step:
+        def _run(context):
+            return agent.run(context)
 
-        context["debate_result"] = debate_result
-        context["contrastive_feedback_result"] = contrastive_result
+        async def _arun(context):
+            return await agent.arun(context)
 
-        # Step 6: Synthesis (informed by debate deliberation)
-        _progress("Synthesizing feedback", 6)
-        synthesis = self.synthesizer.run(context)
+        return Step(agent.agent_name, agent.requires, agent.provides, _run, _arun, label)
+
+    @staticmethod
+    def _qa_updates(qa_result: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "transcription_qa_result": qa_result,
+            "cleaned_transcript": qa_result.get("cleaned_transcript", context["transcript"]),
+        }
+
+    @staticmethod
+    def _lexicon_pass(
+        transcript: str, lexicon: Optional[MedicalLexicon]
+    ) -> Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Run the local lexicon pass over ``transcript``.
+
+        Returns the transcript to hand to the LLM cleanup, a summary of the
+        pass for the QA result, and — when the pass is confident enough that
+        no LLM call is needed — the finished QA result.
+        """
+        if lexicon is None:
+            return transcript, None, None
+        check = lexicon.check(transcript)
+        summary = {
+            "corrections_made": check.corrections,
+            "suspicious": check.suspicious,
+            "unknown": check.unknown,
+            "confidence": check.confidence,
+            "skipped_llm": False,
+        }
+        if check.confidence >= LEXICON_SKIP_CONFIDENCE and not check.suspicious:
+            summary["skipped_llm"] = True
+            return check.text, summary, {
+                "cleaned_transcript": check.text,
+                "corrections_made": check.corrections,
+                "unclear_segments": [],
+                "transcript_quality": "good",
+                "_lexicon": summary,
+                "_model": "local-lexicon",
+            }
+        return check.text, summary, None
 
-        # Step 7: Critique-revision loop
-        _progress("Quality review", 7)
-        critic_context = {
-            "synthesis": synthesis,
+    @staticmethod
+    def _with_lexicon(qa_result: Dict[str, Any], summary: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if summary is None:
+            return qa_result
+        qa_result["corrections_made"] = summary["corrections_made"] + list(qa_result.get("corrections_made") or [])
+        qa_result["_lexicon"] = summary
+        return qa_result
+
+    def _run_transcription_qa(
+        self,
+        context: Dict[str, Any],
+        reclean_base: Optional[Dict[str, Any]] = None,
+        lexicon: Optional[MedicalLexicon] = None,
+    ) -> Dict[str, Any]:
+        qa_result = None
+        if reclean_base is not None:
+            qa_result = self.transcription_qa.reclean(
+                context["transcript"], reclean_base["transcript"], reclean_base["transcription_qa_result"]
+            )
+        if qa_result is None:
+            transcript, summary, qa_result = self._lexicon_pass(context["transcript"], lexicon)
+            if qa_result is None:
+                qa_result = self._with_lexicon(self.transcription_qa.run({"transcript": transcript}), summary)
+        return self._qa_updates(qa_result, context)
+
+    async def _arun_transcription_qa(
+        self,
+        context: Dict[str, Any],
+        reclean_base: Optional[Dict[str, Any]] = None,
+        lexicon: Optional[MedicalLexicon] = None,
+    ) -> Dict[str, Any]:
+        qa_result = None
+        if reclean_base is not None:
+            qa_result = await self.transcription_qa.areclean(
+                context["transcript"], reclean_base["transcript"], reclean_base["transcription_qa_result"]
+            )
+        if qa_result is None:
+            transcript, summary, qa_result = self._lexicon_pass(context["transcript"], lexicon)
+            if qa_result is None:
+                qa_result = self._with_lexicon(await self.transcription_qa.arun({"transcript": transcript}), summary)
+        return self._qa_updates(qa_result, context)
+
+    def _critic_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "synthesis": _public_fields(context["synthesizer_result"]),
             "agent_results_summary": self.synthesizer._compile_agent_summaries(
-                content_result, reasoning_result, structure_result,
-                communication_result, context.get("anticipatory_reasoning_result", {}),
-                literature_result,
+                context["clinical_content_result"],
+                context["clinical_reasoning_result"],
+                context["structure_delivery_result"],
+                context["communication_professionalism_result"],
+                context["anticipatory_reasoning_result"],
+                context["literature_learning_result"],
             ),
-            "service_context": service_context,
+            "service_context": context["service_context"],
         }
-        critic_result = self.synthesis_critic.run(critic_context)
 
-        if not critic_result.get("is_acceptable", True) and critic_result.get("revision_instructions"):
-            synthesis = self._revise_synthesis(synthesis, critic_result, context)
+    @staticmethod
+    def _needs_revision(critic_result: Dict[str, Any]) -> bool:
+        return not critic_result.get("is_acceptable", True) and bool(critic_result.get("revision_instructions"))
 
-        synthesis["_agent_results"] = {
-            "transcription_qa": qa_result,
-            "clinical_content": content_result,
-            "clinical_reasoning": reasoning_result,
-            "structure_delivery": structure_result,
-            "communication_professionalism": communication_result,
-            "anticipatory_reasoning": context.get("anticipatory_reasoning_result", {}),
-            "literature_learning": literature_result,
-            "debate": debate_result,
-            "contrastive_feedback": contrastive_result,
-            "synthesis_critic": critic_result,
+    def _precheck(self, context: Dict[str, Any], synthesis: Optional[Dict[str, Any]] = None) -> Optional[LocalReview]:
+        if not CRITIC_PRECHECK:
+            return None
+        elements_missing = context["clinical_content_result"].get("elements_missing") or []
+        synthesis = context["synthesizer_result"] if synthesis is None else synthesis
+        return review_synthesis(_public_fields(synthesis), list(elements_missing))
+
+    @staticmethod
+    def _local_critic_result(local: LocalReview) -> Dict[str, Any]:
+        """Critic result from the local rules alone, when nothing needs escalating."""
+        return {
+            "issues_found": local.issues,
+            "is_acceptable": not local.issues,
+            "revision_instructions": " ".join(issue["suggested_fix"] + "." for issue in local.issues)
+            or "No revision needed.",
+            "_precheck": {"issues": len(local.issues), "escalated": []},
+            "_model": "local-rules",
         }
 
-        synthesis["service"] = service_context.get("name", "Unknown")
-        synthesis["specialty"] = service_context.get("specialty", "Unknown")
-        synthesis["presentation_format"] = format_config.get("name", "Standard")
+    @staticmethod
+    def _with_local_issues(critic_result: Dict[str, Any], local: Optional[LocalReview]) -> Dict[str, Any]:
+        """Add the issues the local rules are sure of to the LLM critic's."""
+        if local is None:
+            return critic_result
+        critic_result["_precheck"] = {"issues": len(local.issues), "escalated": local.escalate}
+        if not local.issues:
+            return critic_result
+        instructions = " ".join(issue["suggested_fix"] + "." for issue in local.issues)
+        if not critic_result.get("is_acceptable", True):
+            instructions = f"{instructions} {critic_result.get('revision_instructions', '')}".strip()
+        critic_result["issues_found"] = local.issues + list(critic_result.get("issues_found") or [])
+        critic_result["is_acceptable"] = False
+        critic_result["revision_instructions"] = instructions
+        return critic_result
 
-        return synthesis
+    def _review_synthesis(self, context: Dict[str, Any], on_field: Optional[FieldCallback] = None) -> Dict[str, Any]:
+        """Critique-revision loop over the synthesizer output.  The local
+        rules run first; the LLM critic is only called when they leave
+        something to escalate (or are turned off).
+        """
+        synthesis = context["synthesizer_result"]
+        candidates = synthesis.get("_candidates")
+        if candidates:
+            critic_result = self._locally_selected(context, candidates) or self.synthesis_critic.select(
+                self._critic_context(context), [_public_fields(candidate) for candidate in candidates]
+            )
+            return self._selected_synthesis(critic_result, candidates)
+
+        local = self._precheck(context)
+        if local is not None and not local.escalate:
+            critic_result = self._local_critic_result(local)
+        else:
+            critic_result = self._with_local_issues(self.synthesis_critic.run(self._critic_context(context)), local)
+
+        if self._needs_revision(critic_result) and self._revision_fits(critic_result):
+            synthesis = self._revise_synthesis(synthesis, critic_result, context, on_field)
+
+        return {"synthesis_critic_result": critic_result, "synthesis": synthesis}
+
+    async def _areview_synthesis(
+        self, context: Dict[str, Any], on_field: Optional[FieldCallback] = None
+    ) -> Dict[str, Any]:
+        synthesis = context["synthesizer_result"]
+        candidates = synthesis.get("_candidates")
+        if candidates:
+            critic_result = self._locally_selected(context, candidates) or await self.synthesis_critic.aselect(
+                self._critic_context(context), [_public_fields(candidate) for candidate in candidates]
+            )
+            return self._selected_synthesis(critic_result, candidates)
+
+        local = self._precheck(context)
+        if local is not None and not local.escalate:
+            critic_result = self._local_critic_result(local)
+        else:
+            critic_result = self._with_local_issues(
+                await self.synthesis_critic.arun(self._critic_context(context)), local
+            )
+
+        if self._needs_revision(critic_result) and self._revision_fits(critic_result):
+            synthesis = await self._arevise_synthesis(synthesis, critic_result, context, on_field)
+
+        return {"synthesis_critic_result": critic_result, "synthesis": synthesis}
+
+    def _locally_selected(self, context: Dict[str, Any], candidates: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Pick the first candidate the local rules find clearly clean, if any,
+        without calling the LLM critic.
+        """
+        for number, candidate in enumerate(candidates, 1):
+            local = self._precheck(context, candidate)
+            if local is not None and not local.issues and not local.escalate:
+                critic_result = self._local_critic_result(local)
+                critic_result["selected_candidate"] = number
+                return critic_result
+        return None
+
+    @staticmethod
+    def _selected_synthesis(critic_result: Dict[str, Any], candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        synthesis = candidates[critic_result["selected_candidate"] - 1]
+        return {"synthesis_critic_result": critic_result, "synthesis": synthesis}
+
+    def _revision_fits(self, critic_result: Dict[str, Any]) -> bool:
+        """Whether a revision pass fits in what is left of a latency budget."""
+        left = time_left()
+        if left is None or left >= self._expected_latency(self.synthesizer.agent_name):
+            return True
+        critic_result["_revision_skipped"] = f"skipped: {max(left, 0.0):.1f}s of budget left"
+        return False
 
     def _revise_synthesis(
-        self, synthesis: Dict[str, Any], critic_result: Dict[str, Any], context: Dict[str, Any]
+        self,
+        synthesis: Dict[str, Any],
+        critic_result: Dict[str, Any],
+        context: Dict[str, Any],
+        on_field: Optional[FieldCallback] = None,
+    ) -> Dict[str, Any]:
+        """Ask the synthesizer to revise based on critic feedback.  When every
+        issue's ``location`` names synthesis fields, only those fields are
+        rewritten, concurrently, and merged back into the synthesis.
+        """
+        fields = self._revision_targets(critic_result)
+        if fields:
+            system_prompt = self._field_revision_prompts(synthesis, critic_result, context)
+            with ThreadPoolExecutor(max_workers=len(fields)) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, self._revise_field, system_prompt, field)
+                    for field in fields
+                ]
+                updates = [future.result() for future in futures]
+            return self._merge_revised_fields(synthesis, updates, on_field)
+
+        system_prompt, user_prompt = self._revision_prompts(synthesis, critic_result, context)
+        try:
+            if on_field:
+                revised = self.synthesizer._stream_llm_json(
+                    system_prompt, user_prompt, on_field,
+                    max_tokens=self.synthesizer.max_tokens, schema=self.synthesizer.schema,
+                )
+            else:
+                revised = self.synthesizer._call_llm_json(
+                    system_prompt, user_prompt,
+                    max_tokens=self.synthesizer.max_tokens, schema=self.synthesizer.schema,
+                )
+        except Exception:
+            synthesis["_revision_attempted"] = True
+            return synthesis
+        return self._mark_revised(revised)
+
+    async def _arevise_synthesis(
+        self,
+        synthesis: Dict[str, Any],
+        critic_result: Dict[str, Any],
+        context: Dict[str, Any],
+        on_field: Optional[FieldCallback] = None,
+    ) -> Dict[str, Any]:
+        fields = self._revision_targets(critic_result)
+        if fields:
+            system_prompt = self._field_revision_prompts(synthesis, critic_result, context)
+            updates = await asyncio.gather(*(self._arevise_field(system_prompt, field) for field in fields))
+            return self._merge_revised_fields(synthesis, updates, on_field)
+
+        system_prompt, user_prompt = self._revision_prompts(synthesis, critic_result, context)
+        try:
+            if on_field:
+                revised = await self.synthesizer._astream_llm_json(
+                    system_prompt, user_prompt, on_field,
+                    max_tokens=self.synthesizer.max_tokens, schema=self.synthesizer.schema,
+                )
+            else:
+                revised = await self.synthesizer._acall_llm_json(
+                    system_prompt, user_prompt,
+                    max_tokens=self.synthesizer.max_tokens, schema=self.synthesizer.schema,
+                )
+        except Exception:
+            synthesis["_revision_attempted"] = True
+            return synthesis
+        return self._mark_revised(revised)
+
+    def _revision_targets(self, critic_result: Dict[str, Any]) -> Optional[List[str]]:
+        """Synthesis fields named by the issues' ``location``, or None if any
+        issue names none (the whole synthesis is then revised).
+        """
+        targets = []
+        for issue in critic_result.get("issues_found") or []:
+            location = str(issue.get("location", "") if isinstance(issue, dict) else "")
+            # "areas_for_improvement", "Areas for improvement" and "areas-for-improvement" all match.
+            words = f" {re.sub(r'[^a-z]+', ' ', location.lower())} "
+            named = [field for field in self.synthesizer.schema if f" {field.replace('_', ' ')} " in words]
+            if not named:
+                return None
+            targets.extend(field for field in named if field not in targets)
+        return targets or None
+
+    def _field_schema(self, field: str) -> Dict[str, Any]:
+        return {field: self.synthesizer.schema[field]}
+
+    def _field_user_prompt(self, field: str) -> str:
+        return (
+            f'Rewrite the "{field}" field. Return JSON with only that field: '
+            f"{json.dumps(self._field_schema(field))} (the value shows the JSON type)."
+        )
+
+    def _revise_field(self, system_prompt: str, field: str) -> Tuple[str, Optional[Any]]:
+        try:
+            revised = self.synthesizer._call_llm_json(
+                system_prompt, self._field_user_prompt(field),
+                max_tokens=FIELD_REVISION_TOKENS, schema=self._field_schema(field),
+            )
+        except Exception:
+            return field, None
+        return field, revised.get(field) if "_incomplete" not in revised else None
+
+    async def _arevise_field(self, system_prompt: str, field: str) -> Tuple[str, Optional[Any]]:
+        try:
+            revised = await self.synthesizer._acall_llm_json(
+                system_prompt, self._field_user_prompt(field),
+                max_tokens=FIELD_REVISION_TOKENS, schema=self._field_schema(field),
+            )
+        except Exception:
+            return field, None
+        return field, revised.get(field) if "_incomplete" not in revised else None
+
+    def _merge_revised_fields(
+        self,
+        synthesis: Dict[str, Any],
+        updates: List[Tuple[str, Optional[Any]]],
+        on_field: Optional[FieldCallback] = None,
     ) -> Dict[str, Any]:
-        """Ask the synthesizer to revise based on critic feedback."""
+        """Merge rewritten fields into a copy of the synthesis.  A field whose
+        rewrite failed keeps its original text and marks the revision as
+        attempted; if none succeeded the synthesis is returned as it was.
+        """
+        revised = dict(synthesis)
+        failed = [field for field, value in updates if value is None]
+        if len(failed) == len(updates):
+            synthesis["_revision_attempted"] = True
+            return synthesis
+        for field, value in updates:
+            if value is not None:
+                revised[field] = value
+                if on_field:
+                    self.synthesizer._report_fields([(field, value)], on_field)
+        revised = self._mark_revised(revised)
+        revised["_revised_fields"] = [field for field, value in updates if value is not None]
+        if failed:
+            revised["_revision_attempted"] = True
+        return revised
+
+    def _mark_revised(self, revised: Dict[str, Any]) -> Dict[str, Any]:
+        revised["overall_score"] = self.synthesizer._clean_score(revised.get("overall_score", 7))
+        revised["_revised"] = True
+        revised["_model"] = self.synthesizer._answered_model()
+        return revised
+
+    def _revision_prompts(
+        self, synthesis: Dict[str, Any], critic_result: Dict[str, Any], context: Dict[str, Any]
+    ) -> Tuple[str, str]:
         service_context = context["service_context"]
 
         system_prompt = f"""You are a senior attending physician on {service_context['name']}. You previously produced a feedback synthesis for a medical student's presentation, but a quality reviewer found issues.
 
 ORIGINAL SYNTHESIS:
-{json.dumps(synthesis, indent=2)}
+{json.dumps(_public_fields(synthesis), indent=2)}
 
 CRITIC FEEDBACK:
 {json.dumps(critic_result.get('issues_found', []), indent=2)}
@@ -209,15 +1451,56 @@ REVISION INSTRUCTIONS:
 Produce a REVISED version of the synthesis JSON that fixes the identified issues. Keep the same JSON structure. Only change what needs fixing — don't rewrite sections that were fine."""
 
         user_prompt = "Revise the synthesis to address the critic's feedback."
+        return system_prompt, user_prompt
 
-        try:
-            revised = self.synthesizer._call_llm_json(system_prompt, user_prompt, max_tokens=2500)
-            revised["overall_score"] = self.synthesizer._clean_score(revised.get("overall_score", 7))
-            revised["_revised"] = True
-            return revised
-        except Exception:
-            synthesis["_revision_attempted"] = True
-            return synthesis
+    def _field_revision_prompts(
+        self, synthesis: Dict[str, Any], critic_result: Dict[str, Any], context: Dict[str, Any]
+    ) -> str:
+        """System prompt shared by every field rewrite of one revision, so the
+        provider can serve it from its prompt cache after the first.
+        """
+        service_context = context["service_context"]
+
+        return f"""You are a senior attending physician on {service_context['name']}. You previously produced a feedback synthesis for a medical student's presentation, but a quality reviewer found issues in some of its fields.
+
+ORIGINAL SYNTHESIS:
+{json.dumps(_public_fields(synthesis), ensure_ascii=False)}
+
+CRITIC FEEDBACK:
+{json.dumps(critic_result.get('issues_found', []), ensure_ascii=False)}
+
+REVISION INSTRUCTIONS:
+{critic_result.get('revision_instructions', 'Address the issues found.')}
+
+You will be asked to rewrite one field of the synthesis. Fix the issues that concern that field, keep it consistent with the rest of the synthesis, and keep its length and style. Return JSON containing only that field."""
+
+
+def _without_candidates(synthesis: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in synthesis.items() if key != "_candidates"}
+
+
+def _compact(updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Step output with synthesis candidates reduced to their count, for
+    storing and sending once they are no longer needed in full.
+    """
+    compact = {}
+    for key, value in updates.items():
+        if isinstance(value, dict) and "_candidates" in value:
+            value = {**_without_candidates(value), "_candidate_count": len(value["_candidates"])}
+        compact[key] = value
+    return compact
+
+
+def _public_fields(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop bookkeeping keys (``_model``, ``_error``, ...) before showing a result to an LLM."""
+    return {key: value for key, value in result.items() if not key.startswith("_")}
+
+
+def _change_ratio(old: str, new: str) -> float:
+    """Fraction of words that differ between two transcripts (0.0 = identical)."""
+    if old == new:
+        return 0.0
+    return 1.0 - SequenceMatcher(None, old.split(), new.split(), autojunk=False).ratio()
 
 
 def get_format_options() -> Dict[str, str]:
@@ -0,0 +1,241 @@
+"""Process-wide adaptive rate limiter for LLM calls.
+
+One limiter per model, shared by every agent and every concurrent pipeline,
+paces requests with two token buckets: requests per minute and tokens per
+minute.  Each call reserves its estimated token cost up front and waits
+until both buckets can cover it, so a cohort of analyses fanning out at once
+is spread across the quota instead of bursting into 429s.
+
+The buckets adapt to the provider: ``x-ratelimit-*`` response headers set
+the real limits and pull the local budget down to what the provider says is
+left (keeping a safety margin), and a 429 pauses the model until its
+``retry-after`` has passed.
+
+Configuration (environment):
+    LLM_RATE_LIMIT_ENABLED   "0" disables pacing (default "1")
+    LLM_RPM_LIMIT            requests per minute per model (default 0: learn from headers)
+    LLM_TPM_LIMIT            tokens per minute per model (default 0: learn from headers)
+    LLM_RATE_SAFETY_MARGIN   fraction of each limit kept in reserve (default 0.05)
+    LLM_RATE_BURST_S         seconds of quota that may be spent in one burst (default 10)
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+from deadline import DeadlineExceeded, time_left
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse provider reset durations such as "20ms", "1s" or "6m0s"."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    """Per-minute budget that refills continuously (limit 0 = unlimited).
+
+    At most ``burst_s`` seconds' worth of budget accumulates, because
+    providers enforce their per-minute limits over shorter windows.
+    """
+
+    def __init__(self, per_minute: int, burst_s: float):
+        self.burst_s = burst_s
+        self.limit = 0.0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_limit(per_minute)
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.limit * self.burst_s / 60.0)
+
+    def set_limit(self, per_minute: float) -> None:
+        self.limit = float(per_minute)
+        self.tokens = self.capacity if self.limit else 0.0
+
+    def refill(self, now: float) -> None:
+        if self.limit:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Reserve ``amount`` and return how long the caller must wait for it."""
+        if not self.limit:
+            return 0.0
+        self.refill(now)
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens * 60.0 / self.limit)
+
+    def give_back(self, amount: float) -> None:
+        if self.limit:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def sync(self, limit: Optional[int], remaining: Optional[int], margin: float, now: float) -> None:
+        """Adopt the provider's limit and never believe we have more left than it does."""
+        if limit and limit != self.limit:
+            self.set_limit(limit)
+        if remaining is not None and self.limit:
+            self.refill(now)
+            self.tokens = min(self.tokens, remaining - margin * self.limit)
+
+
+class RateLimiter:
+    def __init__(
+        self, model: str, rpm: int = 0, tpm: int = 0, safety_margin: float = 0.05, burst_s: float = 10.0
+    ):
+        self.model = model
+        self.safety_margin = safety_margin
+        self._requests = _Bucket(rpm, burst_s)
+        self._tokens = _Bucket(tpm, burst_s)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "waited_calls": 0, "wait_s": 0.0, "rate_limited": 0, "deadline_exceeded": 0}
+
+    def acquire(self, tokens: int) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            self._check_deadline(wait, tokens)
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            self._check_deadline(wait, tokens)
+            await asyncio.sleep(wait)
+
+    def _check_deadline(self, wait: float, tokens: int) -> None:
+        """Fail now, returning the reservation, rather than sleep past the
+        current latency budget.
+        """
+        left = time_left()
+        if left is None or wait < left:
+            return
+        with self._lock:
+            self._requests.give_back(1)
+            self._tokens.give_back(tokens)
+            self._counters["waited_calls"] -= 1
+            self._counters["wait_s"] -= wait
+            self._counters["deadline_exceeded"] += 1
+        raise DeadlineExceeded(f"Rate limit wait of {wait:.1f}s exceeds the latency budget")
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._requests.take(1, now),
+                self._tokens.take(tokens, now),
+                self._paused_until - now,
+            )
+            self._counters["calls"] += 1
+            if wait > 0:
+                self._counters["waited_calls"] += 1
+                self._counters["wait_s"] += wait
+            return wait
+
+    def settle(self, reserved: int, used: Optional[int]) -> None:
+        """Return the unused part of a reservation once actual usage is known."""
+        if used is None:
+            return
+        with self._lock:
+            self._tokens.give_back(reserved - used)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Adapt to the ``x-ratelimit-*`` headers of a successful response."""
+        with self._lock:
+            now = time.monotonic()
+            self._requests.sync(
+                _header_int(headers, "x-ratelimit-limit-requests"),
+                _header_int(headers, "x-ratelimit-remaining-requests"),
+                self.safety_margin,
+                now,
+            )
+            self._tokens.sync(
+                _header_int(headers, "x-ratelimit-limit-tokens"),
+                _header_int(headers, "x-ratelimit-remaining-tokens"),
+                self.safety_margin,
+                now,
+            )
+
+    def penalize(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Pause this model after a 429 until the provider's retry-after passes."""
+        headers = headers or {}
+        retry_after = _parse_duration(headers.get("retry-after"))
+        retry_after_ms = _parse_duration(headers.get("retry-after-ms"))
+        if retry_after_ms is not None:
+            retry_after = retry_after_ms / 1000.0
+        if not retry_after:
+            retry_after = max(
+                _parse_duration(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                _parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0,
+            ) or 1.0
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + retry_after)
+            for bucket in (self._requests, self._tokens):
+                bucket.refill(now)
+                bucket.tokens = min(bucket.tokens, 0.0)
+            self._counters["rate_limited"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(
+                model=self.model,
+                rpm_limit=int(self._requests.limit),
+                tpm_limit=int(self._tokens.limit),
+                paused_s=round(max(0.0, self._paused_until - time.monotonic()), 3),
+            )
+        stats["wait_s"] = round(stats["wait_s"], 3)
+        return stats
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> Optional[RateLimiter]:
+    """Process-wide limiter for ``model`` (None when pacing is disabled)."""
+    if os.getenv("LLM_RATE_LIMIT_ENABLED", "1") == "0":
+        return None
+
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limiter = RateLimiter(
+                model,
+                rpm=int(os.getenv("LLM_RPM_LIMIT", "0")),
+                tpm=int(os.getenv("LLM_TPM_LIMIT", "0")),
+                safety_margin=float(os.getenv("LLM_RATE_SAFETY_MARGIN", "0.05")),
+                burst_s=float(os.getenv("LLM_RATE_BURST_S", "10")),
+            )
+            _limiters[model] = limiter
+        return limiter
+
+
+def rate_limiter_stats() -> List[Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
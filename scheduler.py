@@ -0,0 +1,170 @@
+"""Dependency-driven scheduler for the agent pipeline.
+
+Each step declares the context keys it reads and returns a dict of context
+keys it produces.  A step is started as soon as every key it requires is
+present in the context, so independent agents overlap instead of waiting
+on fixed stage barriers.  ``run_graph`` drives the steps on a thread pool;
+``arun_graph`` drives their async variants as tasks on the running loop.
+
+An optional ``reuse`` hook lets the caller satisfy a ready step from an
+earlier run (returning the step's ``provides`` keys) instead of running it;
+under ``arun_graph`` the hook may be a coroutine function, so lookups that
+do I/O stay off the event loop.
+``on_start`` / ``on_finish`` observe each step; ``on_finish`` receives the
+step's output and its wall time in seconds (None for reused steps).
+"""
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+
+class Step(NamedTuple):
+    name: str
+    requires: Tuple[str, ...]
+    provides: Tuple[str, ...]
+    run: Callable[[Dict[str, Any]], Dict[str, Any]]
+    arun: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    label: str = ""
+
+
+ReuseHook = Callable[[Step, Dict[str, Any]], Optional[Dict[str, Any]]]
+AsyncReuseHook = Callable[[Step, Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+FinishHook = Callable[[Step, Dict[str, Any], Optional[float]], None]
+
+
+def _take_ready(
+    pending: List[Step],
+    context: Dict[str, Any],
+    reuse: Optional[ReuseHook],
+    on_finish: Optional[FinishHook],
+) -> List[Step]:
+    """Pop the steps whose inputs exist.  Steps the reuse hook can satisfy
+    are merged into the context immediately (cascading to their dependents);
+    the rest are returned to be run.
+    """
+    to_run = []
+    while True:
+        ready = [step for step in pending if all(key in context for key in step.requires)]
+        if not ready:
+            return to_run
+        for step in ready:
+            pending.remove(step)
+            reused = reuse(step, context) if reuse else None
+            if reused is None:
+                to_run.append(step)
+            else:
+                context.update(reused)
+                if on_finish:
+                    on_finish(step, reused, None)
+
+
+async def _atake_ready(
+    pending: List[Step],
+    context: Dict[str, Any],
+    reuse: Optional[Union[ReuseHook, AsyncReuseHook]],
+    on_finish: Optional[FinishHook],
+) -> List[Step]:
+    """``_take_ready`` for a reuse hook that may return an awaitable."""
+    to_run = []
+    while True:
+        ready = [step for step in pending if all(key in context for key in step.requires)]
+        if not ready:
+            return to_run
+        for step in ready:
+            pending.remove(step)
+            reused = reuse(step, context) if reuse else None
+            if inspect.isawaitable(reused):
+                reused = await reused
+            if reused is None:
+                to_run.append(step)
+            else:
+                context.update(reused)
+                if on_finish:
+                    on_finish(step, reused, None)
+
+
+def _unsatisfiable(pending: List[Step], context: Dict[str, Any]) -> RuntimeError:
+    unmet = {
+        step.name: [key for key in step.requires if key not in context]
+        for step in pending
+    }
+    return RuntimeError(f"Pipeline steps have unsatisfiable inputs: {unmet}")
+
+
+def run_graph(
+    steps: List[Step],
+    context: Dict[str, Any],
+    max_workers: Optional[int] = None,
+    on_start: Optional[Callable[[Step], None]] = None,
+    reuse: Optional[ReuseHook] = None,
+    on_finish: Optional[FinishHook] = None,
+) -> Dict[str, Any]:
+    """Run ``steps`` against ``context``, merging each step's output back in.
+
+    Steps receive a snapshot of the context taken when they are started, so
+    concurrently running agents never observe a half-updated dict.
+    """
+    pending = list(steps)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(steps), 1)) as executor:
+        while pending or running:
+            for step in _take_ready(pending, context, reuse, on_finish):
+                if on_start:
+                    on_start(step)
+                running[executor.submit(step.run, dict(context))] = (step, time.perf_counter())
+
+            if not running:
+                if pending:
+                    raise _unsatisfiable(pending, context)
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, started = running.pop(future)
+                updates = future.result()
+                context.update(updates)
+                if on_finish:
+                    on_finish(step, updates, time.perf_counter() - started)
+
+    return context
+
+
+async def arun_graph(
+    steps: List[Step],
+    context: Dict[str, Any],
+    on_start: Optional[Callable[[Step], None]] = None,
+    reuse: Optional[Union[ReuseHook, AsyncReuseHook]] = None,
+    on_finish: Optional[FinishHook] = None,
+) -> Dict[str, Any]:
+    """Async counterpart of ``run_graph``; no threads are created."""
+    pending = list(steps)
+    running = {}
+
+    try:
+        while pending or running:
+            for step in await _atake_ready(pending, context, reuse, on_finish):
+                if on_start:
+                    on_start(step)
+                running[asyncio.ensure_future(step.arun(dict(context)))] = (step, time.perf_counter())
+
+            if not running:
+                if pending:
+                    raise _unsatisfiable(pending, context)
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step, started = running.pop(task)
+                updates = task.result()
+                context.update(updates)
+                if on_finish:
+                    on_finish(step, updates, time.perf_counter() - started)
+    finally:
+        for task in running:
+            task.cancel()
+
+    return context
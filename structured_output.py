@@ -0,0 +1,139 @@
+"""Tolerant parsing and schema checks for agents' JSON output.
+
+Completions are requested in the provider's JSON mode where the model
+supports it, but a reply can still arrive wrapped in a code fence, followed
+by prose, or cut off by ``max_tokens``.  ``parse_json_object`` recovers the
+object from all three: for a truncated reply it keeps every field that was
+complete and closes the brackets that were left open.
+
+Each agent declares a ``schema`` — its top-level fields and their JSON types,
+with nested objects given as nested dicts.  ``missing_fields`` lists the
+fields a parsed result lacks (by dotted path), so the agent can ask for just
+those instead of re-running the whole call, and ``merge_fields`` folds the
+answer back in.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# A schema maps field names to a JSON type name or to a nested schema.
+Schema = Dict[str, Any]
+
+_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+# Truncated replies are cut back at most this many candidate points.
+_MAX_REPAIR_TRIES = 200
+# Scores such as "8/10" or "7 - good": agents' postprocessing already parses
+# these, so they are not worth a follow-up call.
+_NUMERIC_STRING = re.compile(r"\d")
+
+
+def parse_json_object(raw: str) -> Dict[str, Any]:
+    """The JSON object in ``raw``, repaired if it was truncated.
+
+    Raises ``ValueError`` when there is no object to recover.
+    """
+    start = raw.find("{")
+    if start < 0:
+        raise ValueError("Completion contains no JSON object")
+    try:
+        result, _ = json.JSONDecoder().raw_decode(raw, start)
+    except json.JSONDecodeError:
+        result = _repair_truncated(raw[start:])
+    if not isinstance(result, dict):
+        raise ValueError("Completion is not a JSON object")
+    return result
+
+
+def _repair_truncated(text: str) -> Dict[str, Any]:
+    """Cut ``text`` back to its last complete value and close what is open."""
+    # (cut position, closing brackets needed there), in text order.
+    cuts = []
+    stack: List[str] = []
+    in_string = escaped = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+                cuts.append((i + 1, "".join(reversed(stack))))
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            if c == "{":
+                cuts.append((i + 1, "".join(reversed(stack))))
+        elif c in "}]":
+            if not stack:
+                break
+            stack.pop()
+            cuts.append((i + 1, "".join(reversed(stack))))
+            if not stack:
+                break
+        elif c == ",":
+            cuts.append((i, "".join(reversed(stack))))
+
+    for position, closers in reversed(cuts[-_MAX_REPAIR_TRIES:]):
+        try:
+            return json.loads(text[:position] + closers)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Completion is not valid JSON and could not be repaired")
+
+
+def _has_type(value: Any, kind: str) -> bool:
+    if kind == "number" and isinstance(value, bool):
+        return False
+    if kind == "number" and isinstance(value, str):
+        return bool(_NUMERIC_STRING.search(value))
+    return isinstance(value, _TYPES.get(kind, object))
+
+
+def missing_fields(result: Dict[str, Any], schema: Optional[Schema], prefix: str = "") -> List[str]:
+    """Dotted paths of the ``schema`` fields that ``result`` lacks or has
+    with the wrong type.  A "number" may be a string containing a number.
+    """
+    missing = []
+    for field, kind in (schema or {}).items():
+        value = result.get(field)
+        if isinstance(kind, dict):
+            if isinstance(value, dict):
+                missing.extend(missing_fields(value, kind, f"{prefix}{field}."))
+            else:
+                missing.append(f"{prefix}{field}")
+        elif not _has_type(value, kind):
+            missing.append(f"{prefix}{field}")
+    return missing
+
+
+def schema_outline(schema: Schema, paths: List[str]) -> Schema:
+    """The part of ``schema`` covering ``paths``, as a nested dict of types."""
+    outline: Schema = {}
+    for path in paths:
+        node, target = schema, outline
+        *parents, leaf = path.split(".")
+        for name in parents:
+            node = node[name]
+            target = target.setdefault(name, {})
+        target[leaf] = node[leaf]
+    return outline
+
+
+def merge_fields(result: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold ``extra`` into ``result``, recursing into nested objects."""
+    for field, value in extra.items():
+        if isinstance(value, dict) and isinstance(result.get(field), dict):
+            merge_fields(result[field], value)
+        else:
+            result[field] = value
+    return result
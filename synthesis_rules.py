@@ -0,0 +1,162 @@
+"""Deterministic pre-critic for the synthesized feedback.
+
+Three of the synthesis critic's checks are mechanical enough to run locally
+in milliseconds:
+
+* contradictions — a strength and an area for improvement about the same
+  thing, found by the overlap of their content words;
+* vague advice — improvements that match a list of stock phrases or are too
+  short to act on;
+* missed priorities — top items of clinical content's ``elements_missing``
+  that the synthesis never mentions.
+
+``review_synthesis`` returns the issues it is sure of, in the critic's own
+issue format, plus the reasons (if any) the LLM critic should still read
+it: near overlaps that may or may not be contradictions, vague phrases
+inside otherwise specific advice, and scores extreme enough that tone
+matters.  The pipeline skips the LLM critic when there is nothing to
+escalate.
+"""
+
+import re
+from typing import Any, Dict, List, NamedTuple, Set
+
+# Stock advice that tells the student nothing they can act on.
+VAGUE_PHRASES = (
+    "improve your presentation",
+    "improve the presentation",
+    "improve presentation skills",
+    "improve organization",
+    "improve clarity",
+    "improve your delivery",
+    "be more concise",
+    "be more organized",
+    "be more thorough",
+    "be more confident",
+    "be more specific",
+    "be more clear",
+    "more detail",
+    "more practice",
+    "practice more",
+    "keep practicing",
+    "continue to practice",
+    "keep up the good work",
+    "work on your",
+    "read more",
+    "study more",
+    "needs improvement",
+)
+
+_STOPWORDS = {
+    "about", "after", "also", "and", "are", "being", "both", "but", "for", "from", "had", "has", "have", "into",
+    "its", "more", "most", "not", "that", "the", "their", "them", "then", "there", "these", "this", "was", "were",
+    "what", "when", "which", "while", "with", "your", "you", "very", "well", "good", "great", "better", "student",
+    "presentation", "patient", "should", "could", "would", "make", "sure", "overall", "clear", "clearly",
+}
+# Improvements with fewer content words than this are too short to act on.
+_MIN_ADVICE_WORDS = 3
+# Share of the smaller item's content words two items must share to be a
+# contradiction (with at least two words in common), or to need a closer look.
+_CONTRADICTION_OVERLAP = 0.6
+_AMBIGUOUS_OVERLAP = 0.34
+# Improvements this long that still contain a vague phrase need a closer look.
+_SPECIFIC_ADVICE_WORDS = 12
+# How many of clinical content's missing elements count as top priority.
+_TOP_MISSING = 3
+# Overall scores at or beyond these are where tone is most likely to jar.
+_EXTREME_SCORES = (4, 9)
+
+_TEXT_FIELDS = (
+    "overall_assessment",
+    "clinical_content",
+    "clinical_reasoning",
+    "presentation_structure",
+    "communication_professionalism",
+    "service_specific_feedback",
+    "strengths",
+    "areas_for_improvement",
+    "teaching_points",
+    "suggested_reading",
+)
+
+
+class LocalReview(NamedTuple):
+    issues: List[Dict[str, str]]
+    escalate: List[str]
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def content_words(text: str) -> Set[str]:
+    return {_stem(word) for word in re.findall(r"[a-z]+", text.lower()) if len(word) > 2 and word not in _STOPWORDS}
+
+
+def _items(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(item) for item in value if item]
+    return [str(value)] if value else []
+
+
+def _overlap(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / min(len(a), len(b)) if a and b else 0.0
+
+
+def review_synthesis(synthesis: Dict[str, Any], elements_missing: List[str]) -> LocalReview:
+    issues: List[Dict[str, str]] = []
+    escalate: List[str] = []
+    strengths = _items(synthesis.get("strengths"))
+    improvements = _items(synthesis.get("areas_for_improvement"))
+
+    for strength in strengths:
+        strength_words = content_words(strength)
+        for improvement in improvements:
+            improvement_words = content_words(improvement)
+            overlap = _overlap(strength_words, improvement_words)
+            if overlap >= _CONTRADICTION_OVERLAP and len(strength_words & improvement_words) >= 2:
+                issues.append({
+                    "type": "contradiction",
+                    "description": f'Praised as a strength ("{strength}") and listed for improvement ("{improvement}")',
+                    "location": "strengths, areas_for_improvement",
+                    "suggested_fix": "Keep the point in one list, or make clear which part was done well and which was not",
+                })
+            elif overlap >= _AMBIGUOUS_OVERLAP:
+                escalate.append(f'possible contradiction: "{strength}" / "{improvement}"')
+
+    for improvement in improvements:
+        lowered = improvement.lower()
+        phrase = next((phrase for phrase in VAGUE_PHRASES if phrase in lowered), None)
+        if len(content_words(improvement)) < _MIN_ADVICE_WORDS or (
+            phrase and len(improvement.split()) < _SPECIFIC_ADVICE_WORDS
+        ):
+            issues.append({
+                "type": "vague_advice",
+                "description": f'"{improvement}" is not specific enough to act on',
+                "location": "areas_for_improvement",
+                "suggested_fix": "Say exactly what to change, where in the presentation, and what it should sound like",
+            })
+        elif phrase:
+            escalate.append(f'stock phrase in specific advice: "{improvement}"')
+
+    text = " ".join(item for field in _TEXT_FIELDS for item in _items(synthesis.get(field)))
+    covered = content_words(text)
+    for element in elements_missing[:_TOP_MISSING]:
+        element_words = content_words(str(element))
+        # Mentioned if most of its words appear anywhere in the synthesis.
+        if element_words and len(element_words & covered) * 2 <= len(element_words):
+            issues.append({
+                "type": "missed_priority",
+                "description": f'Clinical content found "{element}" missing, but the synthesis never mentions it',
+                "location": "areas_for_improvement",
+                "suggested_fix": f'Add a specific improvement about "{element}"',
+            })
+
+    score = synthesis.get("overall_score")
+    if isinstance(score, (int, float)) and not _EXTREME_SCORES[0] < score < _EXTREME_SCORES[1]:
+        escalate.append(f"overall score {score} — check tone")
+
+    return LocalReview(issues, escalate)
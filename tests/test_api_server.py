@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import api_server
+from api_server import AnalysisLimiter, AnalyzeRequest
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = AnalysisLimiter(max_concurrent=1, max_queued=1, queue_timeout=0.05, retry_after=7)
+    monkeypatch.setattr(api_server, "limiter", limiter)
+    return limiter
+
+
+class FailingPipeline:
+    async def arun(self, **kwargs):
+        raise RuntimeError("pipeline failed")
+
+
+class FinishingPipeline:
+    async def arun(self, event_callback=None, **kwargs):
+        return {"overall_score": 7}
+
+
+class Generator:
+    service_contexts = {}
+
+
+def _use_pipeline(monkeypatch, pipeline):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(api_server, "get_pipeline", lambda: pipeline)
+    monkeypatch.setattr(api_server, "get_feedback_generator", lambda: Generator())
+
+
+def _request():
+    return AnalyzeRequest(transcript="Patient with chest pain.")
+
+
+def test_admission_releases_its_slot_once(limiter):
+    async def main():
+        admission = await limiter.admit()
+        assert limiter.running == 1
+        admission.release()
+        admission.release()
+        assert limiter.running == 0
+        # The slot is free again.
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        limiter.release()
+
+    asyncio.run(main())
+
+
+def test_full_queue_is_rejected_with_429(limiter):
+    async def main():
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            await limiter.acquire()
+        await asyncio.gather(queued, return_exceptions=True)
+        return rejected.value
+
+    error = asyncio.run(main())
+
+    assert error.status_code == 429
+    assert error.headers == {"Retry-After": "7"}
+    assert (limiter.running, limiter.queued) == (1, 0)
+
+
+def test_queue_timeout_is_rejected_with_503(limiter):
+    async def main():
+        await limiter.acquire()
+        with pytest.raises(HTTPException) as rejected:
+            await limiter.acquire()
+        limiter.release()
+        return rejected.value
+
+    error = asyncio.run(main())
+
+    assert error.status_code == 503
+    assert (limiter.running, limiter.queued) == (0, 0)
+
+
+def test_analyze_releases_on_success_and_failure(limiter, monkeypatch):
+    _use_pipeline(monkeypatch, FinishingPipeline())
+    assert asyncio.run(api_server.analyze_presentation(_request())) == {"overall_score": 7}
+    assert limiter.running == 0
+
+    _use_pipeline(monkeypatch, FailingPipeline())
+    with pytest.raises(HTTPException) as failed:
+        asyncio.run(api_server.analyze_presentation(_request()))
+    assert failed.value.status_code == 500
+    assert limiter.running == 0
+
+
+def _stream(limiter, consume):
+    async def main():
+        response = await api_server.analyze_presentation_stream(_request())
+        assert limiter.running == 1
+        events = await consume(response.body_iterator)
+        await response.background()
+        return events
+
+    return asyncio.run(main())
+
+
+async def _consume_all(body):
+    return [event async for event in body]
+
+
+async def _disconnect_immediately(body):
+    # The client left before the body was iterated.
+    return []
+
+
+async def _disconnect_after_first_event(body):
+    first = await body.__anext__()
+    await body.aclose()
+    return [first]
+
+
+def test_stream_releases_when_finished(limiter, monkeypatch):
+    _use_pipeline(monkeypatch, FinishingPipeline())
+
+    events = _stream(limiter, _consume_all)
+
+    assert '"type": "result"' in events[-1]
+    assert limiter.running == 0
+
+
+def test_stream_releases_on_pipeline_failure(limiter, monkeypatch):
+    _use_pipeline(monkeypatch, FailingPipeline())
+
+    events = _stream(limiter, _consume_all)
+
+    assert '"type": "error"' in events[-1]
+    assert limiter.running == 0
+
+
+@pytest.mark.parametrize("consume", [_disconnect_immediately, _disconnect_after_first_event])
+def test_stream_releases_on_disconnect(limiter, monkeypatch, consume):
+    _use_pipeline(monkeypatch, FinishingPipeline())
+
+    _stream(limiter, consume)
+
+    assert limiter.running == 0
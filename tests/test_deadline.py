@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded, RunBudget, check_deadline, deadline_at, time_left
+
+
+def test_no_deadline_by_default():
+    assert time_left() is None
+    assert check_deadline() is None
+
+
+def test_deadline_at_sets_and_restores_the_deadline():
+    with deadline_at(time.monotonic() + 10):
+        assert 9 < time_left() <= 10
+        with deadline_at(None):
+            # None keeps the enclosing deadline.
+            assert 9 < time_left() <= 10
+
+    assert time_left() is None
+
+
+def test_earlier_enclosing_deadline_wins():
+    with deadline_at(time.monotonic() + 5):
+        with deadline_at(time.monotonic() + 60):
+            assert time_left() <= 5
+        with deadline_at(time.monotonic() + 1):
+            assert time_left() <= 1
+
+
+def test_check_deadline_raises_once_it_has_passed():
+    with deadline_at(time.monotonic() - 1):
+        with pytest.raises(DeadlineExceeded):
+            check_deadline()
+
+    with deadline_at(time.monotonic() + 10):
+        assert check_deadline() > 9
+
+
+def test_deadline_follows_async_tasks():
+    async def left():
+        return time_left()
+
+    async def main():
+        with deadline_at(time.monotonic() + 10):
+            inside = await asyncio.ensure_future(left())
+        return inside, await asyncio.ensure_future(left())
+
+    inside, outside = asyncio.run(main())
+
+    assert 9 < inside <= 10 and outside is None
+
+
+def test_run_budget_marks_fractions_of_its_seconds():
+    budget = RunBudget(20)
+
+    assert budget.mark(0) == budget.started
+    assert budget.mark(0.25) == budget.started + 5
+    assert budget.mark(1.0) == budget.started + 20
+
+
+def test_run_budget_reports_what_was_dropped():
+    budget = RunBudget(20)
+    budget.drop("debate", "skipped: 0.5s of budget left")
+    budget.dropped.append({"step": "outside"})
+
+    report = budget.report()
+
+    assert report["deadline_s"] == 20
+    assert 0 <= report["elapsed_s"] < 1
+    assert report["dropped"] == [{"step": "debate", "reason": "skipped: 0.5s of budget left"}]
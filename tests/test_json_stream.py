@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from json_stream import JSONFieldStream
+
+
+COMPLETION = """```json
+{
+  "overall_assessment": "Solid \\"SBAR\\" with a {brief} gap, then more",
+  "strengths": ["clear, concise summary", "named the [key] finding"],
+  "scores": {"overall": 7, "nested": {"a": [1, 2]}},
+  "overall_score": 7.5,
+  "ready": true,
+  "notes": null
+}
+```"""
+
+
+def _feed_in_chunks(text, size):
+    stream = JSONFieldStream()
+    fields = []
+    for start in range(0, len(text), size):
+        fields.extend(stream.feed(text[start:start + size]))
+    return stream, fields
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 64, len(COMPLETION)])
+def test_fields_survive_any_chunk_boundary(size):
+    stream, fields = _feed_in_chunks(COMPLETION, size)
+
+    expected = json.loads(COMPLETION.split("```json")[1].split("```")[0])
+    assert fields == list(expected.items())
+    assert stream.done
+
+
+def test_field_is_reported_as_soon_as_it_is_complete():
+    stream = JSONFieldStream()
+
+    assert stream.feed('{"overall_assessment": "Go') == []
+    assert stream.feed('od work"') == []
+    # The comma closes the value.
+    assert stream.feed(', "strengths": [') == [("overall_assessment", "Good work")]
+    assert stream.feed('"a"]}') == [("strengths", ["a"])]
+
+
+def test_text_after_the_object_is_ignored():
+    stream = JSONFieldStream()
+
+    assert stream.feed('Sure! {"a": 1} and {"b": 2}') == [("a", 1)]
+    assert stream.feed('{"c": 3}') == []
+    assert stream.done
+
+
+def test_truncated_value_is_never_reported():
+    stream = JSONFieldStream()
+
+    assert stream.feed('{"a": 1, "b": "cut off') == [("a", 1)]
+    assert not stream.done
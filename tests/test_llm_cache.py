@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import llm_cache
+from agents.clinical_reasoning import ClinicalReasoningAgent
+from llm_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_cache_key_is_order_independent():
+    assert cache_key(model="m", messages=[1]) == cache_key(messages=[1], model="m")
+    assert cache_key(model="m", messages=[1]) != cache_key(model="m", messages=[2])
+
+
+def test_memory_tier_is_lru_and_disk_tier_backs_it(tmp_path):
+    cache = _cache(tmp_path, memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+
+    # "b" was least recently used, so only the disk tier still has it.
+    assert list(cache._memory) == ["a", "c"]
+    assert cache.get("b") == "2"
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["disk_entries"] == 3
+
+
+def test_entries_persist_across_instances(tmp_path):
+    _cache(tmp_path).set("a", "1")
+
+    assert _cache(tmp_path).get("a") == "1"
+
+
+def test_expired_entries_are_dropped(tmp_path, clock):
+    cache = _cache(tmp_path, ttl_s=60)
+    cache.set("a", "1")
+
+    clock[0] += 30
+    assert cache.get("a") == "1"
+    clock[0] += 31
+    assert cache.get("a") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_size_cap_evicts_least_recently_used_rows(tmp_path, clock):
+    cache = _cache(tmp_path, memory_entries=0, max_bytes=250)
+    for key in "abc":
+        cache.set(key, key * 100)
+        clock[0] += 1
+        if key == "b":
+            # Reading "a" makes "b" the least recently used.
+            assert cache.get("a") == "a" * 100
+            clock[0] += 1
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 100
+    assert cache.get("c") == "c" * 100
+    assert cache.stats()["evictions"] == 1
+
+
+def test_async_accessors(tmp_path):
+    cache = _cache(tmp_path)
+
+    async def main():
+        await cache.aset("a", "1")
+        first = await cache.aget("a")
+        await cache.adelete("a")
+        return first, await cache.aget("a")
+
+    assert asyncio.run(main()) == ("1", None)
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_unparseable_cached_completion_is_evicted(tmp_path, asynchronous):
+    agent = ClinicalReasoningAgent(client=None, model="test-model")
+    agent.cache = _cache(tmp_path)
+    messages = agent._messages("system", "user")
+    key = agent._cache_key(messages, 100)
+    agent.cache.set(key, "I cannot answer that.")
+
+    with pytest.raises(ValueError):
+        if asynchronous:
+            asyncio.run(agent._acall_llm_json("system", "user", max_tokens=100))
+        else:
+            agent._call_llm_json("system", "user", max_tokens=100)
+
+    assert agent.cache.get(key) is None
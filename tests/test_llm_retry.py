@@ -0,0 +1,218 @@
+import asyncio
+import threading
+
+import httpx
+import openai
+import pytest
+
+import llm_retry
+from deadline import deadline_at
+from llm_retry import (
+    LatencyTracker,
+    acall_with_retries,
+    ahedged_call,
+    backoff_delay,
+    call_with_retries,
+    hedged_call,
+    is_transient,
+)
+
+
+_REQUEST = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+
+
+def _status_error(status):
+    return openai.APIStatusError("failed", response=httpx.Response(status, request=_REQUEST), body=None)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of taking them (largest jitter each time)."""
+    slept = []
+    monkeypatch.setattr(llm_retry.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(llm_retry.time, "sleep", slept.append)
+    monkeypatch.setenv("LLM_RETRY_BASE_S", "0.5")
+    monkeypatch.setenv("LLM_RETRY_MAX_S", "20")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "3")
+    return slept
+
+
+def _flaky(errors, result="ok"):
+    """Call that raises ``errors`` in turn, then returns ``result``."""
+    calls = []
+
+    def call():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return calls, call
+
+
+@pytest.mark.parametrize("error, transient", [
+    (openai.APIConnectionError(request=_REQUEST), True),
+    (openai.APITimeoutError(request=_REQUEST), True),
+    (_status_error(429), True),
+    (_status_error(503), True),
+    (_status_error(400), False),
+    (_status_error(401), False),
+    (ValueError("bad json"), False),
+])
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
+
+
+def test_backoff_grows_exponentially_up_to_the_cap(sleeps):
+    assert [backoff_delay(attempt) for attempt in range(8)] == [0.5, 1, 2, 4, 8, 16, 20, 20]
+
+
+def test_transient_errors_are_retried_with_backoff(sleeps):
+    calls, call = _flaky([_status_error(503), openai.APIConnectionError(request=_REQUEST)])
+
+    assert call_with_retries(call) == "ok"
+    assert len(calls) == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_retries_give_up_after_the_limit(sleeps):
+    calls, call = _flaky([_status_error(503)] * 10)
+
+    with pytest.raises(openai.APIStatusError):
+        call_with_retries(call)
+
+    assert len(calls) == 4
+    assert len(sleeps) == 3
+
+
+def test_permanent_errors_are_raised_at_once(sleeps):
+    calls, call = _flaky([_status_error(400)])
+
+    with pytest.raises(openai.APIStatusError):
+        call_with_retries(call)
+
+    assert (len(calls), sleeps) == (1, [])
+
+
+def test_no_retry_when_the_backoff_would_outlast_the_deadline(sleeps):
+    calls, call = _flaky([_status_error(503)])
+
+    with deadline_at(llm_retry.time.monotonic() + 0.2):
+        with pytest.raises(openai.APIStatusError):
+            call_with_retries(call)
+
+    assert (len(calls), sleeps) == (1, [])
+
+
+def test_async_retries(sleeps, monkeypatch):
+    async def no_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm_retry.asyncio, "sleep", no_sleep)
+    calls, call = _flaky([_status_error(429)])
+
+    async def acall():
+        return call()
+
+    assert asyncio.run(acall_with_retries(acall)) == "ok"
+    assert (len(calls), sleeps) == (2, [0.5])
+
+
+def test_latency_percentiles_need_enough_samples():
+    tracker = LatencyTracker(window=5)
+    for seconds in [9, 1, 2, 3, 4, 5]:
+        tracker.record("agent", seconds)
+
+    # The window keeps the last five samples.
+    assert tracker.percentile("agent", 0.5) == 3
+    assert tracker.percentile("agent", 1.0) == 5
+    assert tracker.percentile("agent", 0.5, min_samples=6) is None
+    assert tracker.percentile("other", 0.5) is None
+
+
+def test_hedge_is_off_unless_enabled(monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE_ENABLED", "0")
+
+    assert llm_retry.hedge_delay("agent") is None
+
+
+def test_hedged_call_returns_the_fast_answer_without_a_hedge():
+    calls = []
+
+    assert hedged_call(lambda: calls.append(1) or "fast", delay=5) == "fast"
+    assert calls == [1]
+
+
+def test_hedged_call_takes_whichever_copy_finishes_first():
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            # The primary straggles until the hedge has won.
+            release.wait(timeout=5)
+            return "primary"
+        return "hedge"
+
+    try:
+        assert hedged_call(call, delay=0.01) == "hedge"
+    finally:
+        release.set()
+    assert len(calls) == 2
+
+
+def test_hedged_call_raises_when_both_copies_fail():
+    calls = []
+
+    def call():
+        calls.append(1)
+        threading.Event().wait(0.05)
+        raise ValueError("both failed")
+
+    with pytest.raises(ValueError, match="both failed"):
+        hedged_call(call, delay=0.01)
+
+    assert len(calls) == 2
+
+
+def test_async_hedge_wins_and_cancels_the_straggler():
+    cancelled = []
+
+    async def main():
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(30)
+                except asyncio.CancelledError:
+                    cancelled.append("primary")
+                    raise
+                return "primary"
+            return "hedge"
+
+        result = await ahedged_call(call, delay=0.01)
+        # Let the cancelled primary observe its cancellation.
+        await asyncio.sleep(0)
+        return result, len(calls)
+
+    assert asyncio.run(main()) == ("hedge", 2)
+    assert cancelled == ["primary"]
+
+
+def test_async_hedge_falls_back_to_the_primary_if_the_hedge_fails():
+    async def main():
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(0.05)
+                return "primary"
+            raise ValueError("hedge failed")
+
+        return await ahedged_call(call, delay=0.01)
+
+    assert asyncio.run(main()) == "primary"
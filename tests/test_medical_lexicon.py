@@ -0,0 +1,69 @@
+import pytest
+
+from medical_lexicon import MedicalLexicon
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return MedicalLexicon.from_service_contexts({
+        "im_hospitalist": {
+            "key_elements": ["Hemodynamic stability", "Anticoagulation plan"],
+            "common_presentations": "Sepsis, heart failure exacerbation",
+            "focus": "Inpatient management",
+        },
+    })
+
+
+def test_clean_clinical_text_is_fully_confident(lexicon):
+    text = "Patient has hypertension and diabetes, presenting with chest pain and dyspnea."
+
+    check = lexicon.check(text)
+
+    assert check.text == text
+    assert check.corrections == []
+    assert check.unknown == []
+    assert check.confidence == 1.0
+
+
+def test_corrects_aliases_and_split_terms(lexicon):
+    check = lexicon.check("Started on bee pap for hyper tension crisis.")
+
+    assert check.text == "Started on BiPAP for hypertension crisis."
+    assert check.corrections == ["'bee pap' -> 'BiPAP'", "'hyper tension' -> 'hypertension'"]
+
+
+def test_service_terms_are_known(lexicon):
+    text = "Anticoagulation reviewed given hemodynamic stability."
+
+    assert lexicon.check(text).unknown == []
+    assert MedicalLexicon.from_service_contexts({}).check(text).unknown == ["stability"]
+
+
+def test_common_word_is_only_corrected_next_to_a_term(lexicon):
+    assert lexicon.check("Found a plural effusion.").text == "Found a pleural effusion."
+
+    check = lexicon.check("The plural form of the word is easy.")
+
+    assert check.text == "The plural form of the word is easy."
+    assert check.corrections == []
+
+
+def test_garbled_text_lowers_confidence(lexicon):
+    clean = lexicon.check("Patient with diabetes and hypertension on metformin.")
+    garbled = lexicon.check("Patient with die beeties and hypertenshun on metforman.")
+
+    assert "hypertenshun" in garbled.unknown
+    assert garbled.confidence < clean.confidence
+
+
+def test_text_without_medical_terms_is_not_vouched_for(lexicon):
+    check = lexicon.check("I went to the store yesterday and bought some bread.")
+
+    assert check.corrections == []
+    assert check.confidence == 0.0
+
+
+def test_empty_text(lexicon):
+    check = lexicon.check("")
+
+    assert (check.text, check.corrections, check.suspicious, check.confidence) == ("", [], [], 0.0)
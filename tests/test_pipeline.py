@@ -0,0 +1,417 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+import pipeline
+from deadline import RunBudget, time_left
+from llm_cache import ResponseCache
+from llm_retry import LatencyTracker
+from pipeline import FeedbackPipeline, _LateSteps, _ReadTracker
+from scheduler import Step
+from token_usage import UsageLedger
+
+
+@pytest.fixture
+def feedback_pipeline(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    monkeypatch.setenv("STEP_MEMO_ENABLED", "0")
+    monkeypatch.setattr(pipeline, "_observed_reads", {})
+    feedback_pipeline = FeedbackPipeline()
+    feedback_pipeline.step_cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"), table="step_results")
+    return feedback_pipeline
+
+
+def _step(name, requires, provides, run):
+    async def arun(context):
+        return run(context)
+
+    return Step(name, tuple(requires), tuple(provides), run, arun, label=name)
+
+
+def _counting(output, reads=()):
+    """Step body returning ``output`` after reading ``reads``; counts its calls."""
+    calls = []
+
+    def run(context):
+        calls.append(dict(context))
+        for key in reads:
+            context.get(key)
+        return output
+
+    return calls, run
+
+
+def test_read_tracker_records_every_kind_of_read():
+    tracker = _ReadTracker({"a": 1, "b": 2, "c": 3})
+
+    tracker["a"]
+    tracker.get("missing")
+    "b" in tracker
+
+    assert tracker.reads == {"a", "missing", "b"}
+
+
+def test_step_key_needs_every_input(feedback_pipeline):
+    step = _step("custom", ["transcript"], ["x"], run=None)
+
+    assert feedback_pipeline._step_key(step, {}) is None
+    assert feedback_pipeline._step_key(step, {"transcript": "t"}) == feedback_pipeline._step_key(
+        step, {"transcript": "t", "unrelated": 1}
+    )
+    assert feedback_pipeline._step_key(step, {"transcript": "t"}) != feedback_pipeline._step_key(
+        step, {"transcript": "u"}
+    )
+
+
+def test_step_key_follows_agent_settings(feedback_pipeline):
+    step = _step(feedback_pipeline.clinical_content.agent_name, ["transcript"], ["x"], run=None)
+    before = feedback_pipeline._step_key(step, {"transcript": "t"})
+
+    feedback_pipeline.clinical_content.temperature += 0.5
+
+    assert feedback_pipeline._step_key(step, {"transcript": "t"}) != before
+
+
+def test_memoized_step_is_reused_for_the_same_inputs(feedback_pipeline):
+    calls, run = _counting({"x": {"score": 7}})
+    step = feedback_pipeline._memoize(_step("custom", ["transcript"], ["x"], run))
+
+    assert step.run({"transcript": "t"}) == {"x": {"score": 7}}
+    assert feedback_pipeline._memoized_result(step, {"transcript": "t"}) == {"x": {"score": 7}}
+    assert feedback_pipeline._memoized_result(step, {"transcript": "u"}) is None
+    assert len(calls) == 1
+
+
+def test_undeclared_reads_become_part_of_the_key(feedback_pipeline):
+    calls, run = _counting({"x": 1}, reads=["format_config"])
+    step = feedback_pipeline._memoize(_step("custom", ["transcript"], ["x"], run))
+
+    step.run({"transcript": "t", "format_config": "full"})
+
+    assert pipeline._observed_reads == {"custom": frozenset({"format_config"})}
+    assert feedback_pipeline._memoized_result(step, {"transcript": "t", "format_config": "full"}) == {"x": 1}
+    assert feedback_pipeline._memoized_result(step, {"transcript": "t", "format_config": "brief"}) is None
+    # Without the observed input the key cannot be built at all.
+    assert feedback_pipeline._memoized_result(step, {"transcript": "t"}) is None
+
+
+@pytest.mark.parametrize("marker", ["_error", "_skipped", "_pending"])
+def test_degraded_results_are_not_memoized(feedback_pipeline, marker):
+    _, run = _counting({"x": {marker: "failed"}})
+    step = feedback_pipeline._memoize(_step("custom", ["transcript"], ["x"], run))
+
+    step.run({"transcript": "t"})
+
+    assert feedback_pipeline._memoized_result(step, {"transcript": "t"}) is None
+
+
+def test_async_memo_round_trip(feedback_pipeline):
+    calls, run = _counting({"x": 1})
+    step = feedback_pipeline._memoize(_step("custom", ["transcript"], ["x"], run))
+
+    async def main():
+        await step.arun({"transcript": "t"})
+        return await feedback_pipeline._amemoized_result(step, {"transcript": "t"})
+
+    assert asyncio.run(main()) == {"x": 1}
+    assert len(calls) == 1
+
+
+def test_memo_lookup_without_a_cache(feedback_pipeline):
+    feedback_pipeline.step_cache = None
+    step = _step("custom", ["transcript"], ["x"], run=None)
+
+    assert feedback_pipeline._memoized_result(step, {"transcript": "t"}) is None
+    assert asyncio.run(feedback_pipeline._amemoized_result(step, {"transcript": "t"})) is None
+
+
+@pytest.fixture
+def no_latency_history(monkeypatch):
+    monkeypatch.setattr(pipeline, "latencies", LatencyTracker())
+    monkeypatch.setattr(pipeline, "MIN_STEP_S", 5.0)
+
+
+def test_budget_hook_is_off_without_a_budget(feedback_pipeline):
+    assert feedback_pipeline._budget_hook(None) is None
+
+
+def test_budget_hook_skips_optional_steps_short_of_time(feedback_pipeline, no_latency_history):
+    budget = RunBudget(1)
+    skip = feedback_pipeline._budget_hook(budget)
+
+    assert skip(_step("debate", ["x"], ["debate_result"], run=None), {}) == {"debate_result": {"_skipped": "deadline"}}
+    # Required steps always run, however little time is left.
+    assert skip(_step("synthesizer", ["x"], ["synthesizer_result"], run=None), {}) is None
+    assert [drop["step"] for drop in budget.dropped] == ["debate"]
+    assert budget.dropped[0]["reason"].startswith("skipped: ")
+
+
+def test_budget_hook_runs_optional_steps_with_time_to_spare(feedback_pipeline, no_latency_history):
+    budget = RunBudget(600)
+
+    assert feedback_pipeline._budget_hook(budget)(_step("debate", ["x"], ["debate_result"], run=None), {}) is None
+    assert budget.dropped == []
+
+
+def test_budget_hook_uses_observed_latency(feedback_pipeline, no_latency_history):
+    for _ in range(3):
+        pipeline.latencies.record("debate", 900.0)
+
+    skip = feedback_pipeline._budget_hook(RunBudget(600))
+
+    assert skip(_step("debate", ["x"], ["debate_result"], run=None), {}) is not None
+
+
+def test_skipped_critic_passes_the_synthesis_through(feedback_pipeline, no_latency_history):
+    step = _step("synthesis_critic", ["synthesizer_result"], ["synthesis_critic_result", "synthesis"], run=None)
+    synthesis = {"overall_score": 7, "_candidates": [{}, {}]}
+
+    updates = feedback_pipeline._budget_hook(RunBudget(1))(step, {"synthesizer_result": synthesis})
+
+    assert updates == {"synthesis_critic_result": {"_skipped": "deadline"}, "synthesis": {"overall_score": 7}}
+
+
+def test_overrun_is_recorded_only_near_the_deadline():
+    budget = RunBudget(60)
+    step = _step("debate", ["x"], ["debate_result"], run=None)
+
+    FeedbackPipeline._note_overrun(step, {"debate_result": {"_error": "timeout"}}, budget, time.monotonic() + 30)
+    assert budget.dropped == []
+
+    FeedbackPipeline._note_overrun(step, {"debate_result": {"_error": "timeout"}, "other": "text"}, budget, time.monotonic())
+    assert budget.dropped == [{"step": "debate", "reason": "out of budget; fallback result used"}]
+
+
+def test_skipped_revision_is_recorded():
+    budget = RunBudget(60)
+    step = _step("synthesis_critic", ["x"], ["synthesis"], run=None)
+
+    FeedbackPipeline._note_overrun(step, {"synthesis": {"_revision_skipped": "no time"}}, budget, time.monotonic() + 30)
+
+    assert budget.dropped == [{"step": "revision", "reason": "no time"}]
+
+
+def test_bounded_step_runs_under_its_share_of_the_budget(feedback_pipeline):
+    budget = RunBudget(100)
+    seen = []
+
+    def run(context):
+        seen.append(time_left())
+        return {"x": 1}
+
+    step = feedback_pipeline._bounded(_step("transcription_qa", ["transcript"], ["x"], run), budget)
+
+    assert step.run({"transcript": "t"}) == {"x": 1}
+    assert asyncio.run(step.arun({"transcript": "t"})) == {"x": 1}
+    # transcription_qa gets the first quarter.
+    assert all(20 < left <= 25 for left in seen)
+    assert time_left() is None
+
+
+SYNTHESIS = {
+    "overall_score": 6,
+    "overall_assessment": "Solid presentation.",
+    "strengths": ["Clear one-liner"],
+    "areas_for_improvement": ["Be more concise"],
+}
+
+
+def _issues(*locations):
+    return {"issues_found": [{"type": "vague_advice", "location": location} for location in locations]}
+
+
+@pytest.mark.parametrize("critic_result, targets", [
+    (_issues("areas_for_improvement"), ["areas_for_improvement"]),
+    (_issues("Areas for improvement, item 1", "areas-for-improvement"), ["areas_for_improvement"]),
+    (_issues("strengths and teaching_points", "overall assessment"), ["strengths", "teaching_points", "overall_assessment"]),
+    # One issue without a field means the whole synthesis is revised.
+    (_issues("strengths", "the tone overall"), None),
+    (_issues(""), None),
+    ({"issues_found": ["strengths are weak"]}, None),
+    ({"issues_found": []}, None),
+    ({}, None),
+])
+def test_revision_targets(feedback_pipeline, critic_result, targets):
+    assert feedback_pipeline._revision_targets(critic_result) == targets
+
+
+def test_revised_fields_are_merged_into_a_copy(feedback_pipeline):
+    reported = []
+
+    revised = feedback_pipeline._merge_revised_fields(
+        SYNTHESIS,
+        [("areas_for_improvement", ["Name the leading diagnosis first"])],
+        on_field=lambda name, value: reported.append(name),
+    )
+
+    assert revised["areas_for_improvement"] == ["Name the leading diagnosis first"]
+    assert revised["strengths"] == ["Clear one-liner"]
+    assert (revised["_revised"], revised["_revised_fields"]) == (True, ["areas_for_improvement"])
+    assert "_revision_attempted" not in revised
+    assert reported == ["areas_for_improvement"]
+    assert SYNTHESIS["areas_for_improvement"] == ["Be more concise"]
+
+
+def test_failed_field_keeps_its_text_and_marks_the_attempt(feedback_pipeline):
+    revised = feedback_pipeline._merge_revised_fields(
+        SYNTHESIS, [("strengths", None), ("areas_for_improvement", ["Name the leading diagnosis first"])]
+    )
+
+    assert revised["strengths"] == ["Clear one-liner"]
+    assert revised["_revised_fields"] == ["areas_for_improvement"]
+    assert revised["_revision_attempted"] is True
+
+
+def test_synthesis_is_unchanged_when_every_rewrite_fails(feedback_pipeline):
+    synthesis = dict(SYNTHESIS)
+
+    revised = feedback_pipeline._merge_revised_fields(synthesis, [("strengths", None)])
+
+    assert revised is synthesis
+    assert revised == dict(SYNTHESIS, _revision_attempted=True)
+
+
+def test_targeted_revision_rewrites_only_the_named_fields(feedback_pipeline, monkeypatch):
+    asked = []
+
+    def fake_call(system_prompt, user_prompt, max_tokens=1500, schema=None):
+        asked.append(list(schema))
+        return {"areas_for_improvement": ["Name the leading diagnosis first"]}
+
+    monkeypatch.setattr(feedback_pipeline.synthesizer, "_call_llm_json", fake_call)
+    context = {"service_context": {"name": "Internal Medicine"}}
+
+    revised = feedback_pipeline._revise_synthesis(dict(SYNTHESIS), _issues("areas_for_improvement"), context)
+
+    assert asked == [["areas_for_improvement"]]
+    assert revised["areas_for_improvement"] == ["Name the leading diagnosis first"]
+    assert revised["overall_assessment"] == "Solid presentation."
+
+
+LATE = "anticipatory_reasoning"
+
+
+def _late_plan(*names):
+    steps = [_step(name, ["cleaned_transcript"], [f"{name}_result"], run=lambda context: {}) for name in names]
+    late = _LateSteps(steps, reuse=lambda step, context: None, memoized=lambda step, context: None)
+    return SimpleNamespace(late=late, usage=UsageLedger()), steps
+
+
+def _pending_report(feedback_pipeline, plan, *names):
+    result = {
+        "overall_score": 7,
+        "_agent_results": {name: {"_pending": "running in the background"} for name in names},
+        "_pending": list(names),
+        "_late_id": "late-1",
+    }
+    feedback_pipeline._late_runs["late-1"] = plan.late
+    return result, json.loads(json.dumps(result))
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_late_result_completes_the_stored_report(feedback_pipeline, tmp_path):
+    feedback_pipeline.run_cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"), table="pipeline_runs")
+    plan, (step,) = _late_plan(LATE)
+    result, stored = _pending_report(feedback_pipeline, plan, LATE)
+    events = []
+
+    feedback_pipeline._attach_late(
+        "run-key", stored, plan, step, time.perf_counter(), events.append, _done({f"{LATE}_result": {"score": 8}})
+    )
+
+    # The caller's report is left alone; the pipeline's copy is complete and cached.
+    assert result["_pending"] == [LATE]
+    assert stored["_agent_results"][LATE] == {"score": 8}
+    assert "_pending" not in stored and "_late_id" not in stored and "_usage" in stored
+    assert feedback_pipeline._late_runs == {}
+    assert json.loads(feedback_pipeline.run_cache.get("run-key")) == stored
+    assert [(event["type"], event["agent"], event["result"]) for event in events] == [
+        ("late_result", LATE, {"score": 8})
+    ]
+
+
+def test_report_waits_for_every_late_step(feedback_pipeline):
+    plan, (first, second) = _late_plan(LATE, "debate")
+    _, stored = _pending_report(feedback_pipeline, plan, LATE, "debate")
+
+    feedback_pipeline._attach_late("run-key", stored, plan, first, time.perf_counter(), None, _done({f"{LATE}_result": {}}))
+
+    assert stored["_pending"] == ["debate"]
+    assert stored["_late_id"] == "late-1"
+    assert feedback_pipeline._late_runs == {"late-1": plan.late}
+
+
+def test_failed_late_step_is_attached_as_an_error_and_not_cached(feedback_pipeline, tmp_path):
+    feedback_pipeline.run_cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"), table="pipeline_runs")
+    plan, (step,) = _late_plan(LATE)
+    _, stored = _pending_report(feedback_pipeline, plan, LATE)
+    future = Future()
+    future.set_exception(TimeoutError())
+    events = []
+
+    feedback_pipeline._attach_late("run-key", stored, plan, step, time.perf_counter(), events.append, future)
+
+    assert stored["_agent_results"][LATE] == {"_error": "TimeoutError"}
+    assert events[0]["result"] == {"_error": "TimeoutError"}
+    assert feedback_pipeline.run_cache.get("run-key") is None
+
+
+def test_cancel_late_stops_the_pending_steps(feedback_pipeline):
+    plan, (step,) = _late_plan(LATE)
+    result, _ = _pending_report(feedback_pipeline, plan, LATE)
+    future = Future()
+    plan.late.running[step.name] = (future, time.perf_counter())
+
+    feedback_pipeline.cancel_late(result)
+
+    assert future.cancelled()
+    assert feedback_pipeline._late_runs == {}
+    # Reports with nothing pending, or cancelled twice, are ignored.
+    feedback_pipeline.cancel_late(result)
+    feedback_pipeline.cancel_late({"overall_score": 7})
+
+
+def test_late_steps_launch_once_their_inputs_exist():
+    ran = threading.Event()
+
+    def run(context):
+        ran.set()
+        return {f"{LATE}_result": {}}
+
+    step = _step(LATE, ["cleaned_transcript"], [f"{LATE}_result"], run)
+    late = _LateSteps([step], reuse=lambda step, context: None, memoized=lambda step, context: None)
+    events = []
+
+    late.launch_ready({"transcript": "t"}, events.append)
+    assert late.running == {}
+
+    late.launch_ready({"cleaned_transcript": "t"}, events.append)
+    late.launch_ready({"cleaned_transcript": "t"}, events.append)
+
+    assert list(late.running) == [LATE]
+    assert [event["type"] for event in events] == ["late_started"]
+    late.running[LATE][0].result(timeout=5)
+    assert ran.is_set()
+
+
+def test_memoized_late_steps_do_not_run():
+    step = _step(LATE, ["cleaned_transcript"], [f"{LATE}_result"], run=None)
+    memoized = {f"{LATE}_result": {"score": 8}}
+    late = _LateSteps([step], reuse=lambda step, context: None, memoized=lambda step, context: memoized)
+    events = []
+
+    late.launch_ready({"cleaned_transcript": "t"}, events.append)
+
+    assert late.results == {LATE: memoized}
+    assert (late.running, events) == ({}, [])
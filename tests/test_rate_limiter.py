@@ -0,0 +1,203 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from agents.base import _asettled_stream, _settled_stream
+from deadline import DeadlineExceeded, deadline_at
+from rate_limiter import RateLimiter, _parse_duration
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_requests_wait_once_the_burst_is_spent(clock):
+    # 60 rpm with a 10 s burst: ten calls go straight through.
+    limiter = RateLimiter("m", rpm=60, burst_s=10)
+
+    assert [limiter._reserve(0) for _ in range(10)] == [0.0] * 10
+    assert limiter._reserve(0) == pytest.approx(1.0)
+    assert limiter._reserve(0) == pytest.approx(2.0)
+
+    clock[0] += 3
+    assert limiter._reserve(0) == pytest.approx(0.0)
+
+
+def test_tokens_are_reserved_up_to_the_bucket_capacity(clock):
+    # 6000 tpm with a 10 s burst holds 1000 tokens.
+    limiter = RateLimiter("m", tpm=6000, burst_s=10)
+
+    # A call larger than the bucket waits for a full bucket, not forever.
+    assert limiter._reserve(1500) == 0.0
+    assert limiter._reserve(500) == pytest.approx(5.0)
+
+
+def test_unlimited_buckets_never_wait(clock):
+    limiter = RateLimiter("m")
+
+    assert [limiter._reserve(10_000) for _ in range(100)] == [0.0] * 100
+    assert limiter.stats()["waited_calls"] == 0
+
+
+def test_settle_returns_the_unused_reservation(clock):
+    limiter = RateLimiter("m", tpm=6000, burst_s=10)
+    limiter._reserve(1000)
+
+    limiter.settle(1000, 400)
+
+    assert limiter._reserve(600) == 0.0
+    assert limiter._reserve(100) > 0
+
+
+def test_settle_without_usage_keeps_the_reservation(clock):
+    limiter = RateLimiter("m", tpm=6000, burst_s=10)
+    limiter._reserve(1000)
+
+    limiter.settle(1000, None)
+
+    assert limiter._reserve(100) > 0
+
+
+def test_observe_adopts_the_providers_limits_and_remaining_budget(clock):
+    limiter = RateLimiter("m", safety_margin=0.05)
+
+    limiter.observe({
+        "x-ratelimit-limit-requests": "600",
+        "x-ratelimit-remaining-requests": "50",
+        "x-ratelimit-limit-tokens": "60000",
+        "x-ratelimit-remaining-tokens": "99999",
+    })
+
+    stats = limiter.stats()
+    assert (stats["rpm_limit"], stats["tpm_limit"]) == (600, 60000)
+    # 50 left minus a 5% margin of 600; the token bucket stays at its burst cap.
+    assert limiter._requests.tokens == pytest.approx(20)
+    assert limiter._tokens.tokens == pytest.approx(10000)
+
+
+def test_observe_ignores_missing_or_malformed_headers(clock):
+    limiter = RateLimiter("m", rpm=60)
+
+    limiter.observe({"x-ratelimit-limit-requests": "lots", "x-ratelimit-remaining-tokens": "5"})
+
+    assert (limiter.stats()["rpm_limit"], limiter._requests.tokens) == (60, 10)
+
+
+@pytest.mark.parametrize("headers, pause", [
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after": "2", "retry-after-ms": "1500"}, 1.5),
+    ({"x-ratelimit-reset-requests": "6m0s", "x-ratelimit-reset-tokens": "20ms"}, 360.0),
+    ({}, 1.0),
+    (None, 1.0),
+])
+def test_penalize_pauses_the_model(clock, headers, pause):
+    limiter = RateLimiter("m")
+
+    limiter.penalize(headers)
+
+    assert limiter._reserve(0) == pytest.approx(pause)
+    assert limiter.stats()["rate_limited"] == 1
+    clock[0] += pause
+    assert limiter._reserve(0) == 0.0
+
+
+def test_penalize_empties_the_buckets(clock):
+    limiter = RateLimiter("m", rpm=60)
+
+    limiter.penalize({"retry-after": "0.5"})
+    clock[0] += 0.5
+
+    # The pause is over, but the request budget has to refill first.
+    assert limiter._reserve(0) == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("20ms", 0.02),
+    ("1s", 1.0),
+    ("6m0s", 360.0),
+    ("1h2m3.5s", 3723.5),
+    ("7", 7.0),
+    ("soon", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_duration(value, seconds):
+    assert _parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_wait_past_the_deadline_fails_without_sleeping(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", slept.append)
+    limiter = RateLimiter("m", rpm=60, burst_s=1)
+    limiter.acquire(0)
+
+    with deadline_at(time.monotonic() + 0.5):
+        with pytest.raises(DeadlineExceeded):
+            limiter.acquire(0)
+
+    assert slept == []
+    stats = limiter.stats()
+    assert (stats["waited_calls"], stats["deadline_exceeded"]) == (0, 1)
+    # The failed call gave its reservation back.
+    assert limiter._reserve(0) == pytest.approx(1.0, abs=0.1)
+
+
+def test_wait_within_the_deadline_sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", slept.append)
+    limiter = RateLimiter("m", rpm=60, burst_s=1)
+    limiter.acquire(0)
+
+    with deadline_at(time.monotonic() + 30):
+        limiter.acquire(0)
+
+    assert slept == [pytest.approx(1.0, abs=0.1)]
+
+
+class _Settling:
+    def __init__(self):
+        self.settled = []
+
+    def settle(self, reserved, used):
+        self.settled.append((reserved, used))
+
+
+def _chunks():
+    return [SimpleNamespace(usage=None), SimpleNamespace(usage=None), SimpleNamespace(usage=SimpleNamespace(total_tokens=42))]
+
+
+def test_stream_settles_from_its_final_chunk():
+    limiter = _Settling()
+
+    assert len(list(_settled_stream(iter(_chunks()), limiter, 500))) == 3
+    assert limiter.settled == [(500, 42)]
+
+
+def test_stream_cut_short_keeps_the_full_reservation():
+    limiter = _Settling()
+    stream = _settled_stream(iter(_chunks()), limiter, 500)
+
+    next(stream)
+    stream.close()
+
+    assert limiter.settled == [(500, None)]
+
+
+def test_async_stream_settles_from_its_final_chunk():
+    limiter = _Settling()
+
+    async def chunks():
+        for chunk in _chunks():
+            yield chunk
+
+    async def main():
+        return [chunk async for chunk in _asettled_stream(chunks(), limiter, 500)]
+
+    assert len(asyncio.run(main())) == 3
+    assert limiter.settled == [(500, 42)]
@@ -0,0 +1,224 @@
+import asyncio
+import threading
+
+import pytest
+
+from scheduler import Step, arun_graph, run_graph
+
+
+def _step(name, requires, provides, run=None, arun=None):
+    def default(context):
+        return {key: f"{name}:{key}" for key in provides}
+
+    run = run or default
+
+    async def default_async(context):
+        return run(context)
+
+    return Step(name, tuple(requires), tuple(provides), run, arun or default_async, label=name)
+
+
+def _diamond(run=None, arun=None):
+    """a -> (b, c) -> d, with optional overrides for b and c."""
+    return [
+        _step("d", ["y", "z"], ["w"]),
+        _step("b", ["x"], ["y"], run=run and run("b"), arun=arun and arun("b")),
+        _step("c", ["x"], ["z"], run=run and run("c"), arun=arun and arun("c")),
+        _step("a", ["transcript"], ["x"]),
+    ]
+
+
+def _start_order(provided):
+    """on_start hook asserting each step starts only after its inputs exist."""
+    started = []
+
+    def on_start(step):
+        assert all(key in provided for key in step.requires), step.name
+        started.append(step.name)
+
+    return started, on_start
+
+
+def test_run_graph_orders_steps_by_their_inputs():
+    provided = {"transcript"}
+    started, on_start = _start_order(provided)
+
+    def on_finish(step, updates, elapsed):
+        provided.update(updates)
+        assert elapsed is not None and elapsed >= 0
+
+    context = run_graph(_diamond(), {"transcript": "t"}, on_start=on_start, on_finish=on_finish)
+
+    assert started[0] == "a" and started[-1] == "d"
+    assert set(started) == {"a", "b", "c", "d"}
+    assert context["w"] == "d:w"
+
+
+def test_run_graph_runs_independent_steps_concurrently():
+    # b and c both need x; each waits for the other, so they must overlap.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meeting(name):
+        def run(context):
+            barrier.wait()
+            return {"y" if name == "b" else "z": name}
+        return run
+
+    context = run_graph(_diamond(run=meeting), {"transcript": "t"})
+
+    assert (context["y"], context["z"]) == ("b", "c")
+
+
+def test_run_graph_gives_steps_a_snapshot_of_the_context():
+    seen = {}
+
+    def record(context):
+        seen.update(context)
+        context["scribble"] = True
+        return {"x": 1}
+
+    context = run_graph([_step("a", ["transcript"], ["x"], run=record)], {"transcript": "t"})
+
+    assert seen == {"transcript": "t"}
+    assert "scribble" not in context
+
+
+def test_run_graph_propagates_step_failures():
+    def boom(context):
+        raise ValueError("agent failed")
+
+    steps = [_step("a", ["transcript"], ["x"], run=boom), _step("b", ["x"], ["y"])]
+    finished = []
+
+    with pytest.raises(ValueError, match="agent failed"):
+        run_graph(steps, {"transcript": "t"}, on_finish=lambda step, updates, elapsed: finished.append(step.name))
+
+    assert finished == []
+
+
+def test_run_graph_rejects_unsatisfiable_inputs():
+    with pytest.raises(RuntimeError, match="missing_key"):
+        run_graph([_step("a", ["missing_key"], ["x"])], {"transcript": "t"})
+
+
+def test_run_graph_reuse_skips_steps_and_cascades():
+    ran = []
+
+    def tracking(name):
+        def run(context):
+            ran.append(name)
+            return {"y" if name == "b" else "z": name}
+        return run
+
+    finished = {}
+
+    def reuse(step, context):
+        return {"x": "cached"} if step.name == "a" else None
+
+    context = run_graph(
+        _diamond(run=tracking),
+        {"transcript": "t"},
+        reuse=reuse,
+        on_finish=lambda step, updates, elapsed: finished.setdefault(step.name, elapsed),
+    )
+
+    assert context["x"] == "cached"
+    assert sorted(ran) == ["b", "c"]
+    # Reused steps report no wall time.
+    assert finished["a"] is None
+    assert finished["d"] is not None
+
+
+def test_arun_graph_orders_steps_and_overlaps_independent_ones():
+    provided = {"transcript"}
+    started, on_start = _start_order(provided)
+    arrived = {}
+
+    def meeting(name):
+        async def arun(context):
+            other = "c" if name == "b" else "b"
+            arrived[name].set()
+            await asyncio.wait_for(arrived[other].wait(), timeout=5)
+            return {"y" if name == "b" else "z": name}
+        return arun
+
+    async def main():
+        arrived.update(b=asyncio.Event(), c=asyncio.Event())
+        return await arun_graph(
+            _diamond(arun=meeting),
+            {"transcript": "t"},
+            on_start=on_start,
+            on_finish=lambda step, updates, elapsed: provided.update(updates),
+        )
+
+    context = asyncio.run(main())
+
+    assert started[0] == "a" and started[-1] == "d"
+    assert (context["y"], context["z"], context["w"]) == ("b", "c", "d:w")
+
+
+def test_arun_graph_propagates_failures_and_cancels_running_steps():
+    cancelled = []
+
+    async def boom(context):
+        await asyncio.sleep(0)
+        raise ValueError("agent failed")
+
+    async def slow(context):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+        return {"y": 1}
+
+    steps = [
+        _step("boom", ["transcript"], ["x"], arun=boom),
+        _step("slow", ["transcript"], ["y"], arun=slow),
+    ]
+
+    async def main():
+        with pytest.raises(ValueError, match="agent failed"):
+            await arun_graph(steps, {"transcript": "t"})
+        # Let the cancelled task observe its cancellation.
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert cancelled == ["slow"]
+
+
+def test_arun_graph_reuse_skips_steps():
+    ran = []
+
+    async def tracking(context):
+        ran.append("a")
+        return {"x": "fresh"}
+
+    steps = [_step("a", ["transcript"], ["x"], arun=tracking), _step("b", ["x"], ["y"])]
+
+    context = asyncio.run(arun_graph(steps, {"transcript": "t"}, reuse=lambda step, context: (
+        {"x": "cached"} if step.name == "a" else None
+    )))
+
+    assert ran == []
+    assert (context["x"], context["y"]) == ("cached", "b:y")
+
+
+def test_arun_graph_awaits_async_reuse_hooks():
+    ran = []
+
+    async def tracking(context):
+        ran.append("a")
+        return {"x": "fresh"}
+
+    async def reuse(step, context):
+        await asyncio.sleep(0)
+        return {"x": "cached"} if step.name == "a" else None
+
+    steps = [_step("a", ["transcript"], ["x"], arun=tracking), _step("b", ["x"], ["y"])]
+
+    context = asyncio.run(arun_graph(steps, {"transcript": "t"}, reuse=reuse))
+
+    assert ran == []
+    assert (context["x"], context["y"]) == ("cached", "b:y")
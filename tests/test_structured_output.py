@@ -0,0 +1,66 @@
+import pytest
+
+from structured_output import missing_fields, parse_json_object
+
+
+SCHEMA = {"overall_score": "number", "strengths": "array", "scores": {"overall": "number", "notes": "string"}}
+
+
+def test_parses_object_inside_fence_and_prose():
+    raw = 'Here you go:\n```json\n{"a": 1, "b": [1, 2]}\n```\nHope that helps!'
+
+    assert parse_json_object(raw) == {"a": 1, "b": [1, 2]}
+
+
+def test_truncated_string_drops_only_the_unfinished_field():
+    raw = '{"a": "x", "b": ["y", "z"], "c": "cut of'
+
+    assert parse_json_object(raw) == {"a": "x", "b": ["y", "z"]}
+
+
+def test_truncated_nested_values_close_open_brackets():
+    raw = '{"summary": "ok", "scores": {"overall": 7, "items": ["first", "sec'
+
+    assert parse_json_object(raw) == {"summary": "ok", "scores": {"overall": 7, "items": ["first"]}}
+
+
+def test_truncated_after_key_drops_the_key():
+    assert parse_json_object('{"a": 1, "b": ') == {"a": 1}
+
+
+def test_escaped_quotes_do_not_end_strings_early():
+    raw = '{"quote": "he said \\"stop, now\\"", "next": "trunc'
+
+    assert parse_json_object(raw) == {"quote": 'he said "stop, now"'}
+
+
+@pytest.mark.parametrize("raw", ["no json here", "[1, 2, 3]", ""])
+def test_rejects_text_without_an_object(raw):
+    with pytest.raises(ValueError):
+        parse_json_object(raw)
+
+
+def test_malformed_object_keeps_nothing_it_cannot_parse():
+    # Nothing survives, so every schema field is asked for in the follow-up.
+    assert parse_json_object('{"a" 1, "b": 2}') == {}
+
+
+def test_missing_fields_lists_absent_and_mistyped_paths():
+    result = {"overall_score": True, "strengths": "one", "scores": {"overall": 7}}
+
+    assert missing_fields(result, SCHEMA) == ["overall_score", "strengths", "scores.notes"]
+    assert missing_fields({}, SCHEMA) == ["overall_score", "strengths", "scores"]
+    assert missing_fields({"anything": 1}, None) == []
+
+
+@pytest.mark.parametrize("score", [8, 7.5, "8/10", "7 - solid"])
+def test_numeric_strings_count_as_numbers(score):
+    result = {"overall_score": score, "strengths": [], "scores": {"overall": score, "notes": ""}}
+
+    assert missing_fields(result, SCHEMA) == []
+
+
+def test_string_without_a_number_is_missing():
+    result = {"overall_score": "good", "strengths": [], "scores": {"overall": "n/a", "notes": ""}}
+
+    assert missing_fields(result, SCHEMA) == ["overall_score", "scores.overall"]
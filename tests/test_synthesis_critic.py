@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from agents.synthesis_critic import SynthesisCriticAgent
+
+
+CANDIDATES = [
+    {"candidate": 1, "score": 6, "issues_found": [{"type": "vague_advice", "location": "strengths"}]},
+    {"candidate": 2, "score": 9, "issues_found": []},
+    {"candidate": 3, "score": 7, "issues_found": [{"type": "contradiction", "location": "overall_assessment"}]},
+]
+
+
+def _select(result, count=3, error=None):
+    return SynthesisCriticAgent._selection_result(result, count, error)
+
+
+def test_selects_the_named_best_candidate():
+    selection = _select({"candidates": CANDIDATES, "best_candidate": 3})
+
+    assert selection["selected_candidate"] == 3
+    assert selection["issues_found"] == [{"type": "contradiction", "location": "overall_assessment"}]
+    assert selection["candidate_scores"] == [
+        {"candidate": 1, "score": 6},
+        {"candidate": 2, "score": 9},
+        {"candidate": 3, "score": 7},
+    ]
+    assert (selection["is_acceptable"], selection["revision_instructions"]) == (True, "No revision needed.")
+    assert "_error" not in selection
+
+
+@pytest.mark.parametrize("best", [None, 0, 4, "2", 2.0])
+def test_falls_back_to_the_highest_score(best):
+    selection = _select({"candidates": CANDIDATES, "best_candidate": best})
+
+    assert selection["selected_candidate"] == 2
+    assert selection["issues_found"] == []
+
+
+def test_ignores_malformed_entries_and_scores():
+    candidates = ["candidate 3 is best", {"candidate": 3, "score": "high"}, {"candidate": 2, "score": 4.5}]
+
+    selection = _select({"candidates": candidates})
+
+    assert selection["selected_candidate"] == 2
+    assert selection["candidate_scores"] == [{"candidate": 3, "score": "high"}, {"candidate": 2, "score": 4.5}]
+
+
+def test_top_score_naming_no_valid_candidate_selects_the_first():
+    assert _select({"candidates": [{"candidate": 7, "score": 10}]})["selected_candidate"] == 1
+    assert _select({"candidates": [{"score": 10}]})["selected_candidate"] == 1
+
+
+def test_failed_selection_takes_the_first_candidate_and_is_marked():
+    selection = _select({}, error=TimeoutError("critic timed out"))
+
+    assert selection["selected_candidate"] == 1
+    assert (selection["issues_found"], selection["candidate_scores"]) == ([], [])
+    assert selection["_error"] == "critic timed out"
+
+
+@pytest.fixture
+def critic(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    return SynthesisCriticAgent(client=None, model="test-model")
+
+
+def test_select_scores_every_candidate_in_one_call(critic, monkeypatch):
+    prompts = []
+
+    def fake_call(system_prompt, user_prompt, max_tokens=1500, schema=None):
+        prompts.append(user_prompt)
+        return {"candidates": CANDIDATES, "best_candidate": 2}
+
+    monkeypatch.setattr(critic, "_call_llm_json", fake_call)
+
+    selection = critic.select({}, [{"overall_score": n} for n in range(3)])
+
+    assert selection["selected_candidate"] == 2
+    assert len(prompts) == 1 and "CANDIDATE 3:" in prompts[0]
+
+
+def test_aselect_failure_is_marked(critic, monkeypatch):
+    async def failing_call(*args, **kwargs):
+        raise ValueError("unparseable")
+
+    monkeypatch.setattr(critic, "_acall_llm_json", failing_call)
+
+    selection = asyncio.run(critic.aselect({}, [{}, {}]))
+
+    assert (selection["selected_candidate"], selection["_error"]) == (1, "unparseable")
@@ -0,0 +1,72 @@
+from synthesis_rules import review_synthesis
+
+
+SPECIFIC = {
+    "overall_assessment": "A well organized presentation with a focused differential diagnosis.",
+    "strengths": ["Opened with a crisp one-liner summarizing age, sex and chief complaint"],
+    "areas_for_improvement": [
+        "State the pertinent negatives for pulmonary embolism before committing to the pneumonia diagnosis",
+    ],
+    "teaching_points": ["Wells criteria guide pretest probability for pulmonary embolism"],
+    "overall_score": 7,
+}
+
+
+def _types(review):
+    return [issue["type"] for issue in review.issues]
+
+
+def test_specific_synthesis_passes_without_escalation():
+    review = review_synthesis(SPECIFIC, ["pertinent negatives for embolism"])
+
+    assert review.issues == []
+    assert review.escalate == []
+
+
+def test_flags_contradiction_between_strength_and_improvement():
+    synthesis = dict(
+        SPECIFIC,
+        strengths=["Thorough medication reconciliation with doses"],
+        areas_for_improvement=["Medication reconciliation omitted doses and frequencies for home medications"],
+    )
+
+    review = review_synthesis(synthesis, [])
+
+    assert _types(review) == ["contradiction"]
+
+
+def test_flags_vague_advice():
+    synthesis = dict(SPECIFIC, areas_for_improvement=["Be more concise", "Practice"])
+
+    review = review_synthesis(synthesis, [])
+
+    assert _types(review) == ["vague_advice", "vague_advice"]
+
+
+def test_escalates_stock_phrase_inside_specific_advice():
+    advice = (
+        "Work on your assessment by naming the single most likely diagnosis first and then "
+        "two alternatives with the findings that argue for each"
+    )
+
+    review = review_synthesis(dict(SPECIFIC, areas_for_improvement=[advice]), [])
+
+    assert review.issues == []
+    assert review.escalate == [f'stock phrase in specific advice: "{advice}"']
+
+
+def test_flags_top_missing_elements_the_synthesis_never_mentions():
+    missing = ["code status", "pertinent negatives", "allergies", "social history"]
+
+    review = review_synthesis(SPECIFIC, missing)
+
+    # Only the top three count; "pertinent negatives" is mentioned.
+    described = [issue["description"] for issue in review.issues]
+    assert _types(review) == ["missed_priority", "missed_priority"]
+    assert "code status" in described[0] and "allergies" in described[1]
+
+
+def test_escalates_extreme_scores():
+    assert review_synthesis(dict(SPECIFIC, overall_score=3), []).escalate == ["overall score 3 — check tone"]
+    assert review_synthesis(dict(SPECIFIC, overall_score=9), []).escalate == ["overall score 9 — check tone"]
+    assert review_synthesis(dict(SPECIFIC, overall_score="n/a"), []).escalate == []
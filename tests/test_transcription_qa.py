@@ -0,0 +1,267 @@
+import json
+
+import pytest
+
+from agents import transcription_qa
+from agents.transcription_qa import TranscriptionQAAgent, apply_edits, chunk_sentences, split_separated
+
+
+TEXT = "Patient on bee pap. Has hyper tension. Denies hyper tension history."
+
+
+def test_applies_edits_in_order():
+    edits = [
+        {"original": "bee pap", "replacement": "BiPAP"},
+        {"original": "hyper tension", "replacement": "hypertension"},
+    ]
+
+    text, applied, rejected = apply_edits(TEXT, edits)
+
+    assert text == "Patient on BiPAP. Has hypertension. Denies hyper tension history."
+    assert [edit["start"] for edit in applied] == [11, 24]
+    assert rejected == []
+
+
+def test_out_of_order_edit_falls_back_to_first_free_occurrence():
+    edits = [
+        {"original": "history", "replacement": "hx"},
+        {"original": "bee pap", "replacement": "BiPAP"},
+    ]
+
+    text, applied, rejected = apply_edits(TEXT, edits)
+
+    assert text == "Patient on BiPAP. Has hyper tension. Denies hyper tension hx."
+    # Applied edits are reported in text order.
+    assert [edit["original"] for edit in applied] == ["bee pap", "history"]
+    assert rejected == []
+
+
+def test_repeated_original_takes_the_next_occurrence():
+    edits = [{"original": "hyper tension", "replacement": "hypertension"}] * 2
+
+    text, _, rejected = apply_edits(TEXT, edits)
+
+    assert text == "Patient on bee pap. Has hypertension. Denies hypertension history."
+    assert rejected == []
+
+
+def test_overlapping_edit_is_rejected():
+    overlapping = {"original": "pap. Has", "replacement": "x"}
+    edits = [{"original": "bee pap", "replacement": "BiPAP"}, overlapping]
+
+    text, applied, rejected = apply_edits(TEXT, edits)
+
+    assert text.startswith("Patient on BiPAP. Has")
+    assert len(applied) == 1
+    assert rejected == [overlapping]
+
+
+def test_original_not_in_text_is_rejected():
+    missing = {"original": "tachycardic", "replacement": "tachycardia"}
+
+    text, applied, rejected = apply_edits(TEXT, [missing])
+
+    assert (text, applied, rejected) == (TEXT, [], [missing])
+
+
+@pytest.mark.parametrize("edit", [
+    {"original": "bee pap", "replacement": 42},
+    {"original": "bee pap", "replacement": ["BiPAP"]},
+    {"original": 7, "replacement": "BiPAP"},
+    {"original": "", "replacement": "BiPAP"},
+    {"replacement": "BiPAP"},
+    "bee pap -> BiPAP",
+    None,
+])
+def test_malformed_edit_is_rejected(edit):
+    text, applied, rejected = apply_edits(TEXT, [edit, {"original": "hyper tension", "replacement": "hypertension"}])
+
+    assert text == "Patient on bee pap. Has hypertension. Denies hyper tension history."
+    assert len(applied) == 1
+    assert rejected == [edit]
+
+
+def test_unclear_span_keeps_its_text_and_is_marked():
+    text, applied, _ = apply_edits(TEXT, [{"original": "bee pap", "replacement": None, "unclear": True}])
+
+    assert text.startswith("Patient on bee pap [UNCLEAR].")
+    assert applied[0]["unclear"] is True
+
+
+RAW = "Pt is a 54 yo man with chest pane.\nHe has hyper tension.\n\nOn exam he was afebrile. Plan is to admit."
+CLEANED = "Pt is a 54 yo man with chest pain.\nHe has hypertension.\n\nOn exam he was afebrile. Plan is to admit."
+PREVIOUS = {
+    "cleaned_transcript": CLEANED,
+    "corrections_made": ["'chest pane' -> 'chest pain'"],
+    "unclear_segments": [],
+    "transcript_quality": "good",
+}
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    agent = TranscriptionQAAgent(client=None, model="test-model")
+    agent.sent = []
+
+    def fake_call(system_prompt, user_prompt, max_tokens=1500, schema=None):
+        segments = json.loads(user_prompt.split("\n\n", 1)[1])
+        agent.sent.append(segments)
+        return {"segments": [
+            {"cleaned": segment.replace("tachy cardic", "tachycardic"), "corrections_made": ["fixed"]}
+            for segment in segments
+        ]}
+
+    monkeypatch.setattr(agent, "_call_llm_json", fake_call)
+    return agent
+
+
+def test_reclean_sends_only_edited_sentences_and_keeps_breaks(agent):
+    edited = RAW.replace("On exam he was afebrile.", "On exam he was tachy cardic.")
+
+    result = agent.reclean(edited, RAW, PREVIOUS)
+
+    assert agent.sent == [["On exam he was tachy cardic."]]
+    assert result["cleaned_transcript"] == CLEANED.replace("afebrile", "tachycardic")
+    assert result["corrections_made"] == ["'chest pane' -> 'chest pain'", "fixed"]
+    assert result["_recleaned_segments"] == 1
+
+
+def test_reclean_takes_the_new_transcripts_breaks_around_an_edit(agent):
+    edited = RAW.replace("He has hyper tension.\n\n", "He has hyper tension. He is tachy cardic.\n")
+
+    result = agent.reclean(edited, RAW, PREVIOUS)
+
+    assert agent.sent == [["He is tachy cardic."]]
+    assert result["cleaned_transcript"] == (
+        "Pt is a 54 yo man with chest pain.\nHe has hypertension. He is tachycardic.\n"
+        "On exam he was afebrile. Plan is to admit."
+    )
+
+
+def test_reclean_of_a_deletion_makes_no_call(agent):
+    edited = RAW.replace("He has hyper tension.\n\n", "")
+
+    result = agent.reclean(edited, RAW, PREVIOUS)
+
+    assert agent.sent == []
+    assert result["cleaned_transcript"] == "Pt is a 54 yo man with chest pain.\nOn exam he was afebrile. Plan is to admit."
+
+
+def test_reclean_appends_with_the_transcripts_separator(agent):
+    edited = RAW + "\n\nDiscussed with tachy cardic team."
+
+    result = agent.reclean(edited, RAW, PREVIOUS)
+
+    assert result["cleaned_transcript"] == CLEANED + "\n\nDiscussed with tachycardic team."
+
+
+def test_reclean_matches_a_full_clean_of_the_same_layout(agent):
+    once = agent.reclean(RAW.replace("afebrile", "tachy cardic"), RAW, PREVIOUS)
+    twice = agent.reclean(RAW, RAW.replace("afebrile", "tachy cardic"), dict(PREVIOUS, **once))
+
+    assert twice["cleaned_transcript"] == CLEANED
+
+
+@pytest.mark.parametrize("previous", [
+    dict(PREVIOUS, _error="failed"),
+    dict(PREVIOUS, cleaned_transcript=""),
+    # QA merged two sentences, so the edited one cannot be mapped back.
+    dict(PREVIOUS, cleaned_transcript=CLEANED.replace("pain.\nHe", "pain; he")),
+])
+def test_reclean_gives_up_when_the_edit_cannot_be_mapped(agent, previous):
+    edited = RAW.replace("chest pane", "chest pian")
+
+    assert agent.reclean(edited, RAW, previous) is None
+
+
+def test_reclean_gives_up_on_a_segment_count_mismatch(agent, monkeypatch):
+    monkeypatch.setattr(agent, "_call_llm_json", lambda *args, **kwargs: {"segments": []})
+
+    assert agent.reclean(RAW.replace("afebrile", "febrile"), RAW, PREVIOUS) is None
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(transcription_qa, "count_tokens", lambda text, model=None: len(text.split()))
+
+
+LONG = "One two three. Four five.\nSix seven eight nine.\n\nTen."
+
+
+def test_split_separated_keeps_each_sentences_break():
+    assert split_separated(LONG) == [
+        ("One two three.", " "),
+        ("Four five.", "\n"),
+        ("Six seven eight nine.", "\n\n"),
+        ("Ten.", ""),
+    ]
+
+
+def test_chunks_group_whole_sentences_up_to_the_budget(word_tokens):
+    chunks = chunk_sentences(split_separated(LONG), max_tokens=5, overlap=0)
+
+    assert [text for _, text, _, _ in chunks] == ["One two three. Four five.", "Six seven eight nine.\n\nTen."]
+    assert [separator for *_, separator in chunks] == ["\n", ""]
+
+
+def test_oversized_sentence_gets_a_chunk_of_its_own(word_tokens):
+    chunks = chunk_sentences(split_separated(LONG), max_tokens=2, overlap=0)
+
+    assert [text for _, text, _, _ in chunks] == ["One two three.", "Four five.", "Six seven eight nine.", "Ten."]
+
+
+def test_chunks_see_neighbouring_sentences(word_tokens):
+    chunks = chunk_sentences(split_separated(LONG), max_tokens=5, overlap=1)
+
+    assert [(before, after) for before, _, after, _ in chunks] == [("", "Six seven eight nine."), ("Four five.", "")]
+
+
+def test_stitch_restores_the_breaks_and_weights_quality_by_length(agent):
+    parts = [
+        {"cleaned_transcript": "One two three. Four five. ", "transcript_quality": "poor", "_model": "a"},
+        {"cleaned_transcript": "Six.", "transcript_quality": "good", "corrections_made": ["x"], "_model": "b"},
+        {"cleaned_transcript": "Seven.", "transcript_quality": "excellent"},
+    ]
+
+    result = agent._stitch(parts, ["\n\n", "\n", ""])
+
+    assert result["cleaned_transcript"] == "One two three. Four five.\n\nSix.\nSeven."
+    # Five poor words outweigh one good one; unknown ratings are ignored.
+    assert result["transcript_quality"] == "poor"
+    assert (result["corrections_made"], result["_chunks"], result["_model"]) == (["x"], 3, "a, b")
+    assert "_error" not in result
+
+
+def test_stitch_marks_failed_chunks(agent):
+    parts = [
+        {"cleaned_transcript": "One.", "_error": "timeout"},
+        {"cleaned_transcript": "Two.", "_incomplete": "max_tokens"},
+        {"cleaned_transcript": "", "transcript_quality": "good"},
+    ]
+
+    result = agent._stitch(parts, [" ", " ", ""])
+
+    assert result["cleaned_transcript"] == "One. Two."
+    assert result["transcript_quality"] == "unknown"
+    assert result["_model"] == "test-model"
+    assert result["_error"] == "2 of 3 chunks failed: timeout"
+
+
+def test_long_transcript_is_cleaned_chunk_by_chunk(agent, monkeypatch, word_tokens):
+    monkeypatch.setattr(transcription_qa, "CHUNK_TOKENS", 5)
+    monkeypatch.setattr(transcription_qa, "CHUNK_OVERLAP_SENTENCES", 0)
+    excerpts = []
+
+    def fake_call(system_prompt, user_prompt, max_tokens=1500, schema=None):
+        excerpt = user_prompt.split("EXCERPT TO CLEAN:\n", 1)[1].split("\n\nCONTEXT AFTER", 1)[0]
+        excerpts.append(excerpt)
+        return {"cleaned_transcript": excerpt.upper(), "transcript_quality": "good"}
+
+    monkeypatch.setattr(agent, "_call_llm_json", fake_call)
+
+    result = agent.run({"transcript": LONG})
+
+    assert sorted(excerpts) == ["One two three. Four five.", "Six seven eight nine.\n\nTen."]
+    assert result["cleaned_transcript"] == LONG.upper()
+    assert result["_chunks"] == 2
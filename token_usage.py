@@ -0,0 +1,155 @@
+"""Token accounting: local prompt counts, output sizing and per-run usage.
+
+Every call is counted before it is sent (exactly with ``tiktoken`` when it
+is installed, otherwise with a conservative characters-per-token estimate)
+so ``max_tokens`` can be fitted to what is left of the model's context
+window and a prompt that cannot fit is rejected without a round trip.
+
+Agents that read the transcript open their prompts with the same bytes
+(see ``agents.base.shared_prefix``), so after the first of them the provider
+can serve that prefix from its prompt cache.  ``FeedbackPipeline`` opens a
+``UsageLedger`` for each run and every completion made under it reports the
+provider's usage — prompt tokens and how many of them were cached — which
+ends up in the report under ``_usage`` with the completion tokens.  Steps
+reused from an earlier run or served from the LLM cache spend nothing and
+record nothing.
+"""
+
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to the character estimate
+    tiktoken = None
+
+
+# (context window, most completion tokens per call), matched by longest model-name prefix.
+_MODEL_LIMITS = {
+    "gpt-4o-mini": (128000, 16384),
+    "gpt-4o": (128000, 16384),
+    "gpt-4.1": (1047576, 32768),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4": (8192, 8192),
+    "gpt-3.5-turbo": (16385, 4096),
+    "grok-3-mini": (131072, 131072),
+    "grok-3": (131072, 131072),
+}
+_DEFAULT_LIMITS = (128000, 16384)
+# Per-message framing tokens the chat format adds around each message.
+_MESSAGE_OVERHEAD = 4
+_REPLY_PRIMING = 3
+_CHARS_PER_TOKEN = 3.5
+# Tokens left unused at the end of the window to absorb counting error.
+_WINDOW_MARGIN = 64
+
+
+class PromptTooLong(ValueError):
+    """The prompt leaves no room for a completion in the model's context window."""
+
+
+def model_limits(model: str) -> Tuple[int, int]:
+    matches = [prefix for prefix in _MODEL_LIMITS if model.startswith(prefix)]
+    return _MODEL_LIMITS[max(matches, key=len)] if matches else _DEFAULT_LIMITS
+
+
+_encodings: Dict[str, Any] = {}
+
+
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = "") -> int:
+    """Prompt tokens of a chat request, including the chat format's framing."""
+    return _REPLY_PRIMING + sum(
+        _MESSAGE_OVERHEAD + count_tokens(message.get("content") or "", model) for message in messages
+    )
+
+
+def fit_max_tokens(model: str, prompt_tokens: int, max_tokens: int) -> int:
+    """``max_tokens`` capped by the model's output limit and what is left of
+    its context window after the prompt.
+    """
+    window, max_output = model_limits(model)
+    room = window - prompt_tokens - _WINDOW_MARGIN
+    if room <= 0:
+        raise PromptTooLong(f"Prompt of ~{prompt_tokens} tokens does not fit {model}'s {window}-token context window")
+    return min(max_tokens, max_output, room)
+
+
+_ledger: ContextVar[Optional["UsageLedger"]] = ContextVar("usage_ledger", default=None)
+
+
+def _usage_counts(usage: Any) -> Dict[str, int]:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+    }
+
+
+class UsageLedger:
+    """Token usage of one pipeline run, per agent."""
+
+    def __init__(self):
+        self._agents: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, agent_name: str, usage: Any) -> None:
+        counts = _usage_counts(usage)
+        with self._lock:
+            totals = self._agents.setdefault(
+                agent_name, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+            )
+            totals["calls"] += 1
+            for name, value in counts.items():
+                totals[name] += value
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {name: dict(totals) for name, totals in self._agents.items()}
+        prompt_tokens = sum(totals["prompt_tokens"] for totals in agents.values())
+        cached_tokens = sum(totals["cached_tokens"] for totals in agents.values())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": sum(totals["completion_tokens"] for totals in agents.values()),
+            "cached_share": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+            "agents": agents,
+        }
+
+
+@contextmanager
+def recording_usage(ledger: Optional[UsageLedger]):
+    """Record the usage of every completion made in the block into ``ledger``."""
+    token = _ledger.set(ledger)
+    try:
+        yield
+    finally:
+        _ledger.reset(token)
+
+
+def record_usage(agent_name: str, usage: Any) -> None:
+    """Add a completion's ``usage`` to the current run's ledger, if any."""
+    ledger = _ledger.get()
+    if ledger is not None and usage is not None:
+        ledger.add(agent_name, usage)